@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+At-Risk Module
+Scores every student in one pass to find who has fallen behind: missing work among
+the items most of the class has already done in the latest sub-chapters, a drop in
+score from earlier sub-chapters to recent ones, and (given an earlier grades
+download) no new submissions since then. Uses NumPy over the whole grade matrix
+when it is installed.
+"""
+
+import statistics
+from collections import namedtuple
+
+from class_statistics import grade_matrix, np
+from gradebook import ALL_SECTIONS, split_last_first
+
+# Sub-chapters (course steps, see SubchapterIndex.timeline) counted as "recent"
+RECENT_STEPS = 3
+# Flag a student with at least this many missing items in the recent steps
+MISSING_THRESHOLD = 2
+# Flag a student whose recent score share is this much below their earlier one
+TREND_DROP = 0.25
+# An item is due once this share of the class has submitted it
+DUE_RATE = 0.5
+
+RiskEntry = namedtuple('RiskEntry', [
+    'name', 'id', 'section', 'score', 'flagged', 'missing_recent', 'recent_share', 'earlier_share',
+    'trend', 'new_submissions', 'reasons'])
+
+# reached: every timeline step with due items; recent: the last RECENT_STEPS of them
+AtRiskReport = namedtuple('AtRiskReport', ['reached', 'recent', 'recent_columns', 'entries'])
+
+
+def due_steps(gradebook, submitted_sets=None):
+    """[(label, due columns)] for the timeline steps that have items the class has done"""
+    students = len(gradebook.records)
+    if not students:
+        return []
+    if submitted_sets is None:
+        submitted_sets = [set(r.submitted_columns()) for r in gradebook.records]
+    counts = [0] * len(gradebook.layout)
+    for submitted in submitted_sets:
+        for c in submitted:
+            counts[c] += 1
+    steps = []
+    for label, columns in gradebook.index.timeline():
+        due = [c for c in columns if counts[c] / students >= DUE_RATE]
+        if due:
+            steps.append((label, due))
+    return steps
+
+
+def assess(gradebook, recent_steps=RECENT_STEPS, missing_threshold=MISSING_THRESHOLD,
+           trend_drop=TREND_DROP, previous=None, use_numpy=None):
+    """Rank every student by risk. previous is the record list of an earlier grades
+    download (matched by student ID) used to spot students with no new work."""
+    submitted_sets = [set(r.submitted_columns()) for r in gradebook.records]
+    reached = due_steps(gradebook, submitted_sets)
+    recent = reached[-recent_steps:] if recent_steps > 0 else []
+    earlier = reached[:len(reached) - len(recent)]
+    recent_columns = [c for _, columns in recent for c in columns]
+    earlier_columns = [c for _, columns in earlier for c in columns]
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        missing, recent_share, earlier_share = _numpy_measures(gradebook, recent_columns, earlier_columns)
+    else:
+        missing, recent_share, earlier_share = _python_measures(gradebook, submitted_sets,
+                                                                recent_columns, earlier_columns)
+
+    new_work = [None] * len(gradebook.records)
+    stalled_bar = None
+    if previous is not None:
+        before = {r.id: r.submitted_count() for r in previous}
+        new_work = [r.submitted_count() - before[r.id] if r.id in before else None
+                    for r in gradebook.records]
+        deltas = [n for n in new_work if n is not None]
+        # Only "stalled" if the class as a whole has moved on
+        if deltas and statistics.median(deltas) > 0:
+            stalled_bar = 0
+
+    entries = []
+    order_keys = []
+    for i, record in enumerate(gradebook.records):
+        reasons = []
+        trend = None
+        if recent_share[i] is not None and earlier_share[i] is not None:
+            trend = recent_share[i] - earlier_share[i]
+        score = missing[i] / len(recent_columns) if recent_columns else 0.0
+        if recent_columns and missing[i] >= missing_threshold:
+            reasons.append(f"{missing[i]} missing in {recent[0][0]}-{recent[-1][0]}")
+        if trend is not None:
+            score += max(0.0, -trend)
+            if trend <= -trend_drop:
+                reasons.append(f"score down {-trend:.0%} from earlier sub-chapters")
+        if stalled_bar is not None and new_work[i] is not None and new_work[i] <= stalled_bar:
+            score += 0.5
+            reasons.append("no new submissions since the earlier download")
+        entries.append(RiskEntry(record.name, record.id, gradebook.sections[i], score, bool(reasons),
+                                 missing[i], recent_share[i], earlier_share[i], trend, new_work[i],
+                                 tuple(reasons)))
+        order_keys.append((-score, gradebook.rank[i]))
+
+    # Highest score first, ties in roster order
+    entries = [entries[i] for i in sorted(range(len(entries)), key=order_keys.__getitem__)]
+    return AtRiskReport([label for label, _ in reached], [label for label, _ in recent],
+                        recent_columns, entries)
+
+
+def _share_columns(gradebook, columns):
+    """Columns with points possible, the ones a score share can be computed for"""
+    return [c for c in columns if gradebook.layout.points[c] > 0]
+
+
+def _python_measures(gradebook, submitted_sets, recent_columns, earlier_columns):
+    points = gradebook.layout.points
+    recent_scored = _share_columns(gradebook, recent_columns)
+    earlier_scored = _share_columns(gradebook, earlier_columns)
+
+    def share(record, columns):
+        """Mean grade / points possible; blanks count as 0, text cells (e.g. 'EX') are left out"""
+        total = 0.0
+        counted = 0
+        for c in columns:
+            g = record.grade(c)
+            if g is None:
+                counted += 1
+            elif isinstance(g, float):
+                total += g / points[c]
+                counted += 1
+        return total / counted if counted else None
+
+    missing = [sum(1 for c in recent_columns if c not in s) for s in submitted_sets]
+    recent_share = [share(r, recent_scored) for r in gradebook.records]
+    earlier_share = [share(r, earlier_scored) for r in gradebook.records]
+    return missing, recent_share, earlier_share
+
+
+def _numpy_measures(gradebook, recent_columns, earlier_columns):
+    grades, submitted = grade_matrix(gradebook)
+    points = np.frombuffer(gradebook.layout.points, dtype=np.float64)
+    text = submitted & np.isnan(grades)
+    shares = np.nan_to_num(grades) / np.where(points > 0, points, 1.0)
+
+    def share(columns):
+        columns = _share_columns(gradebook, columns)
+        if not columns:
+            return [None] * len(grades)
+        counted = (~text[:, columns]).sum(axis=1)
+        total = np.where(text[:, columns], 0.0, shares[:, columns]).sum(axis=1)
+        return [float(t) / n if n else None for t, n in zip(total, counted)]
+
+    missing = (len(recent_columns) - submitted[:, recent_columns].sum(axis=1)).tolist()
+    return missing, share(recent_columns), share(earlier_columns)
+
+
+def _percent(value):
+    return '' if value is None else round(value * 100, 1)
+
+
+def iter_at_risk_rows(report, section):
+    """Rows of one section tab of the exported at-risk list (flagged students, ranked)"""
+    yield [f"At-risk students: {section}"]
+    yield [f"Recent sub-chapters: {', '.join(report.recent)}"]
+    yield ["Rank", "Last Name", "First Name", "Risk score", "Missing (recent)", "Recent score %",
+           "Earlier score %", "Trend (% points)", "New submissions", "Reasons"]
+    rank = 0
+    for entry in report.entries:
+        if entry.section != section or not entry.flagged:
+            continue
+        rank += 1
+        last, first = split_last_first(entry.name)
+        yield [rank, last, first, round(entry.score, 3), entry.missing_recent, _percent(entry.recent_share),
+               _percent(entry.earlier_share), _percent(entry.trend),
+               '' if entry.new_submissions is None else entry.new_submissions, "; ".join(entry.reasons)]
+
+
+def at_risk_tabs(report):
+    """[(tab name, rows)] for export: one tab per section"""
+    return [(f"{section} At Risk", iter_at_risk_rows(report, section)) for section in ALL_SECTIONS]
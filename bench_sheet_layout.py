@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark the export row pipeline (sheet_layout.GradeBlock) against the original
+per-row name splitting and per-cell float() totals, on large generated sections.
+Usage:
+  python bench_sheet_layout.py [--students 20000] [--assignments 40] [--fill 0.6]
+"""
+import argparse
+import random
+import time
+
+from sheet_layout import iter_section_split_rows, iter_section_data_rows
+
+
+def legacy_split_rows(header_assignments, section_data):
+    """The row building of the original GoogleSheetsExporter.write_section_split"""
+    data = []
+    header = ["Last Name", "First Name"] + header_assignments + ["Total"]
+    for block in ('submitted', 'not_submitted'):
+        data.append(header)
+        for r in section_data.get(block, []):
+            grades = r[2:]
+            total = 0.0
+            for g in grades:
+                try:
+                    total += float(g)
+                except Exception:
+                    continue
+            data.append(list(r) + [total])
+    return data
+
+
+def legacy_section_rows(grades_data):
+    """The row building of the original GoogleSheetsExporter.write_section_data"""
+    data = []
+    for student_name, grade in grades_data:
+        if ',' in student_name:
+            parts = student_name.split(', ')
+            if len(parts) >= 2:
+                data.append([parts[0].strip(), parts[1].strip(), grade])
+    return data
+
+
+def best_of(func, repeat=9):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark export row building')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--assignments', type=int, default=40)
+    parser.add_argument('--fill', type=float, default=0.6, help='share of submitted cells')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    assignments = [f"1.{i} Code Practice ({23120000 + i})" for i in range(args.assignments)]
+    rows = [[f"Last{n}", f"First{n}"] +
+            [float(rng.randint(0, 5)) if rng.random() < args.fill else '' for _ in assignments]
+            for n in range(args.students)]
+    section = {'submitted': rows[: args.students // 2], 'not_submitted': rows[args.students // 2:]}
+    pairs = [(f"Last{n}, First{n}", float(n % 5)) for n in range(args.students)]
+
+    cells = args.students * args.assignments
+    print(f"{args.students} students x {args.assignments} assignments ({cells} cells)")
+
+    legacy = best_of(lambda: legacy_split_rows(assignments, section))
+    pipeline = best_of(lambda: list(iter_section_split_rows('F2 Section', assignments, section)))
+    print(f"sub-chapter tab   legacy {legacy * 1000:8.1f} ms   pipeline {pipeline * 1000:8.1f} ms   "
+          f"({legacy / pipeline:.1f}x)")
+
+    legacy = best_of(lambda: legacy_section_rows(pairs))
+    pipeline = best_of(lambda: list(iter_section_data_rows('F2 Section', pairs, assignments[0])))
+    print(f"assignment tab    legacy {legacy * 1000:8.1f} ms   pipeline {pipeline * 1000:8.1f} ms   "
+          f"({legacy / pipeline:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the memory of the compact grade records (student_record) against the
+original dict-of-dicts loader, on a large generated grades.csv.
+Usage:
+  python bench_student_record.py [--students 10000] [--assignments 226] [--fill 0.3]
+"""
+import argparse
+import csv
+import gc
+import os
+import random
+import tempfile
+import tracemalloc
+
+from student_record import read_grades_csv
+
+
+def write_grades_csv(filename, n_students, n_assignments, fill_ratio, seed=1):
+    """Generate a grades.csv in the Project Stem export layout; returns the assignment headers"""
+    rng = random.Random(seed)
+    assignments = [f"{1 + i // 20}.{1 + (i // 4) % 5} Code Practice: Question {1 + i % 4} ({23120000 + i})"
+                   for i in range(n_assignments)]
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Student', 'ID', 'SIS User ID', 'SIS Login ID', 'Section'] + assignments)
+        writer.writerow(['    Points Possible', '', '', '', ''] + ['1.00'] * n_assignments)
+        for n in range(n_students):
+            cells = [f"{rng.randint(0, 10)}.00" if rng.random() < fill_ratio else ''
+                     for _ in range(n_assignments)]
+            writer.writerow([f"Last{n}, First{n}", str(900000 + n), '', f"s{n}@example.org",
+                             'CS Python Fundamentals'] + cells)
+    return assignments
+
+
+def load_as_dicts(filename):
+    """The original dict-of-dicts loader"""
+    grades_data = []
+    with open(filename, 'r', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        next(reader)
+        assignments = header[5:]
+        for row in reader:
+            if row and row[0].strip():
+                grades = {}
+                for i, assignment in enumerate(assignments):
+                    if i + 5 < len(row):
+                        grade_value = row[i + 5].strip()
+                        if grade_value:
+                            try:
+                                grades[assignment] = float(grade_value)
+                            except ValueError:
+                                grades[assignment] = grade_value
+                        else:
+                            grades[assignment] = None
+                grades_data.append({'name': row[0].strip(), 'id': row[1], 'grades': grades})
+    return grades_data
+
+
+def traced_size(load):
+    """Memory still allocated by the loaded data"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        data = load()
+        # Count what the data keeps, not garbage waiting for the cycle collector
+        gc.collect()
+        size, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return data, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark grade record memory')
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--assignments', type=int, default=226)
+    parser.add_argument('--fill', type=float, default=0.3, help='share of submitted cells')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'grades.csv')
+        write_grades_csv(filename, args.students, args.assignments, args.fill)
+        print(f"{args.students} students x {args.assignments} assignments, {args.fill:.0%} submitted")
+
+        _, dict_size = traced_size(lambda: load_as_dicts(filename))
+        _, dense_size = traced_size(lambda: read_grades_csv(filename, sparse=False))
+        _, sparse_size = traced_size(lambda: read_grades_csv(filename, sparse=True))
+
+    print(f"dict rows    {dict_size / 1e6:8.1f} MB")
+    print(f"dense rows   {dense_size / 1e6:8.1f} MB   ({dict_size / dense_size:.1f}x smaller)")
+    print(f"sparse rows  {sparse_size / 1e6:8.1f} MB   ({dict_size / sparse_size:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
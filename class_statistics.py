@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Class Statistics Module
+Statistics for every assignment x section at once: submission rate, mean, median,
+standard deviation, percentiles, lowest/highest and a histogram of grades as a share
+of points possible. With NumPy installed the whole grade matrix is reduced per
+section in one pass; without it the statistics module gives the same numbers.
+"""
+
+import math
+import statistics
+import warnings
+from collections import namedtuple
+
+from gradebook import ALL_SECTIONS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Every section plus the whole class
+ALL_STUDENTS = 'All'
+STAT_GROUPS = ALL_SECTIONS + [ALL_STUDENTS]
+
+PERCENTILES = (25, 75, 90)
+
+# 0-20%, 20-40%, ... 80-100% of points possible (extra credit goes in the top bin)
+HISTOGRAM_BINS = 5
+
+GroupStats = namedtuple('GroupStats', [
+    'students', 'submitted', 'submission_rate', 'graded',
+    'mean', 'median', 'stdev', 'p25', 'p75', 'p90', 'lowest', 'highest', 'histogram'])
+
+
+def percentile(sorted_values, q):
+    """q-th percentile with linear interpolation (NumPy's default method)"""
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def histogram_bin(value, scale):
+    return min(max(int(value / scale * HISTOGRAM_BINS), 0), HISTOGRAM_BINS - 1)
+
+
+def histogram_labels():
+    width = 100 // HISTOGRAM_BINS
+    return [f"{b * width}-{(b + 1) * width}%" for b in range(HISTOGRAM_BINS)]
+
+
+def column_scales(layout, highest):
+    """Histogram scale per column: points possible, else the highest grade in the class"""
+    scales = []
+    for points, top in zip(layout.points, highest):
+        if points > 0:
+            scales.append(points)
+        elif top is not None and top > 0:
+            scales.append(top)
+        else:
+            scales.append(1.0)
+    return scales
+
+
+def empty_stats(students, submitted):
+    return GroupStats(students, submitted, submitted / students if students else 0.0, 0,
+                      None, None, None, None, None, None, None, None, (0,) * HISTOGRAM_BINS)
+
+
+def class_statistics(gradebook, use_numpy=None):
+    """{(column, group): GroupStats} for every assignment column and every group in STAT_GROUPS"""
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        return _numpy_statistics(gradebook)
+    return _python_statistics(gradebook)
+
+
+def _python_statistics(gradebook):
+    n_columns = len(gradebook.layout)
+    grades = {group: [[] for _ in range(n_columns)] for group in STAT_GROUPS}
+    submitted = {group: [0] * n_columns for group in STAT_GROUPS}
+    students = dict.fromkeys(STAT_GROUPS, 0)
+
+    # One pass over the submitted cells only
+    everyone_grades = grades[ALL_STUDENTS]
+    everyone_submitted = submitted[ALL_STUDENTS]
+    for record, section in zip(gradebook.records, gradebook.sections):
+        students[section] += 1
+        section_grades = grades[section]
+        section_submitted = submitted[section]
+        for column, grade in record.iter_submitted():
+            section_submitted[column] += 1
+            everyone_submitted[column] += 1
+            if isinstance(grade, float):
+                section_grades[column].append(grade)
+                everyone_grades[column].append(grade)
+    students[ALL_STUDENTS] = len(gradebook.records)
+
+    scales = column_scales(gradebook.layout, [max(g) if g else None for g in everyone_grades])
+    result = {}
+    for group in STAT_GROUPS:
+        for column in range(n_columns):
+            values = sorted(grades[group][column])
+            count = submitted[group][column]
+            if not values:
+                result[column, group] = empty_stats(students[group], count)
+                continue
+            histogram = [0] * HISTOGRAM_BINS
+            for v in values:
+                histogram[histogram_bin(v, scales[column])] += 1
+            result[column, group] = GroupStats(
+                students[group], count, count / students[group], len(values),
+                statistics.fmean(values), statistics.median(values), statistics.pstdev(values),
+                *(percentile(values, q) for q in PERCENTILES),
+                values[0], values[-1], tuple(histogram))
+    return result
+
+
+def grade_matrix(gradebook):
+    """(grades, submitted): float matrix with NaN for blanks or text, and a bool matrix
+    marking every non-blank cell"""
+    n_rows, n_columns = len(gradebook.records), len(gradebook.layout)
+    grades = np.full((n_rows, n_columns), np.nan)
+    submitted = np.zeros((n_rows, n_columns), dtype=bool)
+    for i, record in enumerate(gradebook.records):
+        values = np.frombuffer(record.values, dtype=np.float64) if len(record.values) else None
+        if record.columns is None:
+            grades[i] = values
+        elif values is not None:
+            grades[i, np.frombuffer(record.columns, dtype=np.dtype(record.columns.typecode))] = values
+        if record.text:
+            submitted[i, list(record.text)] = True
+    submitted |= ~np.isnan(grades)
+    return grades, submitted
+
+
+def _numpy_statistics(gradebook):
+    grades, submitted = grade_matrix(gradebook)
+    n_columns = grades.shape[1]
+    sections = np.array(gradebook.sections, dtype=object)
+
+    with warnings.catch_warnings():
+        # All-NaN columns (nothing graded yet) are expected
+        warnings.simplefilter('ignore', RuntimeWarning)
+        highest = np.nanmax(grades, axis=0) if len(grades) else np.full(n_columns, np.nan)
+    scales = np.array(column_scales(gradebook.layout,
+                                    [None if math.isnan(h) else float(h) for h in highest]))
+    with np.errstate(invalid='ignore'):
+        bins = np.clip(np.floor(grades / scales * HISTOGRAM_BINS), 0, HISTOGRAM_BINS - 1)
+
+    result = {}
+    for group in STAT_GROUPS:
+        rows = np.ones(len(sections), dtype=bool) if group == ALL_STUDENTS else sections == group
+        students = int(rows.sum())
+        counts = submitted[rows].sum(axis=0)
+        if students == 0:
+            for column in range(n_columns):
+                result[column, group] = empty_stats(0, 0)
+            continue
+
+        g = grades[rows]
+        graded = (~np.isnan(g)).sum(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(g, axis=0)
+            median = np.nanmedian(g, axis=0)
+            stdev = np.nanstd(g, axis=0)
+            pcts = np.nanpercentile(g, PERCENTILES, axis=0)
+            lowest = np.nanmin(g, axis=0)
+            highest = np.nanmax(g, axis=0)
+        group_bins = bins[rows]
+        histogram = np.stack([(group_bins == b).sum(axis=0) for b in range(HISTOGRAM_BINS)], axis=1)
+
+        for column in range(n_columns):
+            count = int(counts[column])
+            if not graded[column]:
+                result[column, group] = empty_stats(students, count)
+                continue
+            result[column, group] = GroupStats(
+                students, count, count / students, int(graded[column]),
+                float(mean[column]), float(median[column]), float(stdev[column]),
+                *(float(p[column]) for p in pcts),
+                float(lowest[column]), float(highest[column]),
+                tuple(int(h) for h in histogram[column]))
+    return result
+
+
+def section_overview(stats, columns, layout):
+    """{group: (average submission rate, average mean as a share of points possible)} over columns.
+    Columns without points possible only count towards the submission rate."""
+    overview = {}
+    for group in STAT_GROUPS:
+        rates = []
+        shares = []
+        for column in columns:
+            s = stats[column, group]
+            rates.append(s.submission_rate)
+            points = layout.points[column]
+            if s.mean is not None and points > 0:
+                shares.append(s.mean / points)
+        overview[group] = (sum(rates) / len(rates) if rates else 0.0,
+                           sum(shares) / len(shares) if shares else None)
+    return overview
+
+
+def _cell(value, digits=3):
+    """Rounded number for the summary sheet, blank when there is nothing to report"""
+    return '' if value is None else round(value, digits)
+
+
+def iter_summary_rows(stats, assignments, columns):
+    """Rows of the exported summary sheet: one row per assignment x group"""
+    yield ["Class Analytics"]
+    yield []
+    yield (["Assignment", "Section", "Students", "Submitted", "Submission rate", "Graded", "Mean",
+            "Median", "Std dev"] + [f"P{q}" for q in PERCENTILES] + ["Lowest", "Highest"] +
+           histogram_labels())
+    for column in columns:
+        for group in STAT_GROUPS:
+            s = stats[column, group]
+            yield ([assignments[column], group, s.students, s.submitted, _cell(s.submission_rate), s.graded,
+                    _cell(s.mean), _cell(s.median), _cell(s.stdev), _cell(s.p25), _cell(s.p75), _cell(s.p90),
+                    _cell(s.lowest), _cell(s.highest)] + list(s.histogram))
+
+
+def iter_overview_rows(stats, columns, layout):
+    """Rows of the per-section comparison sheet"""
+    yield ["Section comparison"]
+    yield [f"{len(columns)} assignments"]
+    yield ["Section", "Average submission rate", "Average mean (share of points possible)"]
+    for group, (rate, share) in section_overview(stats, columns, layout).items():
+        yield [group, _cell(rate), _cell(share)]
@@ -0,0 +1,73 @@
+"""
+Shared test fixtures: small grades.csv + roster folders in the Project Stem export layout.
+"""
+import csv
+import os
+
+import pytest
+
+from gradebook import Gradebook
+
+ASSIGNMENTS = ['1.1 Lesson Practice (23118480)',
+               '1.2 Code Practice (23120649)',
+               '1.3 Code Practice: Question 1 (23120662)']
+
+ROWS = [("Doe, Jane", '1', ['5.00', '1.00', '']),
+        ("Smith, John", '2', ['3.00', '', ''])]
+
+AT_RISK_ASSIGNMENTS = ['1.1 Lesson Practice (1)', '1.2 Lesson Practice (2)', '1.3 Lesson Practice (3)',
+                       '1.4 Lesson Practice (4)', '1.5 Lesson Practice (5)', 'Quiz 1 (6)']
+
+#             1.1     1.2     1.3     1.4     1.5   Quiz 1 (nobody yet)
+AT_RISK_ROWS = [("Doe, Jane", '1', ['4.00', '4.00', '4.00', '4.00', '4.00', '']),
+                ("Smith, John", '2', ['4.00', '4.00', '4.00', '', '', '']),
+                ("Lee, Ann", '3', ['4.00', '4.00', '4.00', '1.00', '1.00', '']),
+                ("Park, Min", '4', ['4.00', '4.00', '4.00', '4.00', '3.00', ''])]
+
+
+def write_grades(folder, assignments, rows, points, f2_names):
+    """grades.csv with rows of (name, id, grades) and an F2 roster"""
+    with open(os.path.join(folder, 'grades.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Student', 'ID', 'SIS User ID', 'SIS Login ID', 'Section'] + assignments)
+        writer.writerow(['    Points Possible', '', '', '', ''] + [points] * len(assignments))
+        for name, sid, grades in rows:
+            writer.writerow([name, sid, '', '', 'CS Python Fundamentals'] + grades)
+    with open(os.path.join(folder, 'F2 - names.csv'), 'w', encoding='utf-8', newline='') as f:
+        f.write("name\n" + "".join(f"{name}\n" for name in f2_names))
+
+
+@pytest.fixture
+def assignments():
+    """The three assignments written by write_gradebook"""
+    return ASSIGNMENTS
+
+
+@pytest.fixture
+def rows():
+    """Jane Doe (F2) and John Smith (not on a roster)"""
+    return ROWS
+
+
+@pytest.fixture
+def write_gradebook():
+    """write_gradebook(folder, rows): the three-assignment gradebook with Jane Doe in F2"""
+    def write(folder, rows):
+        write_grades(folder, ASSIGNMENTS, rows, '1.00', ["Jane Doe"])
+    return write
+
+
+@pytest.fixture
+def at_risk_rows():
+    """Four F2 students: steady, missing the recent work, dropping, slightly lower"""
+    return AT_RISK_ROWS
+
+
+@pytest.fixture
+def load_at_risk():
+    """load_at_risk(folder, rows=AT_RISK_ROWS): five sub-chapters and a quiz nobody has taken"""
+    def load(folder, rows=AT_RISK_ROWS):
+        write_grades(folder, AT_RISK_ASSIGNMENTS, rows, '4.00',
+                     ["Jane Doe", "John Smith", "Ann Lee", "Min Park"])
+        return Gradebook.load(folder)
+    return load
@@ -4,6 +4,7 @@ from student_grades_app import StudentGradesApp
 root = tk.Tk()
 root.withdraw()
 app = StudentGradesApp(root)
+app.wait_until_loaded()
 print('Assignments count:', len(app.assignments))
 print('First 10 assignments:')
 for a in app.assignments[:10]:
@@ -6,6 +6,7 @@ import tkinter as tk
 root = tk.Tk()
 root.withdraw()
 app = StudentGradesApp(root)
+app.wait_until_loaded()
 
 # pick first subchapter prefix
 if not app.assignments:
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Export Snapshots Module
+Local, content-addressed record of what every export sent: each tab's value array is
+stored once, zlib-compressed, under the SHA-256 of its canonical JSON, and every
+export appends a manifest (title, target, tab hashes, URL, key) to a log. Identical
+payloads hash the same, so re-exports can be skipped and diffs only open the tabs
+whose hashes differ.
+Usage:
+  python export_snapshots.py list [title]
+  python export_snapshots.py diff <snapshot> [<snapshot>]   (hash prefixes; one = compare with the previous export of that title)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+SNAPSHOT_DIR = '.export_snapshots'
+
+# tabs: ((tab name, object hash, row count), ...); payload: hash over the tab names and hashes;
+# key: what was exported when the title can change, e.g. 'assignment:23120662' (None: the title)
+Snapshot = namedtuple('Snapshot', ['title', 'target', 'created', 'payload', 'tabs', 'location', 'key'],
+                      defaults=(None,))
+
+# status: 'same', 'changed', 'added' or 'removed'; changed holds (old row, new row) pairs
+TabDiff = namedtuple('TabDiff', ['name', 'status', 'added', 'removed', 'changed'])
+
+
+def encode_rows(rows):
+    """Canonical JSON of a tab's value array"""
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_row(row):
+    """Canonical JSON of one row; a tab's encoding is its rows joined by ',' inside [ ]"""
+    return json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def object_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def payload_hash(tab_hashes):
+    """Hash of a whole export from its ((tab name, object hash), ...)"""
+    return object_hash(encode_rows([list(t) for t in tab_hashes]))
+
+
+class SnapshotStore:
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.log_path = os.path.join(root, 'log.jsonl')
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:] + '.json.z')
+
+    def put_object(self, data):
+        """Store encoded rows once; returns their hash"""
+        digest = object_hash(data)
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp, path)
+        return digest
+
+    def object_writer(self):
+        return ObjectWriter(self)
+
+    def get_object(self, digest):
+        with open(self.object_path(digest), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+
+    def hash_tabs(self, tabs):
+        """((tab name, hash, row count), ...) without storing anything"""
+        return tuple((name, object_hash(encode_rows(rows)), len(rows)) for name, rows in tabs)
+
+    def record(self, title, target, tabs, location, key=None):
+        """Store the tabs [(name, rows)] of an export and append its manifest to the log"""
+        entries = tuple((name, self.put_object(encode_rows(rows)), len(rows)) for name, rows in tabs)
+        return self.record_entries(title, target, entries, location, key)
+
+    def record_entries(self, title, target, entries, location, key=None):
+        """Append the manifest of an export whose tabs are already stored, as
+        ((tab name, object hash, row count), ...)"""
+        entries = tuple(tuple(e) for e in entries)
+        snapshot = Snapshot(title, target, datetime.now().isoformat(timespec='seconds'),
+                            payload_hash((name, digest) for name, digest, _ in entries), entries, location, key)
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot._asdict(), ensure_ascii=False) + '\n')
+        return snapshot
+
+    def history(self, title=None, target=None, key=None):
+        """Snapshots in the order they were recorded, optionally for one title (or key) and target"""
+        snapshots = []
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    data['tabs'] = tuple(tuple(t) for t in data['tabs'])
+                    snapshot = Snapshot(**data)
+                    if key is not None:
+                        same = snapshot.key == key
+                    else:
+                        same = title is None or snapshot.title == title
+                    if same and (target is None or snapshot.target == target):
+                        snapshots.append(snapshot)
+        except FileNotFoundError:
+            pass
+        return snapshots
+
+    def latest(self, title, target, key=None):
+        snapshots = self.history(title, target, key)
+        return snapshots[-1] if snapshots else None
+
+    def find_unchanged(self, title, target, tabs, key=None):
+        """The last snapshot of this title (or key) and target if the new tabs are identical
+        to it, else None"""
+        return self.find_unchanged_entries(title, target, self.hash_tabs(tabs), key)
+
+    def find_unchanged_entries(self, title, target, entries, key=None):
+        """find_unchanged() for tabs already hashed as ((tab name, hash, row count), ...)"""
+        previous = self.latest(title, target, key)
+        if previous is None or not previous.location:
+            return None
+        if payload_hash((name, digest) for name, digest, _ in entries) != previous.payload:
+            return None
+        return previous
+
+    def find(self, prefix):
+        """Snapshot whose payload hash starts with prefix (the most recent if several do)"""
+        matches = [s for s in self.history() if s.payload.startswith(prefix)]
+        if not matches:
+            raise Exception(f"No snapshot matches '{prefix}'")
+        return matches[-1]
+
+    def previous_of(self, snapshot):
+        """The export of the same title (or key) and target recorded before snapshot"""
+        earlier = None
+        for s in self.history(snapshot.title, snapshot.target, snapshot.key):
+            if s == snapshot:
+                return earlier
+            earlier = s
+        return None
+
+    def diff(self, old, new):
+        """[TabDiff] between two snapshots; tabs with equal hashes are not opened"""
+        old_tabs = {name: digest for name, digest, _ in old.tabs}
+        new_tabs = {name: digest for name, digest, _ in new.tabs}
+        diffs = []
+        for name, digest in new_tabs.items():
+            if name not in old_tabs:
+                diffs.append(TabDiff(name, 'added', self.get_object(digest), [], []))
+            elif old_tabs[name] == digest:
+                diffs.append(TabDiff(name, 'same', [], [], []))
+            else:
+                added, removed, changed = diff_rows(self.get_object(old_tabs[name]), self.get_object(digest))
+                diffs.append(TabDiff(name, 'changed', added, removed, changed))
+        for name, digest in old_tabs.items():
+            if name not in new_tabs:
+                diffs.append(TabDiff(name, 'removed', [], self.get_object(digest), []))
+        return diffs
+
+
+class ObjectWriter:
+    """Stores one tab while its rows are streamed: the canonical JSON is hashed and
+    zlib-compressed row by row into a temporary file, which becomes the object on close()"""
+
+    def __init__(self, store):
+        self.store = store
+        self.sha = hashlib.sha256()
+        self.compressor = zlib.compressobj(6)
+        self.rows = 0
+        folder = os.path.join(store.root, 'objects')
+        os.makedirs(folder, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(suffix='.tmp', dir=folder)
+        self.file = os.fdopen(fd, 'wb')
+        self.write(b'[')
+
+    def write(self, data):
+        self.sha.update(data)
+        self.file.write(self.compressor.compress(data))
+
+    def add(self, row):
+        self.write(b',' + encode_row(row) if self.rows else encode_row(row))
+        self.rows += 1
+
+    def close(self):
+        """Finish the object; returns (hash, row count)"""
+        self.write(b']')
+        self.file.write(self.compressor.flush())
+        self.file.close()
+        digest = self.sha.hexdigest()
+        path = self.store.object_path(digest)
+        if os.path.exists(path):
+            os.remove(self.tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.tmp, path)
+        return digest, self.rows
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.tmp)
+
+
+class TabDigests:
+    """(tab name, object hash, row count) of every tab written through it, for writers
+    that never hold a whole tab. If the store cannot be written the export still runs,
+    and `failed` says why there is nothing to record."""
+
+    def __init__(self, store):
+        self.store = store
+        self.entries = []
+        self.failed = None
+        self.name = None
+        self.writer = None
+
+    def begin(self, name):
+        self.name, self.writer = name, None
+        if self.failed is None:
+            try:
+                self.writer = self.store.object_writer()
+            except OSError as e:
+                self.failed = e
+
+    def add(self, row):
+        if self.writer is not None:
+            self.writer.add(row)
+
+    def end(self):
+        if self.writer is not None:
+            self.entries.append((self.name,) + self.writer.close())
+            self.writer = None
+
+    def discard(self):
+        if self.writer is not None:
+            self.writer.discard()
+            self.writer = None
+
+    def stream(self, name, rows):
+        """Yield rows unchanged while storing them as the object of tab `name`"""
+        self.begin(name)
+        try:
+            for row in rows:
+                self.add(row)
+                yield row
+        except BaseException:
+            self.discard()
+            raise
+        self.end()
+
+
+def row_keys(rows):
+    """Key rows by their first two cells (Last, First on grade rows), numbering repeats"""
+    keyed = {}
+    seen = {}
+    for row in rows:
+        base = tuple(str(c) for c in row[:2])
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        keyed[base + (n,)] = row
+    return keyed
+
+
+def diff_rows(old_rows, new_rows):
+    """(added rows, removed rows, [(old row, new row)]) between two value arrays"""
+    old = row_keys(old_rows)
+    new = row_keys(new_rows)
+    added = [row for key, row in new.items() if key not in old]
+    removed = [row for key, row in old.items() if key not in new]
+    changed = [(old[key], row) for key, row in new.items() if key in old and old[key] != row]
+    return added, removed, changed
+
+
+def format_diff(old, new, diffs):
+    """Text summary of a diff between two snapshots"""
+    text = f"{new.title} ({new.target})\n{old.created} [{old.payload[:10]}] -> {new.created} [{new.payload[:10]}]\n"
+    if old.payload == new.payload:
+        return text + "No changes\n"
+    for d in diffs:
+        if d.status == 'same':
+            continue
+        text += f"\n{d.name}: {d.status}"
+        if d.status == 'changed':
+            text += f" ({len(d.changed)} changed, {len(d.added)} added, {len(d.removed)} removed rows)"
+        text += "\n"
+        for before, after in d.changed:
+            text += f"  ~ {before}\n    {after}\n"
+        for row in d.added if d.status == 'changed' else []:
+            text += f"  + {row}\n"
+        for row in d.removed if d.status == 'changed' else []:
+            text += f"  - {row}\n"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List and diff recorded export snapshots')
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list')
+    list_parser.add_argument('title', nargs='?')
+    diff_parser = sub.add_parser('diff')
+    diff_parser.add_argument('snapshots', nargs='+', help='one or two payload hash prefixes')
+    parser.add_argument('--dir', default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.dir)
+    try:
+        if args.command == 'list':
+            for s in store.history(args.title):
+                print(f"{s.payload[:10]}  {s.created}  {s.target:<14} {s.title}  ({len(s.tabs)} tabs)  {s.location}")
+        else:
+            new = store.find(args.snapshots[-1])
+            old = store.find(args.snapshots[0]) if len(args.snapshots) > 1 else store.previous_of(new)
+            if old is None:
+                raise Exception(f"No earlier export of '{new.title}' to compare with")
+            print(format_diff(old, new, store.diff(old, new)))
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+File Watcher Module
+Watches grades.csv, the "* - names.csv" roster files and the student_aliases.json
+alias table in a background thread and calls back with the names of the files that changed. Uses inotify when inotify_simple
+is installed and polls mtimes otherwise. The callback runs on the watcher thread.
+"""
+
+import fnmatch
+import os
+import threading
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # inotify is optional, polling works everywhere
+    INotify = None
+    flags = None
+
+WATCH_PATTERNS = ('grades.csv', '* - names.csv', 'student_aliases.json')
+POLL_SECONDS = 2.0
+
+# A change is reported once the files have stopped changing for this long,
+# so a download that is still being written is not loaded half-way
+SETTLE_SECONDS = 0.5
+
+
+def scan(folder, patterns):
+    """{file name: (mtime, size)} of the files in folder matching any pattern"""
+    found = {}
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return found
+    for name in names:
+        if any(fnmatch.fnmatch(name, p) for p in patterns):
+            try:
+                st = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            found[name] = (st.st_mtime_ns, st.st_size)
+    return found
+
+
+class FileWatcher:
+    def __init__(self, callback, folder='.', patterns=WATCH_PATTERNS,
+                 interval=POLL_SECONDS, settle=SETTLE_SECONDS):
+        self.callback = callback
+        self.folder = folder
+        self.patterns = patterns
+        self.interval = interval
+        self.settle = settle
+        self.snapshot = scan(folder, patterns)
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def check(self):
+        """Names of files added, removed or modified since the last check"""
+        current = scan(self.folder, self.patterns)
+        changed = sorted(name for name in set(current) | set(self.snapshot)
+                         if current.get(name) != self.snapshot.get(name))
+        self.snapshot = current
+        return changed
+
+    def open_inotify(self):
+        if INotify is None:
+            return None
+        try:
+            inotify = INotify()
+            inotify.add_watch(self.folder, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE |
+                              flags.DELETE | flags.MODIFY)
+            return inotify
+        except OSError as e:
+            print(f"inotify unavailable, polling instead (non-critical): {e}")
+            return None
+
+    def wait(self, inotify):
+        """Sleep until the next check: an inotify event or the poll interval"""
+        if inotify is not None:
+            inotify.read(timeout=int(self.interval * 1000))
+        else:
+            self.stopped.wait(self.interval)
+
+    def run(self):
+        inotify = self.open_inotify()
+        try:
+            while not self.stopped.is_set():
+                self.wait(inotify)
+                changed = self.check()
+                if not changed:
+                    continue
+                # Wait for the writer to finish before reporting
+                while not self.stopped.wait(self.settle):
+                    more = self.check()
+                    if not more:
+                        break
+                    changed = sorted(set(changed) | set(more))
+                if self.stopped.is_set():
+                    break
+                try:
+                    self.callback(changed)
+                except Exception as e:
+                    print(f"File change handler failed (non-critical): {e}")
+        finally:
+            if inotify is not None:
+                inotify.close()
@@ -4,8 +4,13 @@ Google Sheets Integration Module
 Handles authentication and data export to Google Sheets
 """
 
+import hashlib
 import os
 import pickle
+import threading
+from datetime import datetime, timedelta
+import httplib2
+import google_auth_httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -13,29 +18,166 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import tkinter as tk
 from tkinter import messagebox
+from sheets_scheduler import RequestScheduler, error_status
+from export_snapshots import SnapshotStore
+from subchapter_index import assignment_number
+from sheet_layout import (SECTION_TABS, iter_combined_rows, iter_section_data_rows,
+                          iter_section_multi_column_rows, iter_section_split_rows)
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+TOKEN_FILE = 'token.pickle'
+CREDENTIALS_FILE = 'credentials.json'
+DISCOVERY_CACHE_DIR = '.discovery_cache'
+
+# Snapshot target name of uploads made by this module
+SNAPSHOT_TARGET = 'Google Sheets'
+
+# Refresh the access token this long before it expires
+REFRESH_MARGIN = timedelta(minutes=5)
+
+
+def load_saved_credentials():
+    """Credentials from token.pickle, refreshed if expired. None if there are none usable."""
+    creds = None
+    # The file token.pickle stores the user's access and refresh tokens.
+    if os.path.exists(TOKEN_FILE):
+        with open(TOKEN_FILE, 'rb') as token:
+            creds = pickle.load(token)
+    
+    if creds and not creds.valid:
+        if creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+            save_credentials(creds)
+        else:
+            creds = None
+    return creds
+
+
+def save_credentials(creds):
+    """Save the credentials for the next run"""
+    with open(TOKEN_FILE, 'wb') as token:
+        pickle.dump(creds, token)
+
+
+class FileDiscoveryCache:
+    """Discovery documents kept on disk between runs. Only used by client library
+    versions without bundled (static) discovery documents."""
+    def __init__(self, directory=DISCOVERY_CACHE_DIR):
+        self.directory = directory
+    
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+    
+    def get(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def set(self, url, content):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(url), 'w', encoding='utf-8') as f:
+                f.write(content)
+        except OSError as e:
+            print(f"Discovery cache error (non-critical): {e}")
+
+
+def build_sheets_service(http):
+    """Build the Sheets service without fetching the discovery document over the network"""
+    try:
+        # google-api-python-client >= 2.0 ships the discovery document
+        return build('sheets', 'v4', http=http, static_discovery=True)
+    except TypeError:
+        return build('sheets', 'v4', http=http, cache=FileDiscoveryCache())
+
+
+class SheetsSession:
+    """Authenticated Sheets service shared by every exporter in the process.
+    One keep-alive HTTP connection pool, a discovery document read once, and the
+    access token refreshed in the background before it expires."""
+    _current = None
+    _lock = threading.Lock()
+    
+    def __init__(self, creds):
+        self.creds = creds
+        self.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=60))
+        self.service = build_sheets_service(self.http)
+        # Rate limiting, retries and write coalescing for every API call
+        self.scheduler = RequestScheduler(self.service)
+        self._timer = None
+        self.schedule_refresh()
+    
+    @classmethod
+    def current(cls):
+        return cls._current
+    
+    @classmethod
+    def start(cls, creds):
+        """Return the shared session, creating it from creds if there is none yet"""
+        with cls._lock:
+            if cls._current is None:
+                cls._current = cls(creds)
+            return cls._current
+    
+    @classmethod
+    def close_current(cls):
+        with cls._lock:
+            if cls._current is not None:
+                cls._current.close()
+                cls._current = None
+    
+    def schedule_refresh(self):
+        """Refresh the token REFRESH_MARGIN before its expiry on a daemon timer"""
+        expiry = getattr(self.creds, 'expiry', None)
+        if expiry is None or not getattr(self.creds, 'refresh_token', None):
+            return
+        # google-auth keeps expiry as a naive UTC datetime
+        delay = (expiry - REFRESH_MARGIN - datetime.utcnow()).total_seconds()
+        self._timer = threading.Timer(max(delay, 0), self.refresh)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def refresh(self):
+        try:
+            self.creds.refresh(Request())
+            save_credentials(self.creds)
+        except Exception as e:
+            print(f"Token refresh error (non-critical): {e}")
+            return
+        self.schedule_refresh()
+    
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
 class GoogleSheetsExporter:
     def __init__(self):
         self.service = None
+        self.scheduler = None
         self.authenticated = False
+        # Names skipped by the last export because they are not in "Last, First" form
+        self.rejected_names = []
+        # Payload of every upload, so an unchanged re-export returns the earlier sheet
+        self.snapshots = SnapshotStore()
+        self.reuse_unchanged = True
+        # (Snapshot, reused) of the last export, or None
+        self.last_snapshot = None
     
     def authenticate(self):
-        """Authenticate with Google Sheets API"""
-        creds = None
-        # The file token.pickle stores the user's access and refresh tokens.
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
-                creds = pickle.load(token)
-        
-        # If there are no (valid) credentials available, let the user log in.
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists('credentials.json'):
+        """Authenticate with Google Sheets API (reuses the process-wide session if there is one)"""
+        session = SheetsSession.current()
+        if session is None:
+            creds = load_saved_credentials()
+            
+            # If there are no (valid) credentials available, let the user log in.
+            if not creds:
+                if not os.path.exists(CREDENTIALS_FILE):
                     messagebox.showerror("Error", 
                         "credentials.json file not found!\n\n"
                         "Please follow these steps:\n"
@@ -48,64 +190,52 @@ class GoogleSheetsExporter:
                     return False
                 
                 flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', SCOPES)
+                    CREDENTIALS_FILE, SCOPES)
                 creds = flow.run_local_server(port=0)
+                save_credentials(creds)
             
-            # Save the credentials for the next run
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(creds, token)
+            try:
+                session = SheetsSession.start(creds)
+            except Exception as e:
+                messagebox.showerror("Authentication Error", f"Failed to authenticate: {str(e)}")
+                return False
         
+        self.service = session.service
+        self.scheduler = session.scheduler
+        self.authenticated = True
+        return True
+    
+    def warm_up(self):
+        """Start the shared session from a saved token without any user interaction,
+        so the first export skips authentication and discovery. Safe to run in a thread."""
         try:
-            self.service = build('sheets', 'v4', credentials=creds)
-            self.authenticated = True
-            return True
+            creds = load_saved_credentials()
+            if creds:
+                SheetsSession.start(creds)
         except Exception as e:
-            messagebox.showerror("Authentication Error", f"Failed to authenticate: {str(e)}")
-            return False
+            print(f"Google Sheets warm-up skipped: {e}")
     
-    def create_sheet_with_tabs(self, title):
-        """Create a new Google Sheet with separate tabs for F2, F5, F6"""
+    def create_sheet_with_tabs(self, title, tab_names=None):
+        """Create a new Google Sheet with separate tabs for F2, F5, F6 (or the given tab names)"""
         if not self.authenticated:
             if not self.authenticate():
                 return None
         
+        if tab_names is None:
+            tab_names = [sheet_name for _, sheet_name in SECTION_TABS]
+        
         try:
             spreadsheet = {
                 'properties': {
                     'title': title
                 },
-                'sheets': [
-                    {
-                        'properties': {
-                            'title': 'F2 Section',
-                            'sheetId': 0
-                        }
-                    },
-                    {
-                        'properties': {
-                            'title': 'F5 Section', 
-                            'sheetId': 1
-                        }
-                    },
-                    {
-                        'properties': {
-                            'title': 'F6 Section',
-                            'sheetId': 2
-                        }
-                    },
-                    {
-                        'properties': {
-                            'title': 'Other Students',
-                            'sheetId': 3
-                        }
-                    }
-                ]
+                'sheets': [{'properties': {'title': name, 'sheetId': n}} for n, name in enumerate(tab_names)]
             }
             
-            spreadsheet = self.service.spreadsheets().create(
+            spreadsheet = self.scheduler.execute(self.service.spreadsheets().create(
                 body=spreadsheet,
                 fields='spreadsheetId'
-            ).execute()
+            ), 'spreadsheets.create', idempotent=False)
             
             return spreadsheet.get('spreadsheetId')
         except HttpError as error:
@@ -114,96 +244,120 @@ class GoogleSheetsExporter:
     
     def format_sheet_data(self, assignment_name, f2_grades, f5_grades, f6_grades, other_grades):
         """Format data for Google Sheets export"""
-        data = []
-        
-        # Add header
-        data.append([f"Assignment: {assignment_name}"])
-        data.append([])  # Empty row
-        
-        # F2 Section
-        if f2_grades:
-            data.append(["F2 SECTION"])
-            data.append(["Last Name", "First Name", "Grade"])
-            for student_name, grade in f2_grades:
-                if ',' in student_name:
-                    parts = student_name.split(', ')
-                    if len(parts) >= 2:
-                        last_name = parts[0].strip()
-                        first_name = parts[1].strip()
-                        data.append([last_name, first_name, grade])
-            data.append([])  # Empty row
-        
-        # F5 Section
-        if f5_grades:
-            data.append(["F5 SECTION"])
-            data.append(["Last Name", "First Name", "Grade"])
-            for student_name, grade in f5_grades:
-                if ',' in student_name:
-                    parts = student_name.split(', ')
-                    if len(parts) >= 2:
-                        last_name = parts[0].strip()
-                        first_name = parts[1].strip()
-                        data.append([last_name, first_name, grade])
-            data.append([])  # Empty row
-        
-        # F6 Section
-        if f6_grades:
-            data.append(["F6 SECTION"])
-            data.append(["Last Name", "First Name", "Grade"])
-            for student_name, grade in f6_grades:
-                if ',' in student_name:
-                    parts = student_name.split(', ')
-                    if len(parts) >= 2:
-                        last_name = parts[0].strip()
-                        first_name = parts[1].strip()
-                        data.append([last_name, first_name, grade])
-            data.append([])  # Empty row
-        
-        # Other students
-        if other_grades:
-            data.append(["OTHER STUDENTS"])
-            data.append(["Last Name", "First Name", "Grade"])
-            for student_name, grade in other_grades:
-                if ',' in student_name:
-                    parts = student_name.split(', ')
-                    if len(parts) >= 2:
-                        last_name = parts[0].strip()
-                        first_name = parts[1].strip()
-                        data.append([last_name, first_name, grade])
-        
-        return data
+        return list(iter_combined_rows(assignment_name, f2_grades, f5_grades, f6_grades, other_grades))
     
     def export_to_sheets(self, assignment_name, f2_grades, f5_grades, f6_grades, other_grades):
         """Export assignment grades to Google Sheets with separate tabs"""
+        self.rejected_names = []
+        
+        # Rows of each non-empty section tab (layout shared with the local exporters)
+        tabs = []
+        for sheet_name, grades_data in (('F2 Section', f2_grades), ('F5 Section', f5_grades),
+                                        ('F6 Section', f6_grades), ('Other Students', other_grades)):
+            if grades_data:
+                tabs.append((sheet_name, list(iter_section_data_rows(
+                    sheet_name, grades_data, assignment_name, self.rejected_names))))
+        
+        # Keyed by assignment ID, so a renamed assignment still finds its earlier uploads
+        number = assignment_number(assignment_name)
+        return self.upload_tabs(f"Assignment Grades - {assignment_name}", tabs, None,
+                                self.format_all_sheets, "Failed to write data",
+                                key=f"assignment:{number}" if number else None)
+    
+    def export_report_to_sheets(self, title, tabs):
+        """Export report tabs [(tab name, rows), ...] to a new spreadsheet"""
+        tabs = [(tab_name, list(rows)) for tab_name, rows in tabs]
+        return self.upload_tabs(title, tabs, [tab_name for tab_name, _ in tabs],
+                                lambda spreadsheet_id: self.format_report_sheets(spreadsheet_id, tabs),
+                                "Failed to write report")
+    
+    def upload_tabs(self, title, tabs, tab_names, format_sheets, error_message, key=None):
+        """Create a spreadsheet, write the tabs [(tab name, rows)] in one values().batchUpdate
+        and format it. If the last upload under this title (or snapshot key) had exactly the
+        same payload and that sheet still exists, its URL is returned instead (set
+        reuse_unchanged to False to always upload a new copy)."""
+        self.last_snapshot = None
+        previous = None
+        if self.reuse_unchanged:
+            try:
+                previous = self.snapshots.find_unchanged(title, SNAPSHOT_TARGET, tabs, key)
+            except Exception as e:
+                print(f"Snapshot lookup error (non-critical): {e}")
+        
         if not self.authenticated:
             if not self.authenticate():
                 return None
+        if previous is not None and self.sheet_exists(previous.location):
+            self.last_snapshot = (previous, True)
+            return previous.location
+        # The status bar reports the requests of this export only
+        self.scheduler.reset_metrics()
         
-        # Create new sheet with tabs
-        sheet_title = f"Assignment Grades - {assignment_name}"
-        spreadsheet_id = self.create_sheet_with_tabs(sheet_title)
-        
+        spreadsheet_id = self.create_sheet_with_tabs(title, tab_names)
         if not spreadsheet_id:
             return None
         
         try:
-            # Write data to each sheet tab
-            self.write_section_data(spreadsheet_id, 'F2 Section', f2_grades, assignment_name)
-            self.write_section_data(spreadsheet_id, 'F5 Section', f5_grades, assignment_name)
-            self.write_section_data(spreadsheet_id, 'F6 Section', f6_grades, assignment_name)
-            self.write_section_data(spreadsheet_id, 'Other Students', other_grades, assignment_name)
+            # Queued per tab, sent together by flush()
+            for tab_name, rows in tabs:
+                self.scheduler.queue_values_update(spreadsheet_id, f"'{tab_name}'!A1", rows)
+            self.scheduler.flush(spreadsheet_id)
             
-            # Format all sheets
-            self.format_all_sheets(spreadsheet_id)
+            format_sheets(spreadsheet_id)
             
-            # Get the sheet URL
             sheet_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
-            
-            return sheet_url
-            
+        
         except HttpError as error:
-            messagebox.showerror("Error", f"Failed to write data: {error}")
+            messagebox.showerror("Error", f"{error_message}: {error}")
             return None
+        
+        try:
+            self.last_snapshot = (self.snapshots.record(title, SNAPSHOT_TARGET, tabs, sheet_url, key), False)
+        except Exception as e:
+            print(f"Snapshot error (non-critical): {e}")
+        return sheet_url
+    
+    def sheet_exists(self, sheet_url):
+        """False if the spreadsheet of an earlier upload was deleted or is no longer ours"""
+        spreadsheet_id = sheet_url.rstrip('/').rsplit('/', 1)[-1]
+        try:
+            self.scheduler.execute(self.service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id, fields='spreadsheetId'), 'spreadsheets.get')
+            return True
+        except HttpError as error:
+            if error_status(error) in (403, 404):
+                return False
+            print(f"Sheet check error (non-critical): {error}")
+            return True
+    
+    def format_report_sheets(self, spreadsheet_id, tabs):
+        """Bold title rows and auto-resize the columns of report tabs"""
+        try:
+            requests = []
+            for sheet_id, (_, rows) in enumerate(tabs):
+                requests.append({
+                    'repeatCell': {
+                        'range': {'sheetId': sheet_id, 'startRowIndex': 0, 'endRowIndex': 3},
+                        'cell': {'userEnteredFormat': {'textFormat': {'bold': True}}},
+                        'fields': 'userEnteredFormat.textFormat'
+                    }
+                })
+                requests.append({
+                    'autoResizeDimensions': {
+                        'dimensions': {
+                            'sheetId': sheet_id,
+                            'dimension': 'COLUMNS',
+                            'startIndex': 0,
+                            'endIndex': max((len(r) for r in rows), default=1)
+                        }
+                    }
+                })
+            self.scheduler.execute(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={'requests': requests}
+            ), 'spreadsheets.batchUpdate')
+        except HttpError as error:
+            print(f"Formatting error (non-critical): {error}")
     
     def format_sheet(self, spreadsheet_id):
         """Apply formatting to the Google Sheet"""
@@ -272,167 +426,35 @@ class GoogleSheetsExporter:
                 'requests': requests
             }
             
-            self.service.spreadsheets().batchUpdate(
+            self.scheduler.execute(self.service.spreadsheets().batchUpdate(
                 spreadsheetId=spreadsheet_id,
                 body=body
-            ).execute()
+            ), 'spreadsheets.batchUpdate')
             
         except HttpError as error:
             print(f"Formatting error (non-critical): {error}")
     
-    def write_section_data(self, spreadsheet_id, sheet_name, grades_data, assignment_name):
-        """Write data to a specific sheet tab"""
-        if not grades_data:
-            return
-        
-        # Format data for this section
-        data = []
-        data.append([f"Assignment: {assignment_name}"])
-        data.append([f"Section: {sheet_name}"])
-        data.append([])  # Empty row
-        data.append(["Last Name", "First Name", "Grade"])
-        
-        for student_name, grade in grades_data:
-            if ',' in student_name:
-                parts = student_name.split(', ')
-                if len(parts) >= 2:
-                    last_name = parts[0].strip()
-                    first_name = parts[1].strip()
-                    data.append([last_name, first_name, grade])
-        
-        # Write data to the specific sheet
-        body = {
-            'values': data
-        }
-        
-        self.service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range=f"'{sheet_name}'!A1",
-            valueInputOption='RAW',
-            body=body
-        ).execute()
-
     def write_section_multi_columns(self, spreadsheet_id, sheet_name, header_assignments, rows):
         """Write data to a specific sheet tab where rows already contain [Last, First, grade1, grade2, ...]
-        header_assignments is a list of assignment column headers (strings)"""
+        header_assignments is a list of assignment column headers (strings)
+        (queued until self.scheduler.flush())"""
         if not rows:
             return
 
-        data = []
-        data.append([f"Sub-chapter export"])  # Title row
-        data.append([f"Section: {sheet_name}"])
-        data.append([])
-
-        # Column headers: Last Name, First Name, then each assignment, then Total
-        header = ["Last Name", "First Name"] + header_assignments + ["Total"]
-        data.append(header)
-
-        # Append all rows (assumed already in Last, First, grade1... order)
-        for r in rows:
-            # compute total for the grade columns (elements after first two)
-            try:
-                grades = r[2:]
-            except Exception:
-                grades = []
-            total = 0.0
-            for g in grades:
-                try:
-                    # allow numeric values or numeric strings
-                    total += float(g)
-                except Exception:
-                    # ignore blanks or non-numeric
-                    continue
-            new_row = list(r) + [total]
-            data.append(new_row)
+        data = list(iter_section_multi_column_rows(sheet_name, header_assignments, rows))
 
-        body = {'values': data}
-
-        self.service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range=f"'{sheet_name}'!A1",
-            valueInputOption='RAW',
-            body=body
-        ).execute()
+        # Queued; sent together with the other tabs by scheduler.flush()
+        self.scheduler.queue_values_update(spreadsheet_id, f"'{sheet_name}'!A1", data)
 
     def export_subchapter_to_sheets(self, subchapter, assignments, sections_dict):
         """Export multiple assignments (assignments list) organized by section (sections_dict)
-        sections_dict should be a dict: {'F2': [[last,first,g1,g2...], ...], 'F5': [...], 'F6': [...], 'Other': [...]}"""
-        if not self.authenticated:
-            if not self.authenticate():
-                return None
-
-        sheet_title = f"Subchapter {subchapter} Grades"
-        spreadsheet_id = self.create_sheet_with_tabs(sheet_title)
-        if not spreadsheet_id:
-            return None
-
-        try:
-            # Write each section using the split writer (submitted / not_submitted)
-            self.write_section_split(spreadsheet_id, 'F2 Section', assignments, sections_dict.get('F2', {'submitted': [], 'not_submitted': []}))
-            self.write_section_split(spreadsheet_id, 'F5 Section', assignments, sections_dict.get('F5', {'submitted': [], 'not_submitted': []}))
-            self.write_section_split(spreadsheet_id, 'F6 Section', assignments, sections_dict.get('F6', {'submitted': [], 'not_submitted': []}))
-            self.write_section_split(spreadsheet_id, 'Other Students', assignments, sections_dict.get('Other', {'submitted': [], 'not_submitted': []}))
-
-            # Try to apply formatting for these sheets (auto-resize columns etc.)
-            self.format_all_sheets(spreadsheet_id)
-
-            sheet_url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
-            return sheet_url
-
-        except HttpError as error:
-            messagebox.showerror("Error", f"Failed to write subchapter data: {error}")
-            return None
-
-    def write_section_split(self, spreadsheet_id, sheet_name, header_assignments, section_data):
-        """Write a sheet with a legend and two blocks: Submitted and Not submitted.
-        section_data is a dict {'submitted': [rows], 'not_submitted': [rows]}"""
-        submitted = section_data.get('submitted', [])
-        not_sub = section_data.get('not_submitted', [])
-
-        data = []
-        data.append([f"Sub-chapter: {header_assignments[0].split()[0] if header_assignments else ''}"])
-        data.append([f"Section: {sheet_name}"])
-        data.append(["Legend:", "Blank cell = no submission"])
-        data.append([])
-
-        # Submitted block
-        data.append(["Submitted"])
-        header = ["Last Name", "First Name"] + header_assignments + ["Total"]
-        data.append(header)
-        for r in submitted:
-            # compute total for the grade columns (elements after first two)
-            grades = r[2:]
-            total = 0.0
-            for g in grades:
-                try:
-                    total += float(g)
-                except Exception:
-                    continue
-            data.append(list(r) + [total])
-
-        data.append([])
-
-        # Not submitted block
-        data.append(["Not submitted"])
-        data.append(header)
-        for r in not_sub:
-            grades = r[2:]
-            total = 0.0
-            for g in grades:
-                try:
-                    total += float(g)
-                except Exception:
-                    continue
-            data.append(list(r) + [total])
-
-        body = {'values': data}
-
-        self.service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range=f"'{sheet_name}'!A1",
-            valueInputOption='RAW',
-            body=body
-        ).execute()
+        sections_dict should be a dict: {'F2': {'submitted': [...], 'not_submitted': [...]}, 'F5': ..., 'F6': ..., 'Other': ...}
+        Each tab has a legend and two blocks: Submitted and Not submitted."""
+        tabs = [(sheet_name, list(iter_section_split_rows(
+                    sheet_name, assignments, sections_dict.get(key, {'submitted': [], 'not_submitted': []}))))
+                for key, sheet_name in SECTION_TABS]
+        return self.upload_tabs(f"Subchapter {subchapter} Grades", tabs, None,
+                                self.format_all_sheets, "Failed to write subchapter data")
     
     def format_all_sheets(self, spreadsheet_id):
         """Apply formatting to all sheets in the spreadsheet"""
@@ -505,10 +527,10 @@ class GoogleSheetsExporter:
                     'requests': requests
                 }
                 
-                self.service.spreadsheets().batchUpdate(
+                self.scheduler.execute(self.service.spreadsheets().batchUpdate(
                     spreadsheetId=spreadsheet_id,
                     body=body
-                ).execute()
+                ), 'spreadsheets.batchUpdate')
                 
         except HttpError as error:
             print(f"Formatting error (non-critical): {error}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Grade Adapters Module
+Readers for gradebook exports: the Canvas / Project Stem CSV, TSV, Excel (.xlsx) and
+JSON. Every adapter only turns its file into rows of text cells; open_export() then
+finds the header, skips the "Points Possible" rows and sorts the columns into
+student information, assignments and the course score summary (ColumnPlan), so the
+rest of the app reads one shape whatever the file type.
+"""
+
+import csv
+import itertools
+import json
+import os
+import re
+from collections import namedtuple
+
+from subchapter_index import assignment_number
+
+try:
+    import openpyxl
+except ImportError:  # Excel import is optional
+    openpyxl = None
+
+# Header (lower case) -> student information field
+META_FIELDS = {
+    'student': 'name', 'name': 'name', 'student name': 'name',
+    'id': 'id', 'student id': 'id',
+    'sis user id': 'sis_user_id',
+    'sis login id': 'sis_login_id', 'login id': 'sis_login_id',
+    'section': 'section', 'sections': 'section',
+    'integration id': 'integration_id',
+    'root account': 'root_account',
+}
+
+# Rows between the header and the students; the first one holds the points possible
+PREAMBLE_ROWS = ('Points Possible', 'Manual Posting')
+
+# Canvas marks computed columns as read only in the points row
+READ_ONLY = '(read only)'
+
+# Course totals such as "Tests Current Score" or "Unposted Final Grade"
+SUMMARY_HEADER = re.compile(r'^(.+ )?(Unposted )?(Current|Final) (Score|Grade|Points)$')
+
+# flavor: 'canvas' for the Canvas / Project Stem layout, 'generic' for any table with a
+# student name column. meta: {field: column}. assignments and summary: [(column, header)].
+# points: {column: points possible cell}
+ColumnPlan = namedtuple('ColumnPlan', ['flavor', 'meta', 'assignments', 'summary', 'points'])
+
+
+def is_summary_column(header, points_cell=''):
+    if points_cell.strip() == READ_ONLY:
+        return True
+    header = header.strip()
+    # Assignment headers end in their ID, e.g. "1.1 Lesson Practice (23118480)"
+    return assignment_number(header) is None and bool(SUMMARY_HEADER.match(header))
+
+
+def plan_columns(header, points=None):
+    """Sort the columns of a header row into student information, assignments and summary"""
+    points = points or []
+    meta = {}
+    assignments = []
+    summary = []
+    for column, title in enumerate(header):
+        field = META_FIELDS.get(title.strip().lower())
+        if field is not None and field not in meta:
+            meta[field] = column
+            continue
+        if not title.strip():
+            continue
+        cell = points[column] if column < len(points) else ''
+        (summary if is_summary_column(title, cell) else assignments).append((column, title))
+
+    if 'name' not in meta:
+        raise ValueError("No student name column in the grades file")
+    canvas = header[0].strip() == 'Student' and 'id' in meta and 'section' in meta
+    point_cells = {column: points[column] for column, _ in assignments + summary if column < len(points)}
+    return ColumnPlan('canvas' if canvas else 'generic', meta, assignments, summary, point_cells)
+
+
+class GradeAdapter:
+    """Base class: subclasses provide rows(), yielding every row of the export (header
+    first) as a list of strings and keeping self.read, the bytes (or an estimate) read
+    so far, up to date"""
+    display_name = 'Grades file'
+    extensions = ()
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.size = os.path.getsize(filename)
+        self.read = 0
+
+    def rows(self):
+        raise NotImplementedError
+
+
+class CsvAdapter(GradeAdapter):
+    display_name = 'CSV'
+    extensions = ('.csv',)
+    delimiter = ','
+
+    def lines(self, raw):
+        for line in raw:
+            self.read += len(line)
+            yield line.decode('utf-8')
+
+    def rows(self):
+        with open(self.filename, 'rb') as raw:
+            yield from csv.reader(self.lines(raw), delimiter=self.delimiter)
+
+
+class TsvAdapter(CsvAdapter):
+    display_name = 'TSV'
+    extensions = ('.tsv', '.tab')
+    delimiter = '\t'
+
+
+def cell_text(value):
+    """Spreadsheet or JSON cell -> the text the CSV export would hold"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return f"{value:.2f}"
+    return str(value)
+
+
+class XlsxAdapter(GradeAdapter):
+    """First worksheet of an Excel workbook (needs openpyxl)"""
+    display_name = 'Excel'
+    extensions = ('.xlsx', '.xlsm')
+
+    def rows(self):
+        if openpyxl is None:
+            raise ImportError("Reading Excel gradebooks needs openpyxl (pip install openpyxl)")
+        book = openpyxl.load_workbook(self.filename, read_only=True, data_only=True)
+        try:
+            sheet = book.worksheets[0]
+            total = sheet.max_row or 1
+            for number, values in enumerate(sheet.iter_rows(values_only=True), 1):
+                # Workbooks are compressed as a whole, so progress is estimated by row
+                self.read = self.size * min(number, total) // total
+                yield [cell_text(v) for v in values]
+        finally:
+            book.close()
+
+
+class JsonAdapter(GradeAdapter):
+    """A list of {header: cell} objects, or {"columns": [...], "data": [[...], ...]}
+    (pandas' "records" and "split" layouts)"""
+    display_name = 'JSON'
+    extensions = ('.json',)
+
+    def rows(self):
+        with open(self.filename, encoding='utf-8') as f:
+            document = json.load(f)
+        self.read = self.size
+        if isinstance(document, dict):
+            yield [str(c) for c in document.get('columns', [])]
+            for values in document.get('data', []):
+                yield [cell_text(v) for v in values]
+            return
+        header = []
+        for item in document:
+            header.extend(key for key in item if key not in header)
+        yield header
+        for item in document:
+            yield [cell_text(item.get(key)) for key in header]
+
+
+ADAPTERS = [CsvAdapter, TsvAdapter, XlsxAdapter, JsonAdapter]
+
+
+def adapter_for(filename):
+    """Adapter for a grades file, picked by extension (CSV for anything unknown)"""
+    extension = os.path.splitext(filename)[1].lower()
+    for adapter in ADAPTERS:
+        if extension in adapter.extensions:
+            return adapter(filename)
+    return CsvAdapter(filename)
+
+
+def open_export(filename):
+    """(adapter, ColumnPlan, iterator over the student rows) for a grades file"""
+    adapter = adapter_for(filename)
+    rows = adapter.rows()
+    header = next(rows, None)
+    if not header:
+        raise ValueError("The grades file is empty")
+    header[0] = header[0].lstrip('\ufeff')
+
+    # Name column of the header, to recognise the rows that hold no student
+    name_column = next((c for c, h in enumerate(header) if META_FIELDS.get(h.strip().lower()) == 'name'), 0)
+    points = None
+    first = None
+    for row in rows:
+        label = row[name_column].strip() if name_column < len(row) else ''
+        if label not in PREAMBLE_ROWS:
+            first = row
+            break
+        if label == PREAMBLE_ROWS[0]:
+            points = row
+
+    plan = plan_columns(header, points)
+    return adapter, plan, rows if first is None else itertools.chain([first], rows)
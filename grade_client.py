@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Grade Client
+Command-line client for grade_server.py: queries the running server instead of
+loading grades.csv again.
+Usage:
+  python grade_client.py student "Jane Doe"
+  python grade_client.py assignment "1.3 Code Practice: Question 1 (23120662)"
+  python grade_client.py subchapter 1.4
+  python grade_client.py stats [assignment]
+  python grade_client.py course ["Current Score"] [F2]
+  python grade_client.py history ["Jane Doe"] [assignment]   ("" leaves the student out)
+  python grade_client.py students | assignments | health
+"""
+
+import argparse
+import json
+import sys
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from grade_server import DEFAULT_HOST, DEFAULT_PORT
+
+# command -> query parameters taking the command's arguments, in order
+COMMANDS = {
+    'health': (),
+    'students': (),
+    'assignments': (),
+    'student': ('name',),
+    'assignment': ('name',),
+    'subchapter': ('q',),
+    'stats': ('assignment',),
+    'course': ('column', 'section'),
+    'history': ('student', 'assignment'),
+}
+
+
+def command_params(command, arguments):
+    """Query parameters of a command's arguments; empty arguments are left out"""
+    names = COMMANDS[command]
+    if len(arguments) > len(names):
+        raise ValueError(f"'{command}' takes at most {len(names)} argument(s)")
+    return {name: value for name, value in zip(names, arguments) if value}
+
+
+def query(endpoint, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=10, **params):
+    """GET /<endpoint>?params from the grade server and return the decoded JSON.
+    Raises Exception with the server's error message for 4xx/5xx answers."""
+    url = f"http://{host}:{port}/{endpoint}"
+    if params:
+        url += '?' + urlencode(params)
+    try:
+        with urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except HTTPError as e:
+        try:
+            message = json.loads(e.read().decode('utf-8')).get('error', str(e))
+        except ValueError:
+            message = str(e)
+        raise Exception(message)
+    except URLError as e:
+        raise Exception(f"Grade server not reachable at {host}:{port} ({e.reason})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query a running grade_server.py')
+    parser.add_argument('command', choices=list(COMMANDS))
+    parser.add_argument('arguments', nargs='*')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    try:
+        params = command_params(args.command, args.arguments)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        result = query(args.command, args.host, args.port, **params)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
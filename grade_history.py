@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Grade History Module
+Append-only archive of every grades download, so progress over time can be asked
+for without keeping the old CSV files: when a student submitted something, how a
+score changed, how an assignment's submissions grew. Each snapshot stores only the
+numeric cells that changed since the previous one (every KEYFRAME_EVERY-th stores
+all of them) as three packed columns - student, assignment, value - compressed with
+zlib. Students are keyed by ID and assignments by their numeric ID, so renamed or
+reordered columns keep their series.
+Usage:
+  python grade_history.py add [FILE ...]          archive grades downloads (default: grades.csv)
+  python grade_history.py list
+  python grade_history.py student "Jane Doe"      submitted count and points per snapshot
+  python grade_history.py assignment 23120662     submissions and mean grade per snapshot
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from gradebook import GRADES_CSV, display_name, normalize_name, load_grades
+
+HISTORY_DIR = '.grade_history'
+
+# A snapshot with every cell after this many deltas, so a lost file only breaks one stretch
+KEYFRAME_EVERY = 20
+
+# Seconds to wait for another writer, and after which a lock file is taken as left behind
+LOCK_TIMEOUT = 30
+LOCK_STALE = 120
+
+# Value of a cell that was cleared since the previous snapshot
+CLEARED = float('nan')
+
+# Download time in Canvas file names: "2025-09-13T1722_Grades-..."
+DOWNLOAD_TIME_RE = re.compile(r'(\d{4}-\d{2}-\d{2})T(\d{2})(\d{2})')
+
+# kind: 'full' or 'delta'; taken: ISO time of the download; cells: cells stored in the file;
+# digest: hash of every cell of the download, to skip archiving the same one twice
+SnapshotInfo = namedtuple('SnapshotInfo', ['seq', 'taken', 'kind', 'file', 'digest', 'students', 'cells'])
+
+StudentPoint = namedtuple('StudentPoint', ['taken', 'submitted', 'points'])
+AssignmentPoint = namedtuple('AssignmentPoint', ['taken', 'submitted', 'mean'])
+
+
+def download_time(path):
+    """When a grades file was downloaded: from the Canvas file name if it has the
+    time stamp, else the file's modification time"""
+    match = DOWNLOAD_TIME_RE.search(os.path.basename(path))
+    if match:
+        return f"{match.group(1)}T{match.group(2)}:{match.group(3)}:00"
+    return datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+
+
+def pack(rows, cols, values):
+    """Three equal-length columns -> compressed bytes"""
+    head = json.dumps({'n': len(rows), 'byteorder': sys.byteorder,
+                       'sizes': [rows.itemsize, cols.itemsize, values.itemsize]}).encode('utf-8')
+    return zlib.compress(head + b'\n' + rows.tobytes() + cols.tobytes() + values.tobytes(), 6)
+
+
+def unpack(data):
+    head, _, body = zlib.decompress(data).partition(b'\n')
+    meta = json.loads(head)
+    columns = []
+    offset = 0
+    for typecode, size in zip('IId', meta['sizes']):
+        column = array(typecode)
+        if column.itemsize != size:
+            raise ValueError("Snapshot written on a platform with other array sizes")
+        column.frombytes(body[offset:offset + size * meta['n']])
+        offset += size * meta['n']
+        if meta['byteorder'] != sys.byteorder:
+            column.byteswap()
+        columns.append(column)
+    return columns
+
+
+class GradeHistory:
+    """The archive in one folder: keys.json (student IDs and names, assignment keys and
+    headers, in first-seen order; snapshots refer to them by position), log.jsonl (one
+    SnapshotInfo per line) and snapshots/<seq>.bin.z"""
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self.keys_path = os.path.join(root, 'keys.json')
+        self.log_path = os.path.join(root, 'log.jsonl')
+        self.lock_path = os.path.join(root, 'lock')
+        self.read_keys()
+
+    def read_keys(self):
+        self.students = []       # student IDs
+        self.names = []          # grades-file name of each student (latest seen)
+        self.assignments = []    # assignment IDs, or headers without an ID
+        self.headers = []        # latest header of each assignment
+        try:
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                keys = json.load(f)
+            self.students, self.names = keys['students'], keys['names']
+            self.assignments, self.headers = keys['assignments'], keys['headers']
+        except FileNotFoundError:
+            pass
+        self.student_pos = {sid: i for i, sid in enumerate(self.students)}
+        self.assignment_pos = {key: i for i, key in enumerate(self.assignments)}
+        self._events = None
+
+    @contextmanager
+    def locked(self):
+        """Hold the archive's lock file: the app's loader and watcher threads and the
+        server may archive into the same folder at once"""
+        os.makedirs(self.root, exist_ok=True)
+        deadline = time.time() + LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    # Left behind by a process that died while archiving
+                    if time.time() - os.path.getmtime(self.lock_path) > LOCK_STALE:
+                        os.remove(self.lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Grade history is locked ({self.lock_path})")
+                time.sleep(0.02)
+        try:
+            os.write(fd, str(os.getpid()).encode('ascii'))
+            os.close(fd)
+            yield
+        finally:
+            os.remove(self.lock_path)
+
+    def snapshots(self):
+        """SnapshotInfo of every archived download, oldest first"""
+        infos = []
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        infos.append(SnapshotInfo(**json.loads(line)))
+        except FileNotFoundError:
+            pass
+        return infos
+
+    def events(self):
+        """[(SnapshotInfo, rows, cols, values)] of every snapshot, decoded once"""
+        if self._events is None:
+            self._events = []
+            for info in self.snapshots():
+                with open(os.path.join(self.root, info.file), 'rb') as f:
+                    self._events.append((info,) + tuple(unpack(f.read())))
+        return self._events
+
+    def state(self):
+        """{(student position, assignment position): value} of the latest snapshot"""
+        cells = {}
+        for info, rows, cols, values in self.events():
+            if info.kind == 'full':
+                cells = {}
+            for r, c, v in zip(rows, cols, values):
+                if math.isnan(v):
+                    cells.pop((r, c), None)
+                else:
+                    cells[r, c] = v
+        return cells
+
+    def cells_of(self, layout, records):
+        """{(student position, assignment position): value} of a download's numeric cells,
+        adding students and assignments not seen before to the keys"""
+        columns = []
+        for column, header in enumerate(layout.assignments):
+            key = layout.key(column)
+            if key not in self.assignment_pos:
+                self.assignment_pos[key] = len(self.assignments)
+                self.assignments.append(key)
+                self.headers.append(header)
+            position = self.assignment_pos[key]
+            self.headers[position] = header
+            columns.append(position)
+        cells = {}
+        for record in records:
+            sid = record.id or record.name
+            if sid not in self.student_pos:
+                self.student_pos[sid] = len(self.students)
+                self.students.append(sid)
+                self.names.append(record.name)
+            row = self.student_pos[sid]
+            self.names[row] = record.name
+            for column, grade in record.iter_submitted():
+                if isinstance(grade, float):
+                    cells[row, columns[column]] = grade
+        return cells
+
+    def add(self, layout, records, taken):
+        """Archive one download; returns its SnapshotInfo, or None if it is the same as
+        the latest snapshot"""
+        with self.locked():
+            # Another writer may have added students, assignments or snapshots since
+            self.read_keys()
+            return self._add(layout, records, taken)
+
+    def _add(self, layout, records, taken):
+        cells = self.cells_of(layout, records)
+        digest = hashlib.sha256(json.dumps(sorted(cells.items())).encode('utf-8')).hexdigest()
+        infos = self.snapshots()
+        if infos and infos[-1].digest == digest:
+            return None
+
+        since_full = 0
+        for info in reversed(infos):
+            if info.kind == 'full':
+                break
+            since_full += 1
+        if not infos or since_full + 1 >= KEYFRAME_EVERY:
+            kind, stored = 'full', sorted(cells.items())
+        else:
+            previous = self.state()
+            changed = [(k, v) for k, v in cells.items() if previous.get(k) != v]
+            cleared = [(k, CLEARED) for k in previous if k not in cells]
+            kind, stored = 'delta', sorted(changed + cleared)
+
+        seq = len(infos) + 1
+        info = SnapshotInfo(seq, taken, kind, os.path.join('snapshots', f"{seq:06d}.bin.z"), digest,
+                            len(records), len(stored))
+        rows = array('I', (r for (r, _), _ in stored))
+        cols = array('I', (c for (_, c), _ in stored))
+        values = array('d', (v for _, v in stored))
+        os.makedirs(os.path.join(self.root, 'snapshots'), exist_ok=True)
+        path = os.path.join(self.root, info.file)
+        if os.path.exists(path):
+            # Written by an add that died before logging it
+            os.remove(path)
+        # O_EXCL: never overwrite a snapshot another writer just made, even if the lock was broken
+        with os.fdopen(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)), 'wb') as f:
+            f.write(pack(rows, cols, values))
+        keys = {'students': self.students, 'names': self.names,
+                'assignments': self.assignments, 'headers': self.headers}
+        self._write(self.keys_path, json.dumps(keys, ensure_ascii=False).encode('utf-8'))
+        # The log line goes last: a snapshot only exists once it is logged
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(info._asdict()) + '\n')
+        self._events = None
+        return info
+
+    def _write(self, path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def find_student(self, student):
+        """Position of a student given by ID, grades-file name or display name (None if unknown)"""
+        if student in self.student_pos:
+            return self.student_pos[student]
+        wanted = normalize_name(student)
+        for position, name in enumerate(self.names):
+            if wanted in (normalize_name(name), normalize_name(display_name(name))):
+                return position
+        return None
+
+    def find_assignment(self, assignment):
+        """Position of an assignment given by ID (int or digits) or header (None if unknown)"""
+        if isinstance(assignment, str) and assignment.strip().isdigit():
+            assignment = int(assignment)
+        if assignment in self.assignment_pos:
+            return self.assignment_pos[assignment]
+        if assignment in self.headers:
+            return self.headers.index(assignment)
+        return None
+
+    def _series(self, match):
+        """Yield (SnapshotInfo, {other position: value}) after every snapshot for the cells
+        whose row (match = (0, row)) or column (match = (1, column)) is fixed"""
+        axis, wanted = match
+        current = {}
+        for info, rows, cols, values in self.events():
+            if info.kind == 'full':
+                current = {}
+            fixed, other = (rows, cols) if axis == 0 else (cols, rows)
+            for i, position in enumerate(fixed):
+                if position == wanted:
+                    if math.isnan(values[i]):
+                        current.pop(other[i], None)
+                    else:
+                        current[other[i]] = values[i]
+            yield info, current
+
+    def student_curve(self, student):
+        """[StudentPoint] per snapshot: how many assignments a student had submitted and
+        their total points (empty for unknown students)"""
+        row = self.find_student(student)
+        if row is None:
+            return []
+        return [StudentPoint(info.taken, len(cells), sum(cells.values()))
+                for info, cells in self._series((0, row))]
+
+    def assignment_curve(self, assignment):
+        """[AssignmentPoint] per snapshot: submissions and mean grade of one assignment"""
+        column = self.find_assignment(assignment)
+        if column is None:
+            return []
+        return [AssignmentPoint(info.taken, len(cells), sum(cells.values()) / len(cells) if cells else None)
+                for info, cells in self._series((1, column))]
+
+    def cell_history(self, student, assignment):
+        """[(taken, grade or None)] for every snapshot in which one student's grade for
+        one assignment changed; the first entry is when it was first submitted"""
+        row = self.find_student(student)
+        column = self.find_assignment(assignment)
+        if row is None or column is None:
+            return []
+        changes = []
+        last = None
+        for info, cells in self._series((0, row)):
+            value = cells.get(column)
+            if value != last:
+                changes.append((info.taken, value))
+                last = value
+        return changes
+
+
+def archive_download(path, workdir='.', layout=None, records=None):
+    """Archive a grades file (already loaded as layout/records, or read here) in the
+    history folder of workdir; returns the new SnapshotInfo or None"""
+    if records is None:
+        layout, records = load_grades(path)
+    return GradeHistory(os.path.join(workdir, HISTORY_DIR)).add(layout, records, download_time(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive grades downloads and query how grades changed')
+    parser.add_argument('--dir', default='.', help='folder holding the .grade_history archive')
+    sub = parser.add_subparsers(dest='command', required=True)
+    add_parser = sub.add_parser('add')
+    add_parser.add_argument('files', nargs='*', default=[GRADES_CSV])
+    sub.add_parser('list')
+    student_parser = sub.add_parser('student')
+    student_parser.add_argument('name', help='student ID or name')
+    student_parser.add_argument('assignment', nargs='?', help='only this assignment (ID or name)')
+    assignment_parser = sub.add_parser('assignment')
+    assignment_parser.add_argument('assignment', help='assignment ID or name')
+    args = parser.parse_args()
+
+    history = GradeHistory(os.path.join(args.dir, HISTORY_DIR))
+    try:
+        if args.command == 'add':
+            # Oldest download first, so deltas run forward in time
+            for path in sorted(args.files, key=download_time):
+                info = archive_download(path, args.dir)
+                print(f"{path}: " + (f"snapshot {info.seq} ({info.kind}, {info.cells} cells)" if info
+                                     else "same as the latest snapshot"))
+        elif args.command == 'list':
+            for info in history.snapshots():
+                print(f"{info.seq:>4}  {info.taken}  {info.kind:<5}  {info.students} students  {info.cells} cells")
+        elif args.command == 'student' and args.assignment:
+            for taken, grade in history.cell_history(args.name, args.assignment):
+                print(f"{taken}  {'-' if grade is None else grade}")
+        elif args.command == 'student':
+            for point in history.student_curve(args.name):
+                print(f"{point.taken}  {point.submitted:>4} submitted  {point.points:8.2f} points")
+        else:
+            for point in history.assignment_curve(args.assignment):
+                mean = '-' if point.mean is None else f"{point.mean:.2f}"
+                print(f"{point.taken}  {point.submitted:>4} submitted  mean {mean}")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Grade Reports Module
+The reports of menu options 1-3 without Tk: builders are plain functions from a
+Gradebook query to a namedtuple, and render() turns one into the text the app shows
+(the app's results area displays that text) or a printable HTML page. Scripts, tests
+and benchmarks call the same code as the app.
+Usage:
+  python grade_reports.py grade "Jane Doe" 23120662      option 1
+  python grade_reports.py student "Jane Doe"              option 2
+  python grade_reports.py assignment 23120662 [--format html]   option 3
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+from html import escape
+
+from gradebook import Gradebook, GRADES_CSV, ALL_SECTIONS, use_locale_collation
+from student_reports import HTML_PAGE, student_report, report_context, report_text, report_html
+
+# Option 1; grade is None when the student has not submitted the assignment
+GradeLookup = namedtuple('GradeLookup', ['student', 'assignment', 'grade', 'id'])
+
+# Option 2: the StudentReport and the ReportContext it is rendered with
+StudentGrades = namedtuple('StudentGrades', ['report', 'context'])
+
+# A student name that is not in the grades file; examples: the first few students
+# (None when the report lists none)
+StudentNotFound = namedtuple('StudentNotFound', ['student', 'examples', 'total'])
+
+# Option 3; sections: ((section, ((grades-file name, grade), ...)), ...) in ALL_SECTIONS order
+AssignmentGrades = namedtuple('AssignmentGrades', ['assignment', 'sections'])
+
+# Students listed when a typed name is not found
+EXAMPLE_STUDENTS = 10
+
+SECTION_TITLES = {'F2': "F2 SECTION", 'F5': "F5 SECTION", 'F6': "F6 SECTION", 'Other': "OTHER STUDENTS"}
+
+
+def csv_name(student_name, grade):
+    """Student name and grade as CSV: Last name, First name, Grade"""
+    if ',' in student_name:
+        # Format: "Last, First" - already in correct order
+        parts = student_name.split(', ')
+        if len(parts) >= 2:
+            return f"{parts[0].strip()},{parts[1].strip()},{grade}"
+        return f"{student_name},{grade}"
+    # Format: "First Last" - need to split and reorder
+    parts = student_name.split()
+    if len(parts) >= 2:
+        return f"{parts[-1].strip()},{parts[0].strip()},{grade}"
+    return f"{student_name},{grade}"
+
+
+def specific_grade(gradebook, student_name, assignment, record=None):
+    """Option 1: one student's grade for one assignment (header or ID).
+    record: the student's StudentRecord when the caller has looked it up already."""
+    if record is None:
+        record = gradebook.find_student(student_name)
+    if record is None:
+        return StudentNotFound(student_name, tuple(gradebook.students[:EXAMPLE_STUDENTS]), len(gradebook.students))
+    grade = record.get(assignment)
+    name = gradebook.assignment_name(assignment) or assignment
+    return GradeLookup(student_name, name, grade, record.id)
+
+
+def student_grades(gradebook, student_name, context=None):
+    """Option 2: every grade of one student, by assignment type (context: the gradebook's
+    ReportContext, when the caller keeps one)"""
+    row = gradebook.student_row(student_name)
+    if row is None:
+        return StudentNotFound(student_name, None, len(gradebook.students))
+    return StudentGrades(student_report(gradebook, row, student_name), context or report_context(gradebook))
+
+
+def assignment_grades(gradebook, assignment, section_grades=None):
+    """Option 3: one assignment's grades per section in roster order. section_grades:
+    the (f2, f5, f6, other) lists when the caller has grouped them already."""
+    if section_grades is None:
+        grouped = gradebook.assignment_section_grades(assignment)
+        section_grades = [grouped[section] for section in ALL_SECTIONS]
+    name = gradebook.assignment_name(assignment) or assignment
+    return AssignmentGrades(name, tuple((section, tuple(grades))
+                                        for section, grades in zip(ALL_SECTIONS, section_grades)))
+
+
+def numeric_grades(result):
+    return [g for _, grades in result.sections for _, g in grades if isinstance(g, (int, float))]
+
+
+def grade_lookup_text(result):
+    grade = result.grade if result.grade is not None else "Not submitted/No grade"
+    text = f"Student: {result.student}\nAssignment: {result.assignment}\nGrade: {grade}\n"
+    if result.grade is not None:
+        text += f"Student ID: {result.id}\n"
+    return text
+
+
+def not_found_text(result):
+    text = f"Student '{result.student}' not found in grades data.\n"
+    if result.examples is not None:
+        text += "Available students:\n"
+        text += "".join(f"  - {s}\n" for s in result.examples)
+        if result.total > len(result.examples):
+            text += f"  ... and {result.total - len(result.examples)} more\n"
+    return text
+
+
+def assignment_text(result):
+    total = sum(len(grades) for _, grades in result.sections)
+    text = f"All Grades for Assignment: {result.assignment}\n"
+    text += "=" * 50 + "\n\n"
+    text += f"Total students with grades: {total}\n\n"
+    for section, grades in result.sections:
+        if grades:
+            text += f"{SECTION_TITLES[section]}:\n"
+            text += "-" * 20 + "\n"
+            text += "".join(f"{csv_name(name, grade)}\n" for name, grade in grades)
+            text += f"\n{section} Total: {len(grades)} students\n\n"
+    numeric = numeric_grades(result)
+    if numeric:
+        text += "OVERALL STATISTICS:\n"
+        text += "-" * 20 + "\n"
+        text += f"Average: {sum(numeric) / len(numeric):.2f}\n"
+        text += f"Highest: {max(numeric)}\n"
+        text += f"Lowest: {min(numeric)}\n"
+    if total == 0:
+        text += "No students have submitted this assignment.\n"
+    return text
+
+
+def table_html(rows):
+    return "<table>\n" + "\n".join(
+        "<tr>" + "".join(f"<td>{escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows) + "\n</table>"
+
+
+def grade_lookup_html(result):
+    grade = result.grade if result.grade is not None else "Not submitted/No grade"
+    rows = [("Assignment", result.assignment), ("Grade", grade)]
+    if result.grade is not None:
+        rows.append(("Student ID", result.id))
+    body = f"<h1>{escape(result.student)}</h1>\n" + table_html(rows)
+    return HTML_PAGE.format(title=escape(result.student), body=body)
+
+
+def not_found_html(result):
+    body = f"<p>Student '{escape(result.student)}' not found in grades data.</p>"
+    return HTML_PAGE.format(title="Student not found", body=body)
+
+
+def assignment_html(result):
+    parts = [f"<h1>{escape(str(result.assignment))}</h1>"]
+    for section, grades in result.sections:
+        if grades:
+            parts.append(f"<h2>{escape(SECTION_TITLES[section].title())} ({len(grades)} students)</h2>")
+            parts.append(table_html(csv_name(name, grade).split(',') for name, grade in grades))
+    numeric = numeric_grades(result)
+    if numeric:
+        parts.append(f"<p>Average: {sum(numeric) / len(numeric):.2f} &middot; Highest: {max(numeric)} "
+                     f"&middot; Lowest: {min(numeric)}</p>")
+    else:
+        parts.append("<p>No students have submitted this assignment.</p>")
+    return HTML_PAGE.format(title=escape(str(result.assignment)), body="\n".join(parts))
+
+
+RENDERERS = {
+    'text': {
+        GradeLookup: grade_lookup_text,
+        StudentGrades: lambda result: report_text(*result),
+        StudentNotFound: not_found_text,
+        AssignmentGrades: assignment_text,
+    },
+    'html': {
+        GradeLookup: grade_lookup_html,
+        StudentGrades: lambda result: report_html(*result),
+        StudentNotFound: not_found_html,
+        AssignmentGrades: assignment_html,
+    },
+}
+
+
+def render(result, fmt='text'):
+    """Text or HTML of a builder's result"""
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unknown report format {fmt}")
+    return RENDERERS[fmt][type(result)](result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the grade reports of the app without its window')
+    parser.add_argument('--dir', default='.', help='folder with the grades and roster files')
+    parser.add_argument('--grades', default=GRADES_CSV, help='grades file name')
+    parser.add_argument('--format', choices=list(RENDERERS), default='text')
+    sub = parser.add_subparsers(dest='report', required=True)
+    grade_parser = sub.add_parser('grade', help="one student's grade for one assignment")
+    grade_parser.add_argument('student')
+    grade_parser.add_argument('assignment', help='assignment name or ID')
+    student_parser = sub.add_parser('student', help="all grades of one student")
+    student_parser.add_argument('student')
+    assignment_parser = sub.add_parser('assignment', help="all grades for one assignment")
+    assignment_parser.add_argument('assignment', help='assignment name or ID')
+    args = parser.parse_args()
+
+    use_locale_collation()
+    gradebook = Gradebook.load(args.dir, args.grades)
+    assignment = getattr(args, 'assignment', None)
+    if assignment is not None:
+        assignment = gradebook.assignment_key(assignment)
+        if gradebook.assignment_name(assignment) is None:
+            print(f"Error: assignment '{args.assignment}' not found", file=sys.stderr)
+            sys.exit(1)
+    if args.report == 'grade':
+        result = specific_grade(gradebook, args.student, assignment)
+    elif args.report == 'student':
+        result = student_grades(gradebook, args.student)
+    else:
+        result = assignment_grades(gradebook, assignment)
+    sys.stdout.write(render(result, args.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Grade Server
+Long-running local service: loads grades.csv, the rosters and the sub-chapter index
+once and answers JSON queries over HTTP. The files are polled in the background and
+the gradebook is reloaded (and swapped in whole) when one of them changes.
+Usage:
+  python grade_server.py [--host 127.0.0.1] [--port 8765] [--poll 2] [--dir .]
+Endpoints (GET):
+  /health                         load time, reload count, cache counters
+  /students                       display names (with the student ID when two students share one)
+  /assignments                    assignment headers
+  /student?name=Jane Doe          a student's grades by assignment type (a student ID works too)
+  /assignment?name=<assignment>   grades per section plus statistics (name or assignment ID, e.g. 23120662)
+  /subchapter?q=1.4               Submitted / Not submitted rows per section ("3", "1.2-1.5" work too)
+  /stats[?assignment=<name>]      gradebook or assignment statistics
+  /course?column=Current Score    students ranked by a course score or grade column (&section=F2)
+  /history?student=Jane Doe       submitted count and points after every archived download
+  /history?assignment=<name>      submissions and mean grade after every archived download
+                                  (both: when that student's grade for that assignment changed)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlsplit, parse_qs
+
+from gradebook import (Gradebook, GRADES_CSV, ALIASES_FILE, ALL_SECTIONS, display_name, roster_files,
+                       use_locale_collation)
+from grade_history import GradeHistory, HISTORY_DIR, archive_download
+from query_cache import QueryCache
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+POLL_SECONDS = 2.0
+
+# Largest request head accepted (request line + headers)
+MAX_HEADER_BYTES = 16384
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def watched_files(workdir='.'):
+    return ([os.path.join(workdir, GRADES_CSV)] + list(roster_files(workdir).values()) +
+            [os.path.join(workdir, ALIASES_FILE)])
+
+
+def file_mtimes(paths):
+    """mtime of each path (None for missing files)"""
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+class GradeServer:
+    def __init__(self, workdir='.', poll_seconds=POLL_SECONDS):
+        self.workdir = workdir
+        self.poll_seconds = poll_seconds
+        self.files = watched_files(workdir)
+        self.gradebook = None
+        self.mtimes = None
+        self.loaded_at = None
+        self.reloads = 0
+        # JSON bodies of answered queries, dropped on every reload
+        self.cache = QueryCache(maxsize=512)
+        self.watcher = None
+        # path -> (handler, accepted query parameters)
+        self.routes = {
+            '/health': (self.health, ()),
+            '/students': (self.students, ()),
+            '/assignments': (self.assignments, ()),
+            '/student': (self.student, ('name',)),
+            '/assignment': (self.assignment, ('name',)),
+            '/subchapter': (self.subchapter, ('q',)),
+            '/stats': (self.stats, ('assignment',)),
+            '/course': (self.course, ('column', 'section')),
+            '/history': (self.history, ('student', 'assignment')),
+        }
+
+    def load(self):
+        """Load the gradebook from disk (blocking). Returns (gradebook, mtimes)."""
+        mtimes = file_mtimes(self.files)
+        gradebook = Gradebook.load(self.workdir)
+        try:
+            archive_download(os.path.join(self.workdir, GRADES_CSV), self.workdir,
+                             gradebook.layout, gradebook.records)
+        except Exception as e:
+            print(f"Grade history (non-critical): {e}")
+        return gradebook, mtimes
+
+    def install(self, gradebook, mtimes):
+        """Swap in a freshly loaded gradebook; queries in flight keep the old one"""
+        self.gradebook = gradebook
+        self.mtimes = mtimes
+        self.loaded_at = time.time()
+        self.cache.invalidate()
+
+    async def reload_if_changed(self):
+        """Reload in a worker thread when a watched file changed. Returns True if reloaded."""
+        if file_mtimes(self.files) == self.mtimes:
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            gradebook, mtimes = await loop.run_in_executor(None, self.load)
+        except Exception as e:
+            # Keep serving the last good data, e.g. while grades.csv is still being written
+            print(f"Reload failed (non-critical): {e}")
+            return False
+        self.install(gradebook, mtimes)
+        self.reloads += 1
+        print(f"Reloaded: {len(gradebook.records)} students, {len(gradebook.assignments)} assignments")
+        return True
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            await self.reload_if_changed()
+
+    # --- queries -----------------------------------------------------------------
+
+    def query(self, path, params):
+        """(status, JSON body bytes) for one GET request"""
+        if path not in self.routes:
+            return 404, encode({'error': f"Unknown endpoint {path}"})
+        handler, accepted = self.routes[path]
+        unknown = [p for p in params if p not in accepted]
+        if unknown:
+            return 400, encode({'error': f"Unsupported parameters for {path}: {', '.join(unknown)}"})
+        if self.gradebook is None:
+            return 503, encode({'error': "Gradebook not loaded"})
+        if path == '/health':
+            return 200, encode(handler(self.gradebook))
+        try:
+            key = tuple(sorted(params.items()))
+            body = self.cache.get_or_compute(path, key, lambda: encode(handler(self.gradebook, **params)))
+        except QueryError as e:
+            return e.status, encode({'error': str(e)})
+        return 200, body
+
+    def health(self, gradebook):
+        return {
+            'students': len(gradebook.records),
+            'assignments': len(gradebook.assignments),
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'cache': self.cache.stats(),
+        }
+
+    def students(self, gradebook):
+        return gradebook.students
+
+    def assignments(self, gradebook):
+        return gradebook.assignments
+
+    def student(self, gradebook, name=None):
+        if not name:
+            raise QueryError(400, "Missing parameter: name")
+        summary = gradebook.student_summary(name)
+        if summary is None:
+            raise QueryError(404, f"Student '{name}' not found")
+        return summary
+
+    def assignment(self, gradebook, name=None):
+        if not name:
+            raise QueryError(400, "Missing parameter: name")
+        stats = gradebook.assignment_statistics(name)
+        if stats is None:
+            raise QueryError(404, f"Assignment '{name}' not found")
+        sections = gradebook.assignment_section_grades(name)
+        return {
+            'assignment': stats['assignment'],
+            'id': stats['id'],
+            'sections': {section: [{'name': display_name(n), 'grade': g} for n, g in sections[section]]
+                         for section in ALL_SECTIONS},
+            'statistics': stats,
+        }
+
+    def subchapter(self, gradebook, q=None):
+        if not q:
+            raise QueryError(400, "Missing parameter: q")
+        assignments, sections = gradebook.subchapter_sections(q)
+        if not assignments:
+            raise QueryError(404, f"No assignments found for sub-chapter {q}")
+        return {'subchapter': q, 'assignments': assignments, 'sections': sections}
+
+    def stats(self, gradebook, assignment=None):
+        if assignment:
+            stats = gradebook.assignment_statistics(assignment)
+            if stats is None:
+                raise QueryError(404, f"Assignment '{assignment}' not found")
+            return stats
+        submitted = sum(r.submitted_count() for r in gradebook.records)
+        cells = len(gradebook.records) * len(gradebook.assignments)
+        return {
+            'students': len(gradebook.records),
+            'assignments': len(gradebook.assignments),
+            'sections': {section: gradebook.sections.count(section) for section in ALL_SECTIONS},
+            'submitted': submitted,
+            'fill_ratio': submitted / cells if cells else 0.0,
+        }
+
+    def course(self, gradebook, column=None, section=None):
+        if not column:
+            return {'columns': list(gradebook.summary.headers)}
+        if column not in gradebook.summary.headers:
+            raise QueryError(404, f"Course score column '{column}' not found")
+        if section and section not in ALL_SECTIONS:
+            raise QueryError(400, f"Unknown section {section}")
+        return {
+            'column': column,
+            'students': [{'name': display_name(r.name), 'id': r.id, 'value': value}
+                         for r, value in gradebook.course_ranking(column, section)],
+        }
+
+    def history(self, gradebook, student=None, assignment=None):
+        history = GradeHistory(os.path.join(self.workdir, HISTORY_DIR))
+        if student and history.find_student(student) is None:
+            raise QueryError(404, f"Student '{student}' not in the grade history")
+        if assignment and history.find_assignment(assignment) is None:
+            raise QueryError(404, f"Assignment '{assignment}' not in the grade history")
+        if student and assignment:
+            return {'student': student, 'assignment': assignment,
+                    'changes': [{'taken': taken, 'grade': grade}
+                                for taken, grade in history.cell_history(student, assignment)]}
+        if student:
+            return {'student': student, 'points': [p._asdict() for p in history.student_curve(student)]}
+        if assignment:
+            return {'assignment': assignment, 'points': [p._asdict() for p in history.assignment_curve(assignment)]}
+        return {'snapshots': [{'seq': i.seq, 'taken': i.taken, 'kind': i.kind, 'students': i.students}
+                              for i in history.snapshots()]}
+
+    # --- HTTP ----------------------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1: GET only, keep-alive unless the client asks to close"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        k, v = line.split(':', 1)
+                        headers[k.strip().lower()] = v.strip()
+                keep_alive = (len(parts) == 3 and parts[2] == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+
+                if len(parts) != 3:
+                    status, body = 400, encode({'error': "Malformed request line"})
+                    keep_alive = False
+                elif parts[0] != 'GET':
+                    status, body = 405, encode({'error': "Only GET is supported"})
+                else:
+                    url = urlsplit(parts[1])
+                    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    try:
+                        status, body = self.query(url.path.rstrip('/') or '/', params)
+                    except Exception as e:
+                        status, body = 500, encode({'error': str(e)})
+
+                writer.write(response_head(status, len(body), keep_alive) + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Load the gradebook, start the watcher and listen. Returns the asyncio server."""
+        loop = asyncio.get_running_loop()
+        self.install(*await loop.run_in_executor(None, self.load))
+        self.watcher = asyncio.ensure_future(self.watch())
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    async def stop(self, server):
+        self.watcher.cancel()
+        server.close()
+        await server.wait_closed()
+
+
+def encode(payload):
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def response_head(status, length, keep_alive):
+    return (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {length}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1')
+
+
+async def serve(host, port, workdir, poll_seconds):
+    grade_server = GradeServer(workdir, poll_seconds)
+    server = await grade_server.start(host, port)
+    gradebook = grade_server.gradebook
+    print(f"Serving {len(gradebook.records)} students, {len(gradebook.assignments)} assignments "
+          f"on http://{host}:{port}/ (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve grades.csv as a local JSON API')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS, help='seconds between file checks')
+    parser.add_argument('--dir', default='.', help='folder with grades.csv and the roster files')
+    args = parser.parse_args()
+    use_locale_collation()
+    try:
+        asyncio.run(serve(args.host, args.port, args.dir, args.poll))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
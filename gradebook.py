@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Gradebook Module
+Loads grades.csv and the F2/F5/F6 rosters into an in-memory gradebook and answers
+the app's queries without any GUI code, so the Tk app, the CLI scripts and the
+local grade server all share one implementation.
+"""
+
+import csv
+import json
+import locale
+import os
+import re
+from array import array
+from collections import Counter
+
+from student_record import GradeLayout, SummaryTable, read_grade_table, read_student_names
+from subchapter_index import SubchapterIndex, ASSIGNMENT_TYPES
+
+GRADES_CSV = 'grades.csv'
+# Roster name -> student ID table written by student_mapping_analysis.py
+ALIASES_FILE = 'student_aliases.json'
+SECTIONS = ['F2', 'F5', 'F6']
+# Sections in report order; students not found in any roster are 'Other'
+ALL_SECTIONS = SECTIONS + ['Other']
+
+
+def normalize_name(name):
+    """Normalize names for comparison"""
+    return re.sub(r'\s+', ' ', name.strip().lower())
+
+
+def display_name(student_name):
+    """Convert 'Last, First' format to 'First Last' for display"""
+    if ',' in student_name:
+        parts = student_name.split(', ')
+        if len(parts) == 2:
+            return f"{parts[1]} {parts[0]}"
+    return student_name
+
+
+def last_name_key(student_name):
+    """Extract last name for sorting purposes"""
+    if ',' in student_name:
+        # Format: "Last, First" - last name is the first part
+        parts = student_name.split(', ')
+        if len(parts) >= 1:
+            return parts[0].strip().lower()
+    else:
+        # Format: "First Last" - last name is the last part
+        parts = student_name.split()
+        if len(parts) >= 2:
+            return parts[-1].strip().lower()
+    return student_name.strip().lower()
+
+
+def use_locale_collation():
+    """Sort names for the user's locale (LC_COLLATE from the environment); called once
+    by the programs at start-up, before any gradebook is loaded"""
+    try:
+        locale.setlocale(locale.LC_COLLATE, '')
+    except locale.Error as e:
+        print(f"Warning: locale collation not available, sorting names by code point: {e}")
+
+
+def sort_key(student_name):
+    """Roster order: last name, then first name, case-insensitive and collated for the
+    current locale (see use_locale_collation)"""
+    _, first = split_last_first(student_name)
+    return (locale.strxfrm(last_name_key(student_name).casefold()), locale.strxfrm(first.casefold()))
+
+
+def roster_order(records, sections):
+    """(rank of every row in roster order, {section: array of rows in roster order}).
+    One sort at load; reports gather rows from these instead of sorting per query."""
+    keys = [sort_key(r.name) for r in records]
+    order = sorted(range(len(records)), key=keys.__getitem__)
+    rank = array('i', bytes(array('i').itemsize * len(records)))
+    section_rows = {section: array('i') for section in ALL_SECTIONS}
+    for position, row in enumerate(order):
+        rank[row] = position
+        section_rows[sections[row]].append(row)
+    return rank, section_rows
+
+
+def split_last_first(student_name):
+    """'Last, First' or 'First Last' -> (last, first)"""
+    if ',' in student_name:
+        parts = student_name.split(', ')
+        last = parts[0].strip() if parts else ''
+        first = parts[1].strip() if len(parts) > 1 else ''
+    else:
+        parts = student_name.split()
+        first = parts[0].strip() if parts else ''
+        last = parts[-1].strip() if len(parts) > 1 else ''
+    return last, first
+
+
+def roster_files(workdir='.'):
+    """Paths of the F2/F5/F6 roster files"""
+    return {section: os.path.join(workdir, f'{section} - names.csv') for section in SECTIONS}
+
+
+def load_rosters(workdir='.'):
+    """Load student names from F2, F5, F6 files"""
+    rosters = {section: [] for section in SECTIONS}
+    for section, filename in roster_files(workdir).items():
+        try:
+            with open(filename, 'r', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                for row in reader:
+                    if row and row[0].strip() and row[0].lower() != 'name':
+                        rosters[section].append(row[0].strip())
+        except FileNotFoundError:
+            print(f"Warning: {os.path.basename(filename)} not found")
+        except Exception as e:
+            print(f"Warning: Error reading {os.path.basename(filename)}: {str(e)}")
+    return rosters
+
+
+def load_aliases(workdir='.'):
+    """{section: {roster name: {'id', 'name', 'method'}}} from the alias table (empty if there is none)"""
+    try:
+        with open(os.path.join(workdir, ALIASES_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get('sections', {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Warning: Error reading {ALIASES_FILE}: {str(e)}")
+        return {}
+
+
+def save_aliases(aliases, workdir='.'):
+    """Write the alias table atomically (the app may be reading it)"""
+    path = os.path.join(workdir, ALIASES_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'sections': aliases}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def roster_section(student_name, rosters):
+    """Determine which class section (F2, F5, F6) a student belongs to (None if not found)"""
+    display = normalize_name(display_name(student_name))
+    display_parts = display.split()
+
+    # Check each section with flexible matching
+    for section, names in rosters.items():
+        for name in names:
+            normalized = normalize_name(name)
+            # Try exact match first
+            if display == normalized:
+                return section
+
+            # Try flexible matching for names like "Riley Sky Mantaring" vs "Mantaring, Riley"
+            name_parts = normalized.split()
+            if len(display_parts) >= 2 and len(name_parts) >= 2:
+                # Check if first and last names match, ignoring middle names
+                if {display_parts[0], display_parts[-1]} == {name_parts[0], name_parts[-1]}:
+                    return section
+
+    return None  # Not found in any section
+
+
+def resolve_sections(records, rosters, aliases):
+    """(section of every record, {section: [roster names without an alias]}, aliased student IDs).
+    Roster names in the alias table are a dict lookup by student ID; the name matcher
+    only runs for records no alias claims, against the roster names that have none."""
+    ids = {r.id for r in records if r.id}
+    section_by_id = {}
+    unmapped = {section: [] for section in SECTIONS}
+    for section in SECTIONS:
+        table = aliases.get(section, {})
+        for name in rosters.get(section, []):
+            entry = table.get(name)
+            if entry and entry.get('id') in ids:
+                section_by_id.setdefault(entry['id'], section)
+            else:
+                unmapped[section].append(name)
+
+    match_names = any(unmapped.values())
+    sections = []
+    for record in records:
+        section = section_by_id.get(record.id) if record.id else None
+        if section is None and match_names:
+            section = roster_section(record.name, unmapped)
+        sections.append(section or 'Other')
+    return sections, unmapped, set(section_by_id)
+
+
+def student_labels(records):
+    """Dialog label of every record: the display name, with the student ID added when
+    two students share a display name"""
+    names = [display_name(r.name) for r in records]
+    counts = Counter(names)
+    return [f"{name} ({r.id})" if counts[name] > 1 else name for name, r in zip(names, records)]
+
+
+def name_index(records):
+    """(normalized display name -> row, {first, last name} -> row) of every record, for
+    match_student; the first row wins when names repeat"""
+    exact, first_last = {}, {}
+    for row, student in enumerate(records):
+        exact.setdefault(normalize_name(display_name(student.name)), row)
+        parts = normalize_name(student.name).split(', ')
+        if len(parts) >= 2 and parts[0] and parts[1]:
+            first_last.setdefault(frozenset((parts[1].split()[0], parts[0].split()[0])), row)
+    return exact, first_last
+
+
+def match_student(search_name, index):
+    """Row of a student by flexible matching on the display name (index: name_index),
+    None if no record matches"""
+    exact, first_last = index
+    search_normalized = normalize_name(search_name)
+    search_parts = search_normalized.split()
+    rows = [exact.get(search_normalized)]
+    # Flexible matching (first and last name)
+    if len(search_parts) >= 2:
+        rows.append(first_last.get(frozenset((search_parts[0], search_parts[-1]))))
+    rows = [row for row in rows if row is not None]
+    return min(rows) if rows else None
+
+
+def load_grade_table(filename, progress=None):
+    """GradeTable of a grades file, with the app's error messages"""
+    try:
+        return read_grade_table(filename, progress=progress)
+    except FileNotFoundError:
+        raise Exception("Grades CSV file not found")
+    except Exception as e:
+        raise Exception(f"Error reading grades file: {str(e)}")
+
+
+def load_student_list(filename):
+    """(assignment headers, sorted dialog labels) of a grades file, read from its header
+    and name and ID columns only; the labels are the ones Gradebook.students will hold"""
+    try:
+        assignments, names = read_student_names(filename)
+    except FileNotFoundError:
+        raise Exception("Grades CSV file not found")
+    except Exception as e:
+        raise Exception(f"Error reading grades file: {str(e)}")
+    return assignments, sorted(student_labels(names))
+
+
+def load_grades(filename, progress=None):
+    """(layout, records) from a grades file, with the app's error messages"""
+    table = load_grade_table(filename, progress)
+    return table.layout, table.records
+
+
+class Gradebook:
+    """Grades, rosters and indexes of one gradebook download"""
+
+    def __init__(self, layout, records, rosters, index=None, aliases=None, summary=None, logins=None):
+        self.layout = layout
+        self.records = records
+        # SIS Login ID of every record ('' when the download has none)
+        self.logins = logins if logins is not None else [''] * len(records)
+        # Course scores and letter grades, kept out of the assignment columns
+        self.summary = summary if summary is not None else SummaryTable.empty(len(records))
+        self.rosters = rosters
+        self.aliases = aliases or {}
+        self.assignments = list(layout.assignments)
+        self.index = index if index is not None else SubchapterIndex(self.assignments)
+        # Section of every record, resolved once instead of on every query; roster names
+        # not in the alias table yet are kept for the confirmation panel
+        self.sections, self.unmapped, self.aliased_ids = resolve_sections(records, rosters, self.aliases)
+        self.section_by_name = {}
+        for record, section in zip(records, self.sections):
+            self.section_by_name.setdefault(record.name, section)
+        # Every section's rows sorted by last, first name, computed once
+        self.rank, self.section_rows = roster_order(records, self.sections)
+        # Primary index: student ID -> row, SIS Login ID -> row, and dialog label
+        # ("First Last") -> row, so a student picked in a dialog is found without matching names
+        self.row_by_id = {}
+        for row, record in enumerate(records):
+            self.row_by_id.setdefault(record.id or f"#{row}", row)
+        self.row_by_login = {}
+        for row, login in enumerate(self.logins):
+            if login:
+                self.row_by_login.setdefault(login, row)
+        labels = student_labels(records)
+        self.row_by_label = {label: row for row, label in enumerate(labels)}
+        self.students = sorted(labels)
+        # Typed names are matched against name_index, built on the first such lookup
+        self.names = None
+
+    @classmethod
+    def load(cls, workdir='.', grades_file=GRADES_CSV, progress=None, rosters=None):
+        """Load grades.csv and the rosters from workdir (progress: see read_grade_table;
+        rosters: already loaded with load_rosters)"""
+        table = load_grade_table(os.path.join(workdir, grades_file), progress)
+        if rosters is None:
+            rosters = load_rosters(workdir)
+        return cls(table.layout, table.records, rosters, aliases=load_aliases(workdir),
+                   summary=table.summary, logins=table.meta.get('sis_login_id'))
+
+    def reload(self, workdir='.', grades=True, rosters=True, grades_file=GRADES_CSV):
+        """A new Gradebook that re-reads only the files that changed and shares the rest
+        (the alias table is re-read with the rosters)"""
+        if grades:
+            table = load_grade_table(os.path.join(workdir, grades_file))
+            layout, records, summary = table.layout, table.records, table.summary
+            logins = table.meta.get('sis_login_id')
+            index = None
+        else:
+            layout, records, index, summary = self.layout, self.records, self.index, self.summary
+            logins = self.logins
+        if rosters:
+            return Gradebook(layout, records, load_rosters(workdir), index, load_aliases(workdir), summary,
+                             logins)
+        return Gradebook(layout, records, self.rosters, index, self.aliases, summary, logins)
+
+    @classmethod
+    def empty(cls):
+        return cls(GradeLayout([]), [], {section: [] for section in SECTIONS})
+
+    def student_row(self, name):
+        """Row of a student: a dict lookup for dialog labels, student IDs and SIS Login IDs,
+        flexible name matching for anything else (None if not found)"""
+        row = self.row_by_label.get(name)
+        if row is None:
+            row = self.row_by_id.get(name)
+        if row is None:
+            row = self.row_by_login.get(name)
+        if row is None:
+            if self.names is None:
+                self.names = name_index(self.records)
+            row = match_student(name, self.names)
+        return row
+
+    def find_student(self, name):
+        row = self.student_row(name)
+        return None if row is None else self.records[row]
+
+    def student_section(self, name):
+        """Section (F2, F5, F6) of a grades-file name, None for students in no roster"""
+        section = self.section_by_name.get(name)
+        if section is None:
+            section = roster_section(name, self.unmapped)
+        return section if section != 'Other' else None
+
+    def unmapped_count(self):
+        return sum(len(names) for names in self.unmapped.values())
+
+    def section_members(self):
+        """{section: [record index, ...]} in file order"""
+        members = {section: [] for section in ALL_SECTIONS}
+        for i, section in enumerate(self.sections):
+            members[section].append(i)
+        return members
+
+    def assignment_name(self, key):
+        """Current header of an assignment given by ID or header (None if not in this download)"""
+        column = self.layout.column(key)
+        return None if column is None else self.assignments[column]
+
+    def assignment_key(self, assignment):
+        """Assignment ID of a header (the header itself when it has no ID); caches and
+        saved views key on this so they survive an assignment being renamed"""
+        column = self.layout.column(assignment)
+        return assignment if column is None else self.layout.key(column)
+
+    def assignment_section_grades(self, assignment):
+        """{section: [(student name, grade or ''), ...]} in roster order; assignment is a
+        header or an assignment ID"""
+        column = self.layout.column(assignment)
+        grades = {}
+        for section, rows in self.section_rows.items():
+            section_grades = []
+            for row in rows:
+                record = self.records[row]
+                grade = record.grade(column) if column is not None else None
+                # Empty string for missing grades so the student still appears in the roster
+                section_grades.append((record.name, grade if grade is not None else ""))
+            grades[section] = section_grades
+        return grades
+
+    def student_summary(self, name):
+        """All submitted grades of one student, grouped by assignment type (None if not found)"""
+        row = self.student_row(name)
+        if row is None:
+            return None
+        record = self.records[row]
+        by_kind = {kind: [] for kind in ASSIGNMENT_TYPES}
+        for column, grade in record.iter_submitted():
+            entry = self.index.entries[column]
+            by_kind[entry.kind].append({'assignment': entry.name, 'grade': grade})
+        return {
+            'name': display_name(record.name),
+            'id': record.id,
+            'section': self.sections[row],
+            'grades': by_kind,
+            'completed': record.submitted_count(),
+            'course': dict(self.summary.student(row)),
+        }
+
+    def course_ranking(self, header, section=None):
+        """[(record, score or letter grade), ...] best first for one course score column,
+        optionally for one section only (empty for unknown columns)"""
+        if header not in self.summary.headers:
+            return []
+        rows = self.section_rows.get(section, ()) if section else None
+        return [(self.records[r], self.summary.value(header, r)) for r in self.summary.rank(header, rows)]
+
+    def assignment_statistics(self, assignment):
+        """Submission count, average, highest and lowest numeric grade"""
+        column = self.layout.column(assignment)
+        if column is None:
+            return None
+        numeric = [g for g in (r.grade(column) for r in self.records) if isinstance(g, float)]
+        stats = {'assignment': self.assignments[column], 'id': self.layout.ids[column] or None,
+                 'students': len(self.records), 'submitted': len(numeric)}
+        if numeric:
+            stats.update(average=sum(numeric) / len(numeric), highest=max(numeric), lowest=min(numeric))
+        return stats
+
+    def subchapter_sections(self, query):
+        """(assignments, {section: {'submitted': [rows], 'not_submitted': [rows]}}) for a
+        sub-chapter, unit or range query; rows are [Last, First, grade, ...] in roster order"""
+        columns = self.index.lookup(query)
+        assignments = [self.assignments[c] for c in columns]
+        sections = {k: {'submitted': [], 'not_submitted': []} for k in ALL_SECTIONS}
+        if not columns:
+            return assignments, sections
+        for section, rows in self.section_rows.items():
+            for row in rows:
+                record = self.records[row]
+                grade_row = []
+                any_submitted = False
+                for c in columns:
+                    g = record.grade(c)
+                    if g is not None:
+                        any_submitted = True
+                        grade_row.append(g)
+                    else:
+                        grade_row.append("")
+                full_row = list(split_last_first(record.name)) + grade_row
+                sections[section]['submitted' if any_submitted else 'not_submitted'].append(full_row)
+        return assignments, sections
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Local Exporters Module
+Offline counterparts of GoogleSheetsExporter: the same section tabs and row layout
+(see sheet_layout.py), written to a local XLSX workbook, a zip of per-section CSVs
+or a Parquet file, one tab at a time. Every export is
+recorded in the export snapshots like the Google Sheets uploads, hashed and stored as
+the rows stream out; one identical to the previous export of the same title returns
+that file instead of keeping a copy.
+"""
+
+import csv
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from export_snapshots import SnapshotStore, TabDigests, SNAPSHOT_DIR
+from sheet_layout import SECTION_TABS, iter_name_grade_rows, iter_section_data_rows, iter_section_split_rows
+from subchapter_index import assignment_number
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_DIR = 'exports'
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_ROWS = 10000
+
+
+def safe_filename(text):
+    """Turn a sheet title into something usable as a file name"""
+    return re.sub(r'[^\w.\- ]+', '_', text).strip() or 'export'
+
+
+class LocalExporter:
+    """Base class: subclasses provide open_book() returning a writer with
+    write_tab(tab_name, rows), close() and digests, the TabDigests of the tabs it wrote"""
+    display_name = 'Local file'
+    extension = ''
+
+    def __init__(self, output_dir=EXPORT_DIR, snapshot_dir=SNAPSHOT_DIR):
+        self.output_dir = output_dir
+        # Names skipped by the last export because they are not in "Last, First" form
+        self.rejected_names = []
+        # Payload of every export, shared with the Google Sheets uploads
+        self.snapshots = SnapshotStore(snapshot_dir)
+        self.reuse_unchanged = True
+        # (Snapshot, reused) of the last export, or None
+        self.last_snapshot = None
+
+    def output_path(self, title):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        return os.path.join(self.output_dir, f"{safe_filename(title)} {stamp}{self.extension}")
+
+    def open_book(self, path):
+        raise NotImplementedError
+
+    def finish(self, title, path, book, key=None):
+        """Record the export's snapshot. If the previous export of this title (or key) had
+        the same payload and its file is still there, the new file is dropped and the earlier
+        one returned."""
+        self.last_snapshot = None
+        digests = book.digests
+        if digests.failed is not None:
+            print(f"Snapshot error (non-critical): {digests.failed}")
+            return path
+        try:
+            previous = (self.snapshots.find_unchanged_entries(title, self.display_name, digests.entries, key)
+                        if self.reuse_unchanged else None)
+            if previous is not None and os.path.exists(previous.location):
+                # Two exports within a second get the same file name
+                if os.path.abspath(previous.location) != os.path.abspath(path):
+                    os.remove(path)
+                self.last_snapshot = (previous, True)
+                return previous.location
+            self.last_snapshot = (self.snapshots.record_entries(title, self.display_name, digests.entries,
+                                                                path, key), False)
+        except Exception as e:
+            print(f"Snapshot error (non-critical): {e}")
+        return path
+
+    def export_to_sheets(self, assignment_name, f2_grades, f5_grades, f6_grades, other_grades):
+        """Export assignment grades with one tab per section; returns the file path"""
+        self.rejected_names = []
+        title = f"Assignment Grades - {assignment_name}"
+        path = self.output_path(title)
+        book = self.open_book(path)
+        try:
+            grades_by_key = {'F2': f2_grades, 'F5': f5_grades, 'F6': f6_grades, 'Other': other_grades}
+            for key, sheet_name in SECTION_TABS:
+                self.write_section_data(book, sheet_name, grades_by_key[key], assignment_name)
+        finally:
+            book.close()
+        # Keyed by assignment ID, so a renamed assignment still finds its earlier exports
+        number = assignment_number(assignment_name)
+        return self.finish(title, path, book, f"assignment:{number}" if number else None)
+
+    def export_subchapter_to_sheets(self, subchapter, assignments, sections_dict):
+        """Export a sub-chapter split into Submitted / Not submitted per section; returns the file path"""
+        title = f"Subchapter {subchapter} Grades"
+        path = self.output_path(title)
+        book = self.open_book(path)
+        try:
+            for key, sheet_name in SECTION_TABS:
+                self.write_section_split(book, sheet_name, assignments,
+                                         sections_dict.get(key, {'submitted': [], 'not_submitted': []}))
+        finally:
+            book.close()
+        return self.finish(title, path, book)
+
+    def export_report_to_sheets(self, title, tabs):
+        """Export report tabs [(tab name, rows), ...]; returns the file path"""
+        path = self.output_path(title)
+        book = self.open_book(path)
+        try:
+            for tab_name, rows in tabs:
+                book.write_tab(tab_name, rows)
+        finally:
+            book.close()
+        return self.finish(title, path, book)
+
+    def write_section_data(self, book, sheet_name, grades_data, assignment_name):
+        """Write one section tab of an assignment export"""
+        if not grades_data:
+            return
+        book.write_tab(sheet_name, iter_section_data_rows(sheet_name, grades_data, assignment_name,
+                                                          self.rejected_names))
+
+    def write_section_split(self, book, sheet_name, header_assignments, section_data):
+        """Write one section tab of a sub-chapter export"""
+        book.write_tab(sheet_name, iter_section_split_rows(sheet_name, header_assignments, section_data))
+
+
+def quoteattr_body(text):
+    """Escape text for use inside a double-quoted XML attribute"""
+    return escape(text, {'"': '&quot;'})
+
+
+def column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class XlsxBook:
+    """Minimal streaming XLSX writer: each tab is written straight into the zip"""
+
+    def __init__(self, path, digests):
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        self.digests = digests
+        self.sheets = []
+        self.used_names = set()
+
+    def sheet_name(self, tab_name):
+        """Valid, unique sheet name: Excel compares names case-insensitively"""
+        # Sheet names are limited to 31 characters and cannot contain []:*?/\
+        base = re.sub(r'[\[\]:*?/\\]', '_', tab_name)[:31]
+        name, n = base, 1
+        while name.lower() in self.used_names:
+            n += 1
+            suffix = f" ({n})"
+            name = base[:31 - len(suffix)] + suffix
+        self.used_names.add(name.lower())
+        return name
+
+    def write_tab(self, tab_name, rows):
+        rows = self.digests.stream(tab_name, rows)
+        self.sheets.append(self.sheet_name(tab_name))
+        member = f"xl/worksheets/sheet{len(self.sheets)}.xml"
+        with self.zip.open(member, 'w') as raw:
+            out = io.TextIOWrapper(raw, encoding='utf-8')
+            out.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                      '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                      '<sheetData>')
+            for r, row in enumerate(rows, start=1):
+                cells = []
+                for c, value in enumerate(row):
+                    if value is None or value == '':
+                        continue
+                    ref = f"{column_letter(c)}{r}"
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        cells.append(f'<c r="{ref}"><v>{value!r}</v></c>')
+                    else:
+                        cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">'
+                                     f'{escape(str(value))}</t></is></c>')
+                out.write(f'<row r="{r}">{"".join(cells)}</row>')
+            out.write('</sheetData></worksheet>')
+            out.flush()
+            out.detach()
+
+    def close(self):
+        # A workbook needs at least one sheet
+        if not self.sheets:
+            self.write_tab('Sheet1', [])
+        sheets = self.sheets
+
+        overrides = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for n in range(1, len(sheets) + 1))
+        self.zip.writestr('[Content_Types].xml',
+                          '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                          '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                          '<Default Extension="xml" ContentType="application/xml"/>'
+                          '<Override PartName="/xl/workbook.xml" '
+                          'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                          f'{overrides}</Types>')
+        self.zip.writestr('_rels/.rels',
+                          '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                          '<Relationship Id="rId1" '
+                          'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+                          'Target="xl/workbook.xml"/></Relationships>')
+        sheet_entries = ''.join(f'<sheet name="{quoteattr_body(name)}" sheetId="{n}" r:id="rId{n}"/>'
+                                for n, name in enumerate(sheets, start=1))
+        self.zip.writestr('xl/workbook.xml',
+                          '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                          'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                          f'<sheets>{sheet_entries}</sheets></workbook>')
+        rels = ''.join(f'<Relationship Id="rId{n}" '
+                       f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                       f'Target="worksheets/sheet{n}.xml"/>'
+                       for n in range(1, len(sheets) + 1))
+        self.zip.writestr('xl/_rels/workbook.xml.rels',
+                          '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                          '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                          f'{rels}</Relationships>')
+        self.zip.close()
+
+
+class CsvBundleBook:
+    """Zip with one CSV file per tab"""
+
+    def __init__(self, path, digests):
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        self.digests = digests
+
+    def write_tab(self, tab_name, rows):
+        rows = self.digests.stream(tab_name, rows)
+        with self.zip.open(f"{safe_filename(tab_name)}.csv", 'w') as raw:
+            out = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            writer = csv.writer(out)
+            for row in rows:
+                writer.writerow(row)
+            out.flush()
+            out.detach()
+
+    def close(self):
+        self.zip.close()
+
+
+class ParquetBook:
+    """One long-format Parquet file: a row per (section, block, student, assignment)"""
+
+    def __init__(self, path, digests):
+        self.schema = pa.schema([
+            ('section', pa.string()),
+            ('block', pa.string()),
+            ('last_name', pa.string()),
+            ('first_name', pa.string()),
+            ('assignment', pa.string()),
+            ('grade', pa.float64()),
+            ('grade_text', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch = {name: [] for name in self.schema.names}
+        # Snapshot payload: one tab per section, a row (block, last, first, assignment, grade)
+        # per cell. Sections are written one after another, so only the current one is open.
+        self.digests = digests
+        self.section = None
+
+    def add(self, section, block, last_name, first_name, assignment, grade):
+        if section != self.section:
+            self.digests.end()
+            self.digests.begin(section)
+            self.section = section
+        self.digests.add([block, last_name, first_name, assignment, grade])
+        if isinstance(grade, (int, float)) and not isinstance(grade, bool):
+            number, text = float(grade), None
+        else:
+            number, text = None, (grade if grade != '' else None)
+        for name, value in zip(self.schema.names,
+                               (section, block, last_name, first_name, assignment, number, text)):
+            self.batch[name].append(value)
+        if len(self.batch['section']) >= PARQUET_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.batch['section']:
+            self.writer.write_table(pa.table(self.batch, schema=self.schema))
+            self.batch = {name: [] for name in self.schema.names}
+
+    def close(self):
+        self.digests.end()
+        self.flush()
+        self.writer.close()
+
+
+class XlsxExporter(LocalExporter):
+    display_name = 'Excel workbook'
+    extension = '.xlsx'
+
+    def open_book(self, path):
+        return XlsxBook(path, TabDigests(self.snapshots))
+
+
+class CsvBundleExporter(LocalExporter):
+    display_name = 'CSV bundle'
+    extension = '.zip'
+
+    def open_book(self, path):
+        return CsvBundleBook(path, TabDigests(self.snapshots))
+
+
+class ParquetExporter(LocalExporter):
+    """Analytics export: same sections and blocks, flattened to one grade per row"""
+    display_name = 'Parquet file'
+    extension = '.parquet'
+
+    def __init__(self, output_dir=EXPORT_DIR, snapshot_dir=SNAPSHOT_DIR):
+        if pa is None:
+            raise Exception("Parquet export needs pyarrow (pip install pyarrow)")
+        super().__init__(output_dir, snapshot_dir)
+
+    def open_book(self, path):
+        return ParquetBook(path, TabDigests(self.snapshots))
+
+    def export_report_to_sheets(self, title, tabs):
+        raise Exception("Parquet export only covers grades; pick Excel or CSV bundle for reports")
+
+    def write_section_data(self, book, sheet_name, grades_data, assignment_name):
+        for last_name, first_name, grade in iter_name_grade_rows(grades_data or [], self.rejected_names):
+            book.add(sheet_name, '', last_name, first_name, assignment_name, grade)
+
+    def write_section_split(self, book, sheet_name, header_assignments, section_data):
+        for block, key in (('Submitted', 'submitted'), ('Not submitted', 'not_submitted')):
+            for row in section_data.get(key, []):
+                for assignment, grade in zip(header_assignments, row[2:]):
+                    book.add(sheet_name, block, row[0], row[1], assignment, grade)
+
+
+# Export targets offered next to Google Sheets (name -> exporter class)
+LOCAL_EXPORTERS = {
+    'Excel (.xlsx)': XlsxExporter,
+    'CSV bundle (.zip)': CsvBundleExporter,
+    'Parquet': ParquetExporter,
+}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Missing Work Module
+Every student's missing assignments grouped by sub-chapter, for every section at
+once: the submitted mask of the whole grade matrix is computed once (with NumPy
+when it is installed) instead of running the sub-chapter export per prefix.
+"""
+
+from collections import namedtuple
+
+from at_risk import due_steps
+from class_statistics import grade_matrix, np
+from gradebook import ALL_SECTIONS, split_last_first
+
+# Which assignments count: the ones most of the class has done, or every one in the course order
+SCOPE_DUE = 'due'
+SCOPE_ALL = 'all'
+
+# missing: ((step label, (assignment ID, ...)), ...) in course order; IDs are the layout's
+# integer keys (the header for an assignment without one)
+MissingWork = namedtuple('MissingWork', ['name', 'id', 'section', 'count', 'missing'])
+
+MissingWorkReport = namedtuple('MissingWorkReport', ['steps', 'sections'])
+
+
+def scope_steps(gradebook, scope=SCOPE_DUE):
+    """[(label, columns)] of the timeline steps the report covers"""
+    if scope == SCOPE_ALL:
+        return [(label, tuple(columns)) for label, columns in gradebook.index.timeline()]
+    return [(label, tuple(columns)) for label, columns in due_steps(gradebook)]
+
+
+def missing_columns(gradebook, columns, use_numpy=None):
+    """For every record, the sorted list of columns (out of `columns`) with nothing submitted"""
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        _, submitted = grade_matrix(gradebook)
+        columns = np.array(sorted(columns), dtype=np.intp)
+        missing = ~submitted[:, columns]
+        return [columns[row].tolist() for row in missing]
+    ordered = sorted(columns)
+    result = []
+    for record in gradebook.records:
+        submitted = set(record.submitted_columns())
+        result.append([c for c in ordered if c not in submitted])
+    return result
+
+
+def missing_work(gradebook, scope=SCOPE_DUE, use_numpy=None):
+    """MissingWorkReport: {section: [MissingWork, ...]} in roster order, students with
+    nothing missing left out"""
+    steps = scope_steps(gradebook, scope)
+    step_of = {c: label for label, columns in steps for c in columns}
+    key = gradebook.layout.key
+    ids = {c: key(c) for c in step_of}
+    order = {label: n for n, (label, _) in enumerate(steps)}
+
+    missing_by_row = missing_columns(gradebook, step_of, use_numpy)
+    sections = {section: [] for section in ALL_SECTIONS}
+    for section, rows in gradebook.section_rows.items():
+        for row in rows:
+            columns = missing_by_row[row]
+            if not columns:
+                continue
+            grouped = {}
+            for c in columns:
+                grouped.setdefault(step_of[c], []).append(ids[c])
+            missing = tuple((label, tuple(grouped[label])) for label in sorted(grouped, key=order.get))
+            record = gradebook.records[row]
+            sections[section].append(MissingWork(record.name, record.id, section, len(columns), missing))
+    return MissingWorkReport([label for label, _ in steps], sections)
+
+
+def iter_missing_work_rows(report, section):
+    """Rows of one section tab: a student x sub-chapter matrix of missing assignment IDs"""
+    yield [f"Missing work: {section}"]
+    yield ["Cells list the IDs of missing assignments; blank cell = complete"]
+    yield ["Last Name", "First Name", "Missing"] + list(report.steps)
+    for entry in report.sections[section]:
+        last, first = split_last_first(entry.name)
+        by_step = dict(entry.missing)
+        yield [last, first, entry.count] + [", ".join(map(str, by_step.get(label, ()))) for label in report.steps]
+
+
+def missing_work_tabs(report):
+    """[(tab name, rows)] for export: one tab per section"""
+    return [(f"{section} Missing Work", iter_missing_work_rows(report, section)) for section in ALL_SECTIONS]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Query Cache Module
+Bounded LRU cache for computed query results and rendered reports
+"""
+
+from collections import OrderedDict
+
+
+class QueryCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get_or_compute(self, kind, params, compute):
+        """Return the cached value for (kind, params) or compute and store it.
+        Keys include the current data version, so results computed before a
+        reload can never be returned after it."""
+        key = (self.version, kind) + tuple(params)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            # Evict the least recently used entry
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        """Drop every entry and move to a new data version (call after reloading data)"""
+        self._entries.clear()
+        self.version += 1
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'version': self.version,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -3,109 +3,44 @@
 Run a real export of a sub-chapter to Google Sheets without launching the GUI.
 Usage:
   python real_export_subchapter.py --subchapter 1.4
+  python real_export_subchapter.py --subchapter 3          (whole unit)
+  python real_export_subchapter.py --subchapter 1.2-1.5    (range of sub-chapters)
 If --subchapter omitted, the script will print available prefixes and prompt you to type one.
 
 It requires `credentials.json` in the repository (OAuth client) and will open a browser for the OAuth flow.
+To export offline instead, pick a local format (written to ./exports):
+  python real_export_subchapter.py --subchapter 1.4 --format xlsx     (or csv, parquet)
 """
-import csv
 import os
 import argparse
-import re
+import threading
 from google_sheets_integration import GoogleSheetsExporter
+from gradebook import Gradebook, use_locale_collation
+from local_exporters import XlsxExporter, CsvBundleExporter, ParquetExporter
 
 WORKDIR = os.path.dirname(os.path.abspath(__file__))
-GRADES_CSV = os.path.join(WORKDIR, 'grades.csv')
 
-
-def normalize_name(name):
-    return re.sub(r'\s+', ' ', name.strip().lower())
-
-
-def load_assignments():
-    with open(GRADES_CSV, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        next(reader)
-        return header[5:]
-
-
-def load_grades_data():
-    grades_data = []
-    with open(GRADES_CSV, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        next(reader)
-        assignments = header[5:]
-        for row in reader:
-            if row and row[0].strip():
-                student_name = row[0].strip()
-                student_id = row[1] if len(row) > 1 else ''
-                grades = {}
-                for i, a in enumerate(assignments):
-                    if i + 5 < len(row):
-                        v = row[i + 5].strip()
-                        if v:
-                            try:
-                                grades[a] = float(v)
-                            except ValueError:
-                                grades[a] = v
-                        else:
-                            grades[a] = None
-                grades_data.append({'name': student_name, 'id': student_id, 'grades': grades})
-    return assignments, grades_data
-
-
-def load_class_rosters():
-    rosters = {'F2': [], 'F5': [], 'F6': []}
-    for prefix in ['F2', 'F5', 'F6']:
-        fn = os.path.join(WORKDIR, f'{prefix} - names.csv')
-        if os.path.exists(fn):
-            with open(fn, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if row and row[0].strip() and row[0].lower() != 'name':
-                        rosters[prefix].append(row[0].strip())
-    return rosters
-
-
-def get_student_section(student_name, rosters):
-    # Convert Last, First to First Last
-    if ',' in student_name:
-        parts = student_name.split(', ')
-        if len(parts) == 2:
-            display_name = f"{parts[1]} {parts[0]}"
-        else:
-            display_name = student_name
-    else:
-        display_name = student_name
-
-    for section, names in rosters.items():
-        for name in names:
-            if normalize_name(display_name) == normalize_name(name):
-                return section
-            display_parts = normalize_name(display_name).split()
-            name_parts = normalize_name(name).split()
-            if len(display_parts) >= 2 and len(name_parts) >= 2:
-                display_first_last = {display_parts[0], display_parts[-1]}
-                name_first_last = {name_parts[0], name_parts[-1]}
-                if display_first_last == name_first_last:
-                    return section
-    return None
+LOCAL_FORMATS = {'xlsx': XlsxExporter, 'csv': CsvBundleExporter, 'parquet': ParquetExporter}
 
 
 def main():
     parser = argparse.ArgumentParser(description='Export sub-chapter grades to Google Sheets')
-    parser.add_argument('--subchapter', '-s', help='Sub-chapter prefix, e.g. 1.4')
+    parser.add_argument('--subchapter', '-s', help='Sub-chapter (1.4), unit (3) or range (1.2-1.5)')
+    parser.add_argument('--format', '-f', choices=['sheets'] + list(LOCAL_FORMATS), default='sheets',
+                        help='Google Sheets (default) or a local file format')
     args = parser.parse_args()
 
-    assignments, grades_data = load_grades_data()
-    rosters = load_class_rosters()
+    exporter = None
+    if args.format == 'sheets':
+        # Restore the saved Google session while the CSV files are parsed
+        exporter = GoogleSheetsExporter()
+        warm_up = threading.Thread(target=exporter.warm_up, daemon=True)
+        warm_up.start()
 
-    prefixes = []
-    for a in assignments:
-        tok = a.strip().split()[0] if a.strip() else ''
-        if tok and tok not in prefixes:
-            prefixes.append(tok)
+    # Same sections, confirmed names and roster order as option 5 in the app
+    use_locale_collation()
+    gradebook = Gradebook.load(WORKDIR)
+    prefixes = gradebook.index.prefixes()
 
     if not args.subchapter:
         print('Available sub-chapter prefixes:')
@@ -114,45 +49,23 @@ def main():
     else:
         selected = args.subchapter.strip()
 
-    if selected not in prefixes:
-        print(f"Warning: {selected} not found in prefixes. Available: {', '.join(prefixes[:20])}")
-
-    matching = [a for a in assignments if a.strip().startswith(selected)]
+    # Exact sub-chapter, whole unit ("3") or range ("1.2-1.5")
+    matching, sections = gradebook.subchapter_sections(selected)
+    if selected not in prefixes and matching:
+        print(f"Using {len(matching)} assignments for {selected}")
     if not matching:
         print('No matching assignments found for', selected)
         return
 
-    # Build sections structure
-    sections = {k: {'submitted': [], 'not_submitted': []} for k in ['F2', 'F5', 'F6', 'Other']}
-    for student in grades_data:
-        section = get_student_section(student['name'], rosters) or 'Other'
-        if ',' in student['name']:
-            parts = student['name'].split(', ')
-            last = parts[0].strip() if parts else ''
-            first = parts[1].strip() if len(parts) > 1 else ''
-        else:
-            parts = student['name'].split()
-            first = parts[0].strip() if parts else ''
-            last = parts[-1].strip() if len(parts) > 1 else ''
-        base = [last, first]
-        any_sub = False
-        row_grades = []
-        for a in matching:
-            g = student['grades'].get(a)
-            if g is not None:
-                any_sub = True
-                row_grades.append(g)
-            else:
-                row_grades.append('')
-        full_row = base + row_grades
-        key = section if section in ['F2', 'F5', 'F6'] else 'Other'
-        if any_sub:
-            sections[key]['submitted'].append(full_row)
-        else:
-            sections[key]['not_submitted'].append(full_row)
-
     # Export
-    exporter = GoogleSheetsExporter()
+    if args.format in LOCAL_FORMATS:
+        exporter = LOCAL_FORMATS[args.format](os.path.join(WORKDIR, 'exports'))
+        path = exporter.export_subchapter_to_sheets(selected, matching, sections)
+        print('Export complete. File written to:')
+        print(path)
+        return
+
+    warm_up.join()
     print('Authenticating and exporting. A browser window will open for OAuth; please complete the flow.')
     url = exporter.export_subchapter_to_sheets(selected, matching, sections)
     if url:
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Sheet Layout Module
+Builds the row layout of every exported tab, independent of where it is written
+(Google Sheets, XLSX, CSV, ...). Each builder is a generator so local writers can
+stream rows straight to disk.
+
+Sub-chapter rows go through a numeric block (GradeBlock): names are split once into
+last/first columns, grades are stored in one array('d') and the row totals are
+summed over that block in a single pass (NumPy when installed) instead of calling
+float() on every cell inside try/except. Single-assignment tabs only split names.
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# (sections_dict key, tab name) in the order tabs are created
+SECTION_TABS = [
+    ('F2', 'F2 Section'),
+    ('F5', 'F5 Section'),
+    ('F6', 'F6 Section'),
+    ('Other', 'Other Students'),
+]
+
+
+def split_name(student_name):
+    """'Last, First' -> ('Last', 'First'), or None if the name is not in that form"""
+    if ',' in student_name:
+        parts = student_name.split(', ')
+        if len(parts) >= 2:
+            return parts[0].strip(), parts[1].strip()
+    return None
+
+
+def _cell_value(grade):
+    """What a cell adds to the total: numbers and numeric strings count, blanks and text are 0"""
+    try:
+        return float(grade)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class GradeBlock:
+    """Pre-split name columns, the grade cells of every row and a numeric block of the grades.
+
+    `values` holds every row's grades in one array('d') (row-major, blanks and text as 0),
+    and the row totals are summed over that block in one pass. Cells keep their original
+    values so the exported sheet looks exactly like the input."""
+    __slots__ = ('width', 'last_names', 'first_names', 'cells', 'values', 'totals')
+
+    def __init__(self, width):
+        self.width = width
+        self.last_names = []
+        self.first_names = []
+        self.cells = []             # one list of `width` grade cells per row, as given
+        self.values = array('d')    # len(self) x width numbers
+        self.totals = array('d')
+
+    def __len__(self):
+        return len(self.last_names)
+
+    def append(self, last_name, first_name, grades):
+        """Add a row; `grades` becomes the block's own list, so pass a copy"""
+        if len(grades) != self.width or type(grades) is not list:
+            # Short rows: pad so every row has the same width
+            grades = list(grades[:self.width]) + [''] * (self.width - len(grades))
+        values = grades
+        if '' in grades:
+            # Blanks count as 0; list.index() finds them without a Python step per cell
+            values = grades[:]
+            i = -1
+            try:
+                while True:
+                    i = values.index('', i + 1)
+                    values[i] = 0.0
+            except ValueError:
+                pass
+        try:
+            # Numbers only (the normal case)
+            self.values.fromlist(values)
+        except TypeError:
+            self.values.extend(map(_cell_value, grades))
+        self.last_names.append(last_name)
+        self.first_names.append(first_name)
+        self.cells.append(grades)
+
+    def compute_totals(self, use_numpy=None):
+        """Row totals over the whole block in one pass"""
+        if use_numpy is None:
+            use_numpy = np is not None
+        n, width = len(self), self.width
+        self.totals = array('d')
+        if not width:
+            self.totals.extend([0.0] * n)
+        elif use_numpy:
+            block = np.frombuffer(self.values, dtype=np.float64).reshape(n, width)
+            self.totals.frombytes(block.sum(axis=1).tobytes())
+        else:
+            values = self.values
+            self.totals.extend([sum(values[i:i + width]) for i in range(0, n * width, width)])
+        return self.totals
+
+    @classmethod
+    def from_rows(cls, rows, width, use_numpy=None):
+        """Rows already split as [Last, First, grade1, grade2, ...]"""
+        block = cls(width)
+        for r in rows:
+            block.append(r[0], r[1], r[2:2 + width])
+        block.compute_totals(use_numpy)
+        return block
+
+    def iter_values(self, with_total=True):
+        """Yield fully formed sheet rows [Last, First, cell, ..., (Total)]"""
+        if with_total:
+            for last_name, first_name, cells, total in zip(self.last_names, self.first_names,
+                                                          self.cells, self.totals):
+                yield [last_name, first_name, *cells, total]
+        else:
+            for last_name, first_name, cells in zip(self.last_names, self.first_names, self.cells):
+                yield [last_name, first_name, *cells]
+
+
+def iter_name_grade_rows(grades_data, rejects=None):
+    """[Last, First, grade] for every ("Last, First", grade) pair, built in one pass.
+    Names in any other form are skipped and, if given, appended to `rejects`."""
+    rows = []
+    for student_name, grade in grades_data:
+        # Same rule as split_name(), inlined for the hot loop
+        parts = student_name.split(', ')
+        if len(parts) >= 2:
+            rows.append([parts[0].strip(), parts[1].strip(), grade])
+        elif rejects is not None:
+            rejects.append(student_name)
+    return rows
+
+
+def iter_section_data_rows(sheet_name, grades_data, assignment_name, rejects=None):
+    """Rows of a single-assignment section tab (export option 4)"""
+    yield [f"Assignment: {assignment_name}"]
+    yield [f"Section: {sheet_name}"]
+    yield []  # Empty row
+    yield ["Last Name", "First Name", "Grade"]
+    yield from iter_name_grade_rows(grades_data, rejects)
+
+
+def iter_section_multi_column_rows(sheet_name, header_assignments, rows):
+    """Rows of a tab whose rows already contain [Last, First, grade1, grade2, ...]"""
+    yield ["Sub-chapter export"]  # Title row
+    yield [f"Section: {sheet_name}"]
+    yield []
+
+    # Column headers: Last Name, First Name, then each assignment, then Total
+    yield ["Last Name", "First Name"] + list(header_assignments) + ["Total"]
+
+    yield from GradeBlock.from_rows(rows, len(header_assignments)).iter_values()
+
+
+def iter_section_split_rows(sheet_name, header_assignments, section_data):
+    """Rows of a sub-chapter tab: a legend, then a Submitted and a Not submitted block.
+    section_data is a dict {'submitted': [rows], 'not_submitted': [rows]}"""
+    submitted = section_data.get('submitted', [])
+    not_sub = section_data.get('not_submitted', [])
+    width = len(header_assignments)
+
+    yield [f"Sub-chapter: {header_assignments[0].split()[0] if header_assignments else ''}"]
+    yield [f"Section: {sheet_name}"]
+    yield ["Legend:", "Blank cell = no submission"]
+    yield []
+
+    header = ["Last Name", "First Name"] + list(header_assignments) + ["Total"]
+
+    # Submitted block
+    yield ["Submitted"]
+    yield header
+    yield from GradeBlock.from_rows(submitted, width).iter_values()
+
+    yield []
+
+    # Not submitted block
+    yield ["Not submitted"]
+    yield header
+    yield from GradeBlock.from_rows(not_sub, width).iter_values()
+
+
+def iter_combined_rows(assignment_name, f2_grades, f5_grades, f6_grades, other_grades, rejects=None):
+    """Rows of the single-tab layout with every section stacked"""
+    yield [f"Assignment: {assignment_name}"]
+    yield []  # Empty row
+
+    blocks = [("F2 SECTION", f2_grades), ("F5 SECTION", f5_grades),
+              ("F6 SECTION", f6_grades), ("OTHER STUDENTS", other_grades)]
+    for n, (title, grades) in enumerate(blocks):
+        if grades:
+            yield [title]
+            yield ["Last Name", "First Name", "Grade"]
+            yield from iter_name_grade_rows(grades, rejects)
+            if n < len(blocks) - 1:
+                yield []  # Empty row
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Sheets Request Scheduler Module
+Wraps the Google Sheets service object: token-bucket rate limiting against the
+per-minute quota, retries with exponential backoff and jitter on 429/5xx, and
+coalescing of queued value writes into one values().batchUpdate per spreadsheet.
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+
+# Sheets API default quota is 60 write requests per minute per user
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_BURST = 10
+
+# HTTP statuses worth retrying
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# The ones that mean the request was not carried out, so even a create can be sent again
+REJECTED_STATUSES = {408, 429}
+
+# Latest request metrics kept (the scheduler lives as long as the shared session)
+MAX_METRICS = 500
+
+RequestMetric = namedtuple('RequestMetric', ['label', 'seconds', 'attempts', 'status'])
+
+
+def error_status(error):
+    """HTTP status of an HttpError-like exception (None if it has none)"""
+    resp = getattr(error, 'resp', None)
+    status = getattr(resp, 'status', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(error):
+    """Seconds from a Retry-After header on the error response, if any"""
+    resp = getattr(error, 'resp', None)
+    try:
+        value = resp.get('retry-after') if resp is not None else None
+        return float(value) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the time waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+
+class RequestScheduler:
+    def __init__(self, service, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, burst=DEFAULT_BURST,
+                 max_retries=5, base_delay=1.0, max_delay=32.0,
+                 clock=time.monotonic, sleep=time.sleep, rng=random.random):
+        self.service = service
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self.pending = defaultdict(list)    # spreadsheet_id -> [{'range': ..., 'values': ...}]
+        self.metrics = deque(maxlen=MAX_METRICS)
+
+    def reset_metrics(self):
+        """Start counting anew, e.g. at the start of an export"""
+        self.metrics.clear()
+
+    def execute(self, request, label='request', idempotent=True):
+        """Execute one API request under the rate limit, retrying 429/5xx with backoff.
+        A request that is not idempotent (spreadsheets().create) is only retried on 408/429:
+        after a 5xx or a lost connection the server may have carried it out already."""
+        attempts = 0
+        start = self.clock()
+        while True:
+            attempts += 1
+            self.bucket.acquire()
+            try:
+                result = request.execute()
+            except Exception as error:
+                status = error_status(error)
+                if idempotent:
+                    retriable = status in RETRY_STATUSES or isinstance(error, (ConnectionError, TimeoutError))
+                else:
+                    retriable = status in REJECTED_STATUSES
+                if not retriable or attempts > self.max_retries:
+                    self.metrics.append(RequestMetric(label, self.clock() - start, attempts, status))
+                    raise
+                self.sleep(self.backoff_delay(attempts, error))
+                continue
+            self.metrics.append(RequestMetric(label, self.clock() - start, attempts, 200))
+            return result
+
+    def backoff_delay(self, attempt, error=None):
+        """Full-jitter exponential backoff, honouring Retry-After when the server sends it"""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return retry_after
+        return self.rng() * min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+    def queue_values_update(self, spreadsheet_id, range_name, values):
+        """Queue a RAW value write; queued writes to one spreadsheet are sent together by flush()"""
+        self.pending[spreadsheet_id].append({'range': range_name, 'values': values})
+
+    def flush(self, spreadsheet_id=None):
+        """Send queued value writes as one values().batchUpdate per spreadsheet"""
+        targets = [spreadsheet_id] if spreadsheet_id is not None else list(self.pending)
+        for target in targets:
+            data = self.pending.pop(target, [])
+            if not data:
+                continue
+            request = self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=target,
+                body={'valueInputOption': 'RAW', 'data': data}
+            )
+            self.execute(request, f"values.batchUpdate ({len(data)} ranges)")
+
+    def summary(self):
+        """One-line latency summary of the requests made so far"""
+        if not self.metrics:
+            return "0 API requests"
+        total = sum(m.seconds for m in self.metrics)
+        slowest = max(self.metrics, key=lambda m: m.seconds)
+        retries = sum(m.attempts - 1 for m in self.metrics)
+        return (f"{len(self.metrics)} API requests in {total:.2f}s "
+                f"(slowest: {slowest.label} {slowest.seconds:.2f}s, {retries} retries)")
@@ -5,11 +5,39 @@ A tkinter application to manage and view student grades from Project Stem and cl
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import csv
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import os
 import re
+import threading
+import queue
+import time
 from collections import defaultdict
 from google_sheets_integration import GoogleSheetsExporter
+from query_cache import QueryCache
+from file_watcher import FileWatcher
+from class_statistics import (class_statistics, section_overview, histogram_labels, iter_summary_rows,
+                              iter_overview_rows, STAT_GROUPS, PERCENTILES)
+from at_risk import assess, at_risk_tabs, RECENT_STEPS, MISSING_THRESHOLD
+from missing_work import missing_work, missing_work_tabs, SCOPE_DUE, SCOPE_ALL
+from gradebook import (Gradebook, load_grades, load_aliases, save_aliases, load_rosters, load_student_list,
+                       GRADES_CSV, ALL_SECTIONS, normalize_name, display_name, last_name_key, use_locale_collation)
+from student_mapping_analysis import reconcile
+from local_exporters import LOCAL_EXPORTERS
+from student_reports import report_context, write_student_reports
+from grade_reports import (specific_grade, student_grades, assignment_grades, render, csv_name,
+                           StudentNotFound)
+from grade_history import archive_download
+
+GOOGLE_SHEETS_TARGET = 'Google Sheets'
+
+# Width of the text histogram bars in the Class Analytics report
+HISTOGRAM_WIDTH = 40
+
+# How often the Tk loop picks up data reloaded by the file watcher
+RELOAD_POLL_MS = 500
+
+# How often the Tk loop picks up progress of the initial load
+LOAD_POLL_MS = 100
 
 class StudentGradesApp:
     def __init__(self, root):
@@ -17,23 +45,65 @@ class StudentGradesApp:
         self.root.title("Student Grades Management System")
         self.root.geometry("1000x700")
         
+        # Cache of computed query results and rendered reports (cleared on every load_data)
+        self.query_cache = QueryCache(maxsize=256)
+        
         # Data storage
-        self.grades_data = []
-        self.student_names = {}
-        self.assignments = []
-        self.students = []
+        self.install_gradebook(Gradebook.empty())
         
-        # Google Sheets integration
+        # Report shown in the results area as (kind, params, builder), rebuilt after a reload
+        self.current_view = None
+        
+        # Last settings of the at-risk dialog: (recent sub-chapters, missing threshold, earlier download)
+        self.at_risk_settings = (RECENT_STEPS, MISSING_THRESHOLD, '')
+        
+        # Google Sheets integration (session restored from token.pickle in the background)
         self.sheets_exporter = GoogleSheetsExporter()
+        threading.Thread(target=self.sheets_exporter.warm_up, daemon=True).start()
         
         # Create main interface
         self.create_widgets()
         
-        # Load data
+        # Load data on a worker thread; the student buttons are enabled once the rosters and
+        # the name column are in, the other buttons once the gradebook is, Class Analytics
+        # once the class statistics are
+        self.load_queue = queue.Queue()
+        self.load_thread = None
+        self.grades_ready = False
+        # Every load and reload gets the next generation; results of older ones are dropped
+        self.generation = 0
+        # Files changed and not yet applied: held while the first load runs, and carried
+        # into the next reload when a newer one supersedes a reload in flight
+        self.load_done = False
+        self.pending_changes = set()
+        self.pending_lock = threading.Lock()
         self.load_data()
+        
+        # Reload in the background when grades.csv or a roster file changes on disk
+        self.reload_queue = queue.Queue()
+        self.file_watcher = FileWatcher(self.on_files_changed).start()
+        self.root.after(RELOAD_POLL_MS, self.poll_reloads)
     
     def create_widgets(self):
         """Create the main interface widgets"""
+        # Menu bar
+        menubar = tk.Menu(self.root)
+        analytics_menu = tk.Menu(menubar, tearoff=0)
+        analytics_menu.add_command(label="Assignment Statistics by Section...",
+                                   command=self.show_assignment_statistics)
+        analytics_menu.add_command(label="Section Comparison", command=self.show_section_comparison)
+        analytics_menu.add_command(label="At-Risk Students...", command=self.find_at_risk_students)
+        analytics_menu.add_command(label="Missing Work Report...", command=self.find_missing_work)
+        analytics_menu.add_command(label="Student Report Files...", command=self.export_student_reports)
+        analytics_menu.add_separator()
+        analytics_menu.add_command(label="Export Summary Sheet", command=self.export_class_analytics)
+        menubar.add_cascade(label="Class Analytics", menu=analytics_menu)
+        roster_menu = tk.Menu(menubar, tearoff=0)
+        roster_menu.add_command(label="Confirm Name Matches...", command=self.confirm_roster_names)
+        menubar.add_cascade(label="Roster", menu=roster_menu)
+        self.root.config(menu=menubar)
+        self.menubar = menubar
+        
         # Title
         title_label = tk.Label(self.root, text="Student Grades Management System", 
                               font=("Arial", 16, "bold"))
@@ -63,6 +133,25 @@ class StudentGradesApp:
         btn5 = tk.Button(menu_frame, text="5. Export Sub-chapter to Google Sheets",
                          command=self.export_subchapter_to_sheets, width=50, height=2)
         btn5.pack(pady=5)
+
+        # Enabled once the student list is loaded; a report picked before the grades are
+        # in is shown when they are
+        self.student_buttons = [btn1, btn2]
+        # Enabled once the grades are loaded
+        self.data_buttons = [btn3, btn4, btn5]
+
+        # Export target: Google Sheets or an offline local file
+        target_frame = tk.Frame(menu_frame)
+        target_frame.pack(pady=5)
+        tk.Label(target_frame, text="Export to:").pack(side=tk.LEFT, padx=5)
+        self.export_target = tk.StringVar(value=GOOGLE_SHEETS_TARGET)
+        target_combo = ttk.Combobox(target_frame, textvariable=self.export_target, state='readonly', width=25,
+                                    values=[GOOGLE_SHEETS_TARGET] + list(LOCAL_EXPORTERS))
+        target_combo.pack(side=tk.LEFT)
+        # Unchecked: an export identical to the previous one returns that sheet or file
+        self.export_new_copy = tk.BooleanVar(value=False)
+        tk.Checkbutton(target_frame, text="New copy even if unchanged",
+                       variable=self.export_new_copy).pack(side=tk.LEFT, padx=5)
         
         # Results area
         results_frame = tk.Frame(self.root)
@@ -80,139 +169,213 @@ class StudentGradesApp:
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
     def load_data(self):
-        """Load data from CSV files"""
+        """Load data from CSV files on a worker thread. The student list, read progress, the
+        loaded gradebook and then its class statistics come back through poll_load."""
+        self.set_data_ready(students=False, gradebook=False, statistics=False)
+        self.status_var.set(f"Loading {GRADES_CSV}...")
+        with self.pending_lock:
+            self.generation += 1
+            generation = self.generation
+        self.load_thread = threading.Thread(target=self.load_worker, args=(self.load_queue, generation),
+                                            daemon=True)
+        self.load_thread.start()
+        self.root.after(LOAD_POLL_MS, self.poll_load)
+    
+    def load_worker(self, messages, generation):
+        """Runs on the loader thread: no Tk calls here, everything goes through messages
+        tagged with the load's generation"""
+        started = time.time()
+        
+        def progress(students, read, size):
+            messages.put(('progress', generation, students, read, size, time.time() - started))
+        
         try:
-            # Load grades data
-            self.load_grades_data()
-            
-            # Load student names from F2, F5, F6
-            self.load_student_names()
-            
-            # Extract assignments and students
-            self.extract_assignments_and_students()
-            
-            self.status_var.set(f"Data loaded: {len(self.students)} students, {len(self.assignments)} assignments")
-            
+            # F2/F5/F6 rosters and the name column first, for the student dialogs
+            rosters = load_rosters()
+            assignments, students = load_student_list(GRADES_CSV)
+            messages.put(('students', generation, rosters, assignments, students))
+            # Grades, the sub-chapter index and every student's section
+            gradebook = Gradebook.load(progress=progress, rosters=rosters)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load data: {str(e)}")
-            self.status_var.set("Error loading data")
+            messages.put(('error', generation, e))
+            return
+        messages.put(('gradebook', generation, gradebook, time.time() - started))
+        try:
+            messages.put(('statistics', generation, class_statistics(gradebook)))
+        except Exception as e:
+            print(f"Class statistics (non-critical): {e}")
+            messages.put(('statistics', generation, None))
+        self.archive_grades(gradebook)
     
-    def load_grades_data(self):
-        """Load grades data from the main CSV file"""
+    def archive_grades(self, gradebook):
+        """Add the grades download to the history archive (worker threads only)"""
         try:
-            with open('grades.csv', 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                
-                # Skip header and points possible rows
-                header = next(reader)
-                next(reader)  # Skip points possible row
-                
-                # Store assignments (skip first 5 columns which are student info)
-                self.assignments = header[5:]
-                
-                # Load student data
-                for row_num, row in enumerate(reader, start=3):  # Start from row 3 (after header and points)
-                    if row and row[0].strip():
-                        # The CSV reader already handles quotes, so we don't need regex matching
-                        student_name = row[0].strip()
-                        student_id = row[1] if len(row) > 1 else ""
-                        
-                        # Store grades data
-                        grades = {}
-                        for i, assignment in enumerate(self.assignments):
-                            if i + 5 < len(row):
-                                grade_value = row[i + 5].strip()
-                                if grade_value:
-                                    try:
-                                        grades[assignment] = float(grade_value)
-                                    except ValueError:
-                                        grades[assignment] = grade_value
-                                else:
-                                    grades[assignment] = None
-                        
-                        self.grades_data.append({
-                            'name': student_name,
-                            'id': student_id,
-                            'grades': grades
-                        })
-                            
-        except FileNotFoundError:
-            raise Exception("Grades CSV file not found")
+            archive_download(GRADES_CSV, layout=gradebook.layout, records=gradebook.records)
         except Exception as e:
-            raise Exception(f"Error reading grades file: {str(e)}")
+            print(f"Grade history (non-critical): {e}")
     
-    def load_student_names(self):
-        """Load student names from F2, F5, F6 files"""
-        self.student_names = {'F2': [], 'F5': [], 'F6': []}
-        
-        for file_prefix in ['F2', 'F5', 'F6']:
-            filename = f'{file_prefix} - names.csv'
-            try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    for row in reader:
-                        if row and row[0].strip() and row[0].lower() != 'name':
-                            self.student_names[file_prefix].append(row[0].strip())
-            except FileNotFoundError:
-                print(f"Warning: {filename} not found")
-            except Exception as e:
-                print(f"Warning: Error reading {filename}: {str(e)}")
-    
-    def extract_assignments_and_students(self):
-        """Extract unique assignments and students"""
-        self.students = []
-        for student in self.grades_data:
-            # Convert "Last, First" format to "First Last" for display
-            if ',' in student['name']:
-                parts = student['name'].split(', ')
-                if len(parts) == 2:
-                    display_name = f"{parts[1]} {parts[0]}"
+    def poll_load(self):
+        """Apply loader messages on the Tk loop until the load is complete"""
+        if not self.process_load_messages():
+            self.root.after(LOAD_POLL_MS, self.poll_load)
+    
+    def wait_until_loaded(self):
+        """Block until the initial load is done (for scripts that drive the app directly)"""
+        if self.load_thread is not None:
+            self.load_thread.join()
+        self.process_load_messages()
+    
+    def process_load_messages(self):
+        """Handle the queued loader messages; True once the load has finished or failed.
+        Messages of a load that a newer one replaced are dropped."""
+        try:
+            while True:
+                message = self.load_queue.get_nowait()
+                kind, generation = message[:2]
+                if generation != self.generation:
+                    continue
+                if kind == 'progress':
+                    _, _, students, read, size, elapsed = message
+                    rate = students / elapsed if elapsed > 0 else 0
+                    percent = read / size if size else 1.0
+                    self.status_var.set(f"Loading {GRADES_CSV}: {percent:.0%} - {students} students "
+                                        f"({rate:,.0f} rows/s)")
+                elif kind == 'students':
+                    _, _, self.student_names, self.assignments, self.students = message
+                    self.set_data_ready(students=True, gradebook=False, statistics=False)
+                elif kind == 'gradebook':
+                    _, _, gradebook, elapsed = message
+                    self.install_gradebook(gradebook)
+                    self.set_data_ready(students=True, gradebook=True, statistics=False)
+                    storage = "sparse" if self.grades_data and self.grades_data[0].is_sparse else "dense"
+                    status = (f"Data loaded: {len(self.students)} students, {len(self.assignments)} assignments "
+                              f"({storage} storage, {elapsed:.1f}s)")
+                    unmapped = self.gradebook.unmapped_count()
+                    if unmapped:
+                        status += f" - {unmapped} roster names not confirmed (Roster > Confirm Name Matches...)"
+                    self.status_var.set(status)
+                    # A report picked from the student list while the grades loaded
+                    if self.current_view is not None:
+                        self.show_report(*self.current_view)
+                elif kind == 'statistics':
+                    _, _, stats = message
+                    if stats is not None:
+                        self.query_cache.get_or_compute('class_statistics', (), lambda: stats)
+                    self.set_data_ready(students=True, gradebook=True, statistics=True)
+                    self.finish_load()
+                    return True
                 else:
-                    display_name = student['name']
-            else:
-                display_name = student['name']
-            
-            self.students.append(display_name)
+                    messagebox.showerror("Error", f"Failed to load data: {str(message[2])}")
+                    self.status_var.set("Error loading data")
+                    self.finish_load()
+                    return True
+        except queue.Empty:
+            return False
+    
+    def finish_load(self):
+        """The first load is over: from now on the watcher's reloads are applied, starting
+        with the files that changed while it ran"""
+        with self.pending_lock:
+            self.load_done = True
+            changed = sorted(self.pending_changes)
+        if changed:
+            threading.Thread(target=self.on_files_changed, args=(changed,), daemon=True).start()
+    
+    def set_data_ready(self, students, gradebook, statistics):
+        """Enable the student buttons once the student list is loaded, the other menu
+        buttons once the gradebook is, Class Analytics once the class statistics are computed"""
+        self.grades_ready = gradebook
+        for button in self.student_buttons:
+            button.config(state=tk.NORMAL if students else tk.DISABLED)
+        for button in self.data_buttons:
+            button.config(state=tk.NORMAL if gradebook else tk.DISABLED)
+        self.menubar.entryconfig("Roster", state=tk.NORMAL if gradebook else tk.DISABLED)
+        self.menubar.entryconfig("Class Analytics", state=tk.NORMAL if statistics else tk.DISABLED)
+    
+    def install_gradebook(self, gradebook):
+        """Make a loaded Gradebook the app's current data"""
+        self.gradebook = gradebook
+        self.grades_data = gradebook.records
+        self.student_names = gradebook.rosters
+        self.assignments = gradebook.assignments
+        self.students = gradebook.students
+        self.subchapter_index = gradebook.index
         
-        self.students.sort()
+        # Any cached results refer to the previous data
+        self.query_cache.invalidate()
+    
+    def on_files_changed(self, changed):
+        """Called on the watcher thread: load the changed files, hand the result to the Tk
+        loop tagged with a new generation. The files of a reload still in flight are
+        loaded again, since its result is dropped."""
+        with self.pending_lock:
+            self.pending_changes.update(changed)
+            if not self.load_done:
+                # Reloading now would build on the empty gradebook; wait for the first load
+                return
+            self.generation += 1
+            generation = self.generation
+            changed = sorted(self.pending_changes)
+        grades_changed = GRADES_CSV in changed
+        rosters_changed = any(name != GRADES_CSV for name in changed)
+        try:
+            gradebook = self.gradebook.reload(grades=grades_changed, rosters=rosters_changed)
+        except Exception as e:
+            self.reload_queue.put((generation, None, changed, e))
+            return
+        self.reload_queue.put((generation, gradebook, changed, None))
+        if grades_changed:
+            self.archive_grades(gradebook)
+    
+    def poll_reloads(self):
+        """Install data reloaded by the watcher thread (runs on the Tk loop)"""
+        try:
+            while True:
+                generation, gradebook, changed, error = self.reload_queue.get_nowait()
+                with self.pending_lock:
+                    current = generation == self.generation
+                    if current and error is None:
+                        self.pending_changes.clear()
+                if not current:
+                    # A newer reload, which covers these files too, is on its way
+                    continue
+                if error is not None:
+                    print(f"Reload failed (non-critical): {error}")
+                    self.status_var.set(f"Reload of {', '.join(changed)} failed, keeping previous data: {error}")
+                else:
+                    self.apply_reload(gradebook, changed)
+        except queue.Empty:
+            pass
+        self.root.after(RELOAD_POLL_MS, self.poll_reloads)
+    
+    def apply_reload(self, gradebook, changed):
+        """Swap in the reloaded data and rebuild the report on screen"""
+        self.install_gradebook(gradebook)
+        # Also covers a first load that failed, e.g. before grades.csv was saved
+        self.set_data_ready(students=True, gradebook=True, statistics=True)
+        if self.current_view is not None:
+            self.show_report(*self.current_view)
+        self.status_var.set(f"Reloaded {', '.join(changed)} at {time.strftime('%H:%M:%S')}: "
+                            f"{len(self.students)} students, {len(self.assignments)} assignments")
+    
+    def show_report(self, kind, params, builder):
+        """Display a cached report and remember it as the current view (shown once the
+        grades are in when they are still loading)"""
+        if not self.grades_ready:
+            self.current_view = (kind, params, builder)
+            return
+        result = self.query_cache.get_or_compute(kind, params, lambda: builder(*params))
+        self.display_result(result)
+        self.current_view = (kind, params, builder)
     
     def normalize_name(self, name):
         """Normalize names for comparison"""
-        return re.sub(r'\s+', ' ', name.strip().lower())
+        return normalize_name(name)
     
     def find_student_in_grades(self, search_name):
-        """Find a student in grades data using flexible matching"""
-        search_normalized = self.normalize_name(search_name)
-        
-        for student in self.grades_data:
-            # Convert "Last, First" format to "First Last" for comparison
-            if ',' in student['name']:
-                parts = student['name'].split(', ')
-                if len(parts) == 2:
-                    student_display_name = f"{parts[1]} {parts[0]}"
-                else:
-                    student_display_name = student['name']
-            else:
-                student_display_name = student['name']
-            
-            student_normalized = self.normalize_name(student_display_name)
-            
-            # Check exact match
-            if search_normalized == student_normalized:
-                return student
-            
-            # Check flexible matching (first and last name)
-            search_parts = search_normalized.split()
-            student_parts = self.normalize_name(student['name']).split(', ')
-            
-            if len(search_parts) >= 2 and len(student_parts) >= 2:
-                search_first_last = {search_parts[0], search_parts[-1]}
-                student_first_last = {student_parts[1].split()[0], student_parts[0].split()[0]}
-                
-                if search_first_last == student_first_last:
-                    return student
-        
-        return None
+        """Find a student in grades data: an index lookup for names picked in a dialog,
+        flexible matching for typed names"""
+        return self.gradebook.find_student(search_name)
     
     def find_specific_grade(self):
         """Menu option 1: Find grade for specific student and assignment"""
@@ -221,28 +384,14 @@ class StudentGradesApp:
         
         if dialog.result:
             student_name, assignment = dialog.result
-            student = self.find_student_in_grades(student_name)
-            
-            if student:
-                grade = student['grades'].get(assignment)
-                if grade is not None:
-                    result = f"Student: {student_name}\n"
-                    result += f"Assignment: {assignment}\n"
-                    result += f"Grade: {grade}\n"
-                    result += f"Student ID: {student['id']}\n"
-                else:
-                    result = f"Student: {student_name}\n"
-                    result += f"Assignment: {assignment}\n"
-                    result += "Grade: Not submitted/No grade\n"
-            else:
-                result = f"Student '{student_name}' not found in grades data.\n"
-                result += "Available students:\n"
-                for s in self.students[:10]:  # Show first 10 as examples
-                    result += f"  - {s}\n"
-                if len(self.students) > 10:
-                    result += f"  ... and {len(self.students) - 10} more\n"
-            
-            self.display_result(result)
+            # Reports of an assignment are keyed by its ID, so they survive a rename on reload
+            self.show_report('specific_grade_report', (student_name, self.gradebook.assignment_key(assignment)),
+                             self.build_specific_grade_report)
+            self.show_cache_status()
+    
+    def build_specific_grade_report(self, student_name, assignment):
+        """Build the report text for menu option 1 (assignment: header or ID)"""
+        return render(specific_grade(self.gradebook, student_name, assignment, self.lookup_student(student_name)))
     
     def find_student_grades(self):
         """Menu option 2: Find all grades for a specific student"""
@@ -251,81 +400,18 @@ class StudentGradesApp:
         
         if dialog.result:
             student_name = dialog.result
-            student = self.find_student_in_grades(student_name)
-            
-            if student:
-                result = f"All Grades for: {student_name}\n"
-                result += f"Student ID: {student['id']}\n"
-                result += "=" * 50 + "\n\n"
-                
-                # Group assignments by type
-                lesson_practice = []
-                code_practice = []
-                assignments = []
-                quizzes = []
-                tests = []
-                other = []
-                
-                for assignment, grade in student['grades'].items():
-                    if grade is not None:
-                        if "Lesson Practice" in assignment:
-                            lesson_practice.append((assignment, grade))
-                        elif "Code Practice" in assignment:
-                            code_practice.append((assignment, grade))
-                        elif "Assignment" in assignment:
-                            assignments.append((assignment, grade))
-                        elif "Quiz" in assignment:
-                            quizzes.append((assignment, grade))
-                        elif "Test" in assignment:
-                            tests.append((assignment, grade))
-                        else:
-                            other.append((assignment, grade))
-                
-                # Display by category
-                if lesson_practice:
-                    result += "LESSON PRACTICE:\n"
-                    for assignment, grade in lesson_practice:
-                        result += f"  {assignment}: {grade}\n"
-                    result += "\n"
-                
-                if code_practice:
-                    result += "CODE PRACTICE:\n"
-                    for assignment, grade in code_practice:
-                        result += f"  {assignment}: {grade}\n"
-                    result += "\n"
-                
-                if assignments:
-                    result += "ASSIGNMENTS:\n"
-                    for assignment, grade in assignments:
-                        result += f"  {assignment}: {grade}\n"
-                    result += "\n"
-                
-                if quizzes:
-                    result += "QUIZZES:\n"
-                    for assignment, grade in quizzes:
-                        result += f"  {assignment}: {grade}\n"
-                    result += "\n"
-                
-                if tests:
-                    result += "TESTS:\n"
-                    for assignment, grade in tests:
-                        result += f"  {assignment}: {grade}\n"
-                    result += "\n"
-                
-                if other:
-                    result += "OTHER:\n"
-                    for assignment, grade in other:
-                        result += f"  {assignment}: {grade}\n"
-                    result += "\n"
-                
-                # Summary
-                total_grades = len([g for g in student['grades'].values() if g is not None])
-                result += f"Total completed assignments: {total_grades}\n"
-                
-            else:
-                result = f"Student '{student_name}' not found in grades data.\n"
-            
-            self.display_result(result)
+            self.show_report('student_report', (student_name,), self.build_student_report)
+            self.show_cache_status()
+    
+    def build_student_report(self, student_name):
+        """Build the categorized report text for menu option 2"""
+        if self.lookup_student(student_name) is None:
+            return render(StudentNotFound(student_name, None, len(self.students)))
+        return render(student_grades(self.gradebook, student_name, self.get_report_context()))
+    
+    def get_report_context(self):
+        """Assignment headers and types shared by every student report, computed once per gradebook"""
+        return self.query_cache.get_or_compute('report_context', (), lambda: report_context(self.gradebook))
     
     def find_assignment_grades(self):
         """Menu option 3: Find all grades for a specific assignment"""
@@ -334,92 +420,336 @@ class StudentGradesApp:
         
         if dialog.result:
             assignment = dialog.result
-            result = f"All Grades for Assignment: {assignment}\n"
-            result += "=" * 50 + "\n\n"
-            
-            # Group students by their class sections (F2, F5, F6)
-            f2_grades = []
-            f5_grades = []
-            f6_grades = []
-            other_grades = []
-            
-            for student in self.grades_data:
-                # Get the raw grade (may be None if not submitted)
-                grade = student['grades'].get(assignment)
-
-                # Determine which class section this student belongs to (None -> Other)
-                student_section = self.get_student_section(student['name'])
-
-                # Display empty string for missing grades so the student still appears in the roster
-                display_grade = grade if grade is not None else ""
-
-                if student_section == 'F2':
-                    f2_grades.append((student['name'], display_grade))
-                elif student_section == 'F5':
-                    f5_grades.append((student['name'], display_grade))
-                elif student_section == 'F6':
-                    f6_grades.append((student['name'], display_grade))
-                else:
-                    other_grades.append((student['name'], display_grade))
-            
-            # Display results by section
-            total_students_with_grades = len(f2_grades) + len(f5_grades) + len(f6_grades) + len(other_grades)
-            result += f"Total students with grades: {total_students_with_grades}\n\n"
-            
-            # F2 Section
-            if f2_grades:
-                f2_grades.sort(key=lambda x: self.get_last_name(x[0]))
-                result += "F2 SECTION:\n"
-                result += "-" * 20 + "\n"
-                for student_name, grade in f2_grades:
-                    csv_format = self.format_csv_name(student_name, grade)
-                    result += f"{csv_format}\n"
-                result += f"\nF2 Total: {len(f2_grades)} students\n\n"
-            
-            # F5 Section
-            if f5_grades:
-                f5_grades.sort(key=lambda x: self.get_last_name(x[0]))
-                result += "F5 SECTION:\n"
-                result += "-" * 20 + "\n"
-                for student_name, grade in f5_grades:
-                    csv_format = self.format_csv_name(student_name, grade)
-                    result += f"{csv_format}\n"
-                result += f"\nF5 Total: {len(f5_grades)} students\n\n"
-            
-            # F6 Section
-            if f6_grades:
-                f6_grades.sort(key=lambda x: self.get_last_name(x[0]))
-                result += "F6 SECTION:\n"
-                result += "-" * 20 + "\n"
-                for student_name, grade in f6_grades:
-                    csv_format = self.format_csv_name(student_name, grade)
-                    result += f"{csv_format}\n"
-                result += f"\nF6 Total: {len(f6_grades)} students\n\n"
-            
-            # Other students (not in F2, F5, F6)
-            if other_grades:
-                other_grades.sort(key=lambda x: self.get_last_name(x[0]))
-                result += "OTHER STUDENTS:\n"
-                result += "-" * 20 + "\n"
-                for student_name, grade in other_grades:
-                    csv_format = self.format_csv_name(student_name, grade)
-                    result += f"{csv_format}\n"
-                result += f"\nOther Total: {len(other_grades)} students\n\n"
+            self.show_report('assignment_report', (self.gradebook.assignment_key(assignment),),
+                             self.build_assignment_report)
+            self.show_cache_status()
+    
+    def build_assignment_report(self, assignment):
+        """Build the per-section report text for menu option 3 (assignment: header or ID)"""
+        return render(assignment_grades(self.gradebook, assignment, self.get_assignment_section_grades(assignment)))
+    
+    def get_class_statistics(self):
+        """Statistics for every assignment x section, computed once per load"""
+        return self.query_cache.get_or_compute(
+            'class_statistics', (), lambda: class_statistics(self.gradebook))
+    
+    def show_assignment_statistics(self):
+        """Class Analytics: per-section statistics and grade distribution of one assignment"""
+        dialog = AssignmentSelectionDialog(self.root, self.assignments)
+        self.root.wait_window(dialog.dialog)
+        
+        if dialog.result:
+            self.show_report('assignment_statistics', (self.gradebook.assignment_key(dialog.result),),
+                             self.build_assignment_statistics_report)
+            self.show_cache_status()
+    
+    def build_assignment_statistics_report(self, assignment):
+        """Build the Class Analytics report text for one assignment (header or ID)"""
+        column = self.gradebook.layout.column(assignment)
+        if column is None:
+            return f"Assignment '{assignment}' not found in grades data.\n"
+        assignment = self.assignments[column]
+        stats = self.get_class_statistics()
+        points = self.gradebook.layout.points[column]
+        
+        result = f"Class Analytics: {assignment}\n"
+        result += "=" * 50 + "\n"
+        if points == points:  # not NaN
+            result += f"Points possible: {points}\n"
+        result += "\n"
+        
+        def number(value):
+            return f"{value:7.2f}" if value is not None else "      -"
+        
+        result += (f"{'Section':<8}{'Students':>9}{'Submitted':>10}{'Rate':>7}{'Mean':>7}{'Median':>7}{'StdDev':>7}"
+                   + "".join(f"{'P' + str(q):>7}" for q in PERCENTILES) + f"{'Low':>7}{'High':>7}\n")
+        result += "-" * 99 + "\n"
+        for group in STAT_GROUPS:
+            s = stats[column, group]
+            result += (f"{group:<8}{s.students:>9}{s.submitted:>10}{s.submission_rate:>7.0%}"
+                       f"{number(s.mean)}{number(s.median)}{number(s.stdev)}"
+                       f"{number(s.p25)}{number(s.p75)}{number(s.p90)}{number(s.lowest)}{number(s.highest)}\n")
+        
+        result += "\nGRADE DISTRIBUTION (share of points possible):\n"
+        labels = histogram_labels()
+        for group in STAT_GROUPS:
+            s = stats[column, group]
+            if not s.graded:
+                continue
+            result += f"\n{group}:\n"
+            for label, count in zip(labels, s.histogram):
+                bar = "#" * round(count / s.graded * HISTOGRAM_WIDTH)
+                result += f"  {label:>8} {bar:<{HISTOGRAM_WIDTH}} {count}\n"
+        
+        return result
+    
+    def show_section_comparison(self):
+        """Class Analytics: submission rates and means of every assignment side by side per section"""
+        self.show_report('section_comparison', (), self.build_section_comparison_report)
+        self.show_cache_status()
+    
+    def build_section_comparison_report(self):
+        """Build the Class Analytics section comparison text"""
+        stats = self.get_class_statistics()
+        columns = range(len(self.assignments))
+        
+        result = "Class Analytics: Section Comparison\n"
+        result += "=" * 50 + "\n\n"
+        result += "OVERVIEW (averages over all assignments):\n"
+        for group, (rate, share) in section_overview(stats, columns, self.gradebook.layout).items():
+            share_text = f"{share:.0%}" if share is not None else "-"
+            result += f"  {group:<6} submission rate {rate:4.0%}   mean score {share_text} of points possible\n"
+        
+        result += "\nPER ASSIGNMENT (submission rate / mean):\n"
+        for column in columns:
+            cells = []
+            for group in STAT_GROUPS:
+                s = stats[column, group]
+                mean_text = f"{s.mean:.2f}" if s.mean is not None else "-"
+                cells.append(f"{group} {s.submission_rate:.0%}/{mean_text}")
+            result += f"{self.assignments[column]}\n  " + "   ".join(cells) + "\n"
+        
+        return result
+    
+    def export_class_analytics(self):
+        """Class Analytics: export the summary sheet for every assignment x section"""
+        stats = self.get_class_statistics()
+        columns = range(len(self.assignments))
+        self.export_report("Class Analytics", [
+            ("Summary", iter_summary_rows(stats, self.assignments, columns)),
+            ("Sections", iter_overview_rows(stats, columns, self.gradebook.layout)),
+        ])
+    
+    def find_at_risk_students(self):
+        """Class Analytics: students who have fallen behind, ranked per section"""
+        dialog = AtRiskDialog(self.root, self.at_risk_settings)
+        self.root.wait_window(dialog.dialog)
+        
+        if not dialog.result:
+            return
+        action, settings = dialog.result
+        self.at_risk_settings = settings
+        
+        if action == 'export':
+            try:
+                report = self.get_at_risk_report(*settings)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to compute at-risk students: {str(e)}")
+                return
+            self.export_report("At-Risk Students", at_risk_tabs(report))
+        else:
+            self.show_report('at_risk_report', settings, self.build_at_risk_report)
+            self.show_cache_status()
+    
+    def get_at_risk_report(self, recent_steps, missing_threshold, previous_path):
+        """Cached at-risk assessment; previous_path is an earlier grades download or ''"""
+        def compute():
+            previous = load_grades(previous_path)[1] if previous_path else None
+            return assess(self.gradebook, recent_steps, missing_threshold, previous=previous)
+        return self.query_cache.get_or_compute(
+            'at_risk', (recent_steps, missing_threshold, previous_path), compute)
+    
+    def build_at_risk_report(self, recent_steps, missing_threshold, previous_path):
+        """Build the ranked at-risk report text"""
+        try:
+            report = self.get_at_risk_report(recent_steps, missing_threshold, previous_path)
+        except Exception as e:
+            return f"Failed to compute at-risk students: {str(e)}\n"
+        
+        flagged = [e for e in report.entries if e.flagged]
+        result = "At-Risk Students\n"
+        result += "=" * 50 + "\n"
+        if report.recent:
+            result += (f"Recent sub-chapters: {', '.join(report.recent)} "
+                       f"({len(report.recent_columns)} items most of the class has done)\n")
+        else:
+            result += "No items have been done by most of the class yet.\n"
+        if previous_path:
+            result += f"Compared with: {previous_path}\n"
+        result += f"Flagged: {len(flagged)} of {len(report.entries)} students\n\n"
+        
+        for section in ALL_SECTIONS:
+            entries = [e for e in flagged if e.section == section]
+            if not entries:
+                continue
+            title = "OTHER STUDENTS" if section == 'Other' else f"{section} SECTION"
+            result += f"{title} ({len(entries)} flagged):\n"
+            result += "-" * 20 + "\n"
+            for rank, entry in enumerate(entries, start=1):
+                result += f"{rank:>3}. {self.format_display_name(entry.name)} (risk {entry.score:.2f})\n"
+                result += f"       {'; '.join(entry.reasons)}\n"
+            result += "\n"
+        
+        return result
+    
+    def find_missing_work(self):
+        """Class Analytics: every student's missing assignments by sub-chapter, for all sections"""
+        dialog = MissingWorkDialog(self.root)
+        self.root.wait_window(dialog.dialog)
+        
+        if not dialog.result:
+            return
+        action, scope = dialog.result
+        if action == 'export':
+            self.export_report("Missing Work", missing_work_tabs(self.get_missing_work(scope)))
+        else:
+            self.show_report('missing_work_report', (scope,), self.build_missing_work_report)
+            self.show_cache_status()
+    
+    def export_student_reports(self):
+        """Class Analytics: write the option 2 report of every student (or one section) to
+        its own file, e.g. for parent conferences"""
+        dialog = StudentReportsDialog(self.root)
+        self.root.wait_window(dialog.dialog)
+        
+        if not dialog.result:
+            return
+        section, fmt = dialog.result
+        try:
+            self.status_var.set("Writing student reports...")
+            self.root.update()
+            started = time.time()
+            folder, paths = write_student_reports(self.gradebook, section=section, fmt=fmt)
+            self.display_result(f"Wrote {len(paths)} student reports to:\n{os.path.abspath(folder)}\n")
+            self.status_var.set(f"Wrote {len(paths)} student reports in {time.time() - started:.1f}s")
+        except Exception as e:
+            messagebox.showerror("Report Error", f"Error writing student reports: {str(e)}")
+            self.status_var.set("Writing student reports failed")
+    
+    def get_missing_work(self, scope):
+        return self.query_cache.get_or_compute(
+            'missing_work', (scope,), lambda: missing_work(self.gradebook, scope))
+    
+    def build_missing_work_report(self, scope):
+        """Build the missing-work report text"""
+        report = self.get_missing_work(scope)
+        
+        result = "Missing Work by Sub-chapter\n"
+        result += "=" * 50 + "\n"
+        if scope == SCOPE_DUE:
+            result += "Assignments most of the class has already done"
+        else:
+            result += "Every assignment in the course order"
+        result += f" ({len(report.steps)} sub-chapters)\n"
+        result += "Numbers are assignment IDs\n\n"
+        
+        for section in ALL_SECTIONS:
+            entries = report.sections[section]
+            if not entries:
+                continue
+            title = "OTHER STUDENTS" if section == 'Other' else f"{section} SECTION"
+            result += f"{title} ({len(entries)} students with missing work):\n"
+            result += "-" * 20 + "\n"
+            for entry in entries:
+                groups = "; ".join(f"{label}: {', '.join(map(str, ids))}" for label, ids in entry.missing)
+                result += f"{self.format_display_name(entry.name)} ({entry.count} missing)\n  {groups}\n"
+            result += "\n"
+        
+        if not any(report.sections.values()):
+            result += "No missing work.\n"
+        
+        return result
+    
+    def export_report(self, title, tabs):
+        """Export report tabs [(tab name, rows), ...] to the selected export target"""
+        try:
+            exporter, target = self.get_exporter()
+            self.status_var.set(f"Exporting {title} to {target}...")
+            self.root.update()
             
-            # Overall Statistics
-            all_grades = f2_grades + f5_grades + f6_grades + other_grades
-            numeric_grades = [g for _, g in all_grades if isinstance(g, (int, float))]
-            if numeric_grades:
-                result += "OVERALL STATISTICS:\n"
-                result += "-" * 20 + "\n"
-                result += f"Average: {sum(numeric_grades) / len(numeric_grades):.2f}\n"
-                result += f"Highest: {max(numeric_grades)}\n"
-                result += f"Lowest: {min(numeric_grades)}\n"
+            sheet_url = exporter.export_report_to_sheets(title, tabs)
             
-            if total_students_with_grades == 0:
-                result += "No students have submitted this assignment.\n"
+            if sheet_url:
+                result = f"Successfully exported {title} to {target}:\n{sheet_url}\n"
+                self.status_var.set(self.export_status(exporter))
+            else:
+                result = f"Failed to export {title} to {target}."
+                self.status_var.set("Export failed")
             
             self.display_result(result)
+        
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Error exporting {title}: {str(e)}")
+            self.status_var.set("Export failed")
+    
+    def confirm_roster_names(self):
+        """Roster menu: confirm which student each roster name without an alias is.
+        Confirmed names are saved to the alias table and never matched by name again."""
+        gradebook = self.gradebook
+        if not gradebook.unmapped_count():
+            messagebox.showinfo("Roster Names", "Every roster name is mapped to a student ID.")
+            return
+        
+        # Only students no alias claims yet can be proposed
+        free = [r for r in gradebook.records if r.id not in gradebook.aliased_ids]
+        proposals = reconcile(gradebook.unmapped, free, workers=1).matches
+        dialog = AliasConfirmDialog(self.root, proposals, free)
+        self.root.wait_window(dialog.dialog)
+        
+        if not dialog.result:
+            return
+        try:
+            aliases = load_aliases()
+            for section, name, record in dialog.result:
+                aliases.setdefault(section, {})[name] = {'id': record.id, 'name': record.name, 'method': 'confirmed'}
+            save_aliases(aliases)
+            self.install_gradebook(gradebook.reload(grades=False, rosters=True))
+            if self.current_view is not None:
+                self.show_report(*self.current_view)
+            self.status_var.set(f"Confirmed {len(dialog.result)} roster names - "
+                                f"{self.gradebook.unmapped_count()} left to confirm")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save the alias table: {str(e)}")
+    
+    def get_assignment_section_grades(self, assignment):
+        """Return (f2, f5, f6, other) tuples of (student name, grade) for one assignment,
+        each in roster order (last name, then first name, sorted once at load).
+        Results are cached by assignment ID until the next load_data."""
+        return self.query_cache.get_or_compute(
+            'assignment_sections', (self.gradebook.assignment_key(assignment),),
+            lambda: self._group_assignment_grades(assignment))
+    
+    def _group_assignment_grades(self, assignment):
+        grades = self.gradebook.assignment_section_grades(assignment)
+        # Tuples, because cached results are shared between callers
+        return tuple(tuple(grades[section]) for section in ALL_SECTIONS)
+    
+    def lookup_student(self, student_name):
+        """Cached wrapper around find_student_in_grades"""
+        return self.query_cache.get_or_compute(
+            'student_lookup', (student_name,),
+            lambda: self.find_student_in_grades(student_name))
+    
+    def show_cache_status(self):
+        """Show the query cache hit/miss counters in the status bar"""
+        if not self.grades_ready:
+            self.status_var.set("Loading grades - the report is shown once they are in")
+            return
+        stats = self.query_cache.stats()
+        self.status_var.set(f"Ready - {len(self.students)} students, {len(self.assignments)} assignments "
+                            f"(cache: {stats['hits']} hits, {stats['misses']} misses)")
+    
+    def get_exporter(self):
+        """Return (exporter, target name) for the export target picked in the main window"""
+        target = self.export_target.get()
+        if target in LOCAL_EXPORTERS:
+            exporter = LOCAL_EXPORTERS[target]()
+        else:
+            exporter, target = self.sheets_exporter, GOOGLE_SHEETS_TARGET
+        exporter.reuse_unchanged = not self.export_new_copy.get()
+        return exporter, target
+    
+    def export_status(self, exporter):
+        """Status bar text after a successful export, with API request metrics when available"""
+        snapshot = getattr(exporter, 'last_snapshot', None)
+        if snapshot is not None and snapshot[1]:
+            if snapshot[0].target == GOOGLE_SHEETS_TARGET:
+                return f"Export unchanged since {snapshot[0].created} - reused the existing sheet (nothing uploaded)"
+            return f"Export unchanged since {snapshot[0].created} - reused the existing file"
+        scheduler = getattr(exporter, 'scheduler', None)
+        if scheduler is not None:
+            return f"Export completed successfully - {scheduler.summary()}"
+        return "Export completed successfully"
     
     def export_to_google_sheets(self):
         """Menu option 4: Export assignment grades to Google Sheets"""
@@ -429,79 +759,61 @@ class StudentGradesApp:
         if dialog.result:
             assignment = dialog.result
             
-            # Group students by their class sections (F2, F5, F6)
-            f2_grades = []
-            f5_grades = []
-            f6_grades = []
-            other_grades = []
-            
-            for student in self.grades_data:
-                # Get the raw grade (may be None if not submitted)
-                grade = student['grades'].get(assignment)
-
-                # Determine which class section this student belongs to (None -> Other)
-                student_section = self.get_student_section(student['name'])
-
-                # Use empty string for missing grades so the student appears on the exported roster
-                display_grade = grade if grade is not None else ""
-
-                if student_section == 'F2':
-                    f2_grades.append((student['name'], display_grade))
-                elif student_section == 'F5':
-                    f5_grades.append((student['name'], display_grade))
-                elif student_section == 'F6':
-                    f6_grades.append((student['name'], display_grade))
-                else:
-                    other_grades.append((student['name'], display_grade))
-            
-            # Sort each section by last name
-            f2_grades.sort(key=lambda x: self.get_last_name(x[0]))
-            f5_grades.sort(key=lambda x: self.get_last_name(x[0]))
-            f6_grades.sort(key=lambda x: self.get_last_name(x[0]))
-            other_grades.sort(key=lambda x: self.get_last_name(x[0]))
+            # Grouped per section in roster order (shared with option 3)
+            f2_grades, f5_grades, f6_grades, other_grades = self.get_assignment_section_grades(assignment)
             
-            # Export to Google Sheets
+            # Export to Google Sheets (or the selected local file format)
             try:
-                self.status_var.set("Exporting to Google Sheets...")
+                exporter, target = self.get_exporter()
+                self.status_var.set(f"Exporting to {target}...")
                 self.root.update()
                 
-                sheet_url = self.sheets_exporter.export_to_sheets(
+                sheet_url = exporter.export_to_sheets(
                     assignment, f2_grades, f5_grades, f6_grades, other_grades
                 )
                 
                 if sheet_url:
-                    result = f"Successfully exported to Google Sheets!\n\n"
+                    result = f"Successfully exported to {target}!\n\n"
                     result += f"Assignment: {assignment}\n"
                     result += f"F2 students: {len(f2_grades)}\n"
                     result += f"F5 students: {len(f5_grades)}\n"
                     result += f"F6 students: {len(f6_grades)}\n"
                     result += f"Other students: {len(other_grades)}\n\n"
-                    result += f"Google Sheet URL:\n{sheet_url}\n\n"
-                    result += "Click the URL above to open your Google Sheet!"
+                    if target == GOOGLE_SHEETS_TARGET:
+                        result += f"Google Sheet URL:\n{sheet_url}\n\n"
+                        result += "Click the URL above to open your Google Sheet!"
+                    else:
+                        result += f"Saved to:\n{sheet_url}\n"
                     
-                    self.status_var.set("Export completed successfully")
-                else:
+                    rejected = getattr(exporter, 'rejected_names', [])
+                    if rejected:
+                        result += f"\n\nSkipped {len(rejected)} student(s) whose name is not in 'Last, First' form:\n"
+                        for name in rejected:
+                            result += f"  - {name}\n"
+                    
+                    self.status_var.set(self.export_status(exporter))
+                elif target == GOOGLE_SHEETS_TARGET:
                     result = "Failed to export to Google Sheets. Please check your credentials."
                     self.status_var.set("Export failed")
+                else:
+                    result = f"Failed to export to {target}."
+                    self.status_var.set("Export failed")
                 
                 self.display_result(result)
                 
             except Exception as e:
-                error_msg = f"Error exporting to Google Sheets: {str(e)}"
+                error_msg = f"Error exporting to {self.export_target.get()}: {str(e)}"
                 messagebox.showerror("Export Error", error_msg)
                 self.status_var.set("Export failed")
 
     def export_subchapter_to_sheets(self):
-        """Menu option 5: Export all assignments for a sub-chapter (e.g., 1.4) to Google Sheets
+        """Menu option 5: Export all assignments for a sub-chapter (e.g., 1.4), a unit (e.g., 3)
+        or a range of sub-chapters (e.g., 1.2-1.5) to Google Sheets
         Each section (F2, F5, F6, Other) gets its own worksheet. The worksheet columns are:
         Last Name | First Name | <subchapter Lesson Practice> | <subchapter Code Practice Q1> | Q2 | Q3 ...
         """
-        # Build a list of unique sub-chapter prefixes from assignments (token before first space)
-        prefixes = []
-        for a in self.assignments:
-            tok = a.strip().split()[0] if a.strip() else ''
-            if tok and tok not in prefixes:
-                prefixes.append(tok)
+        # Sub-chapters in numeric order, from the index built at load time
+        prefixes = self.subchapter_index.prefixes()
 
         dialog = SubChapterDialog(self.root, prefixes)
         self.root.wait_window(dialog.dialog)
@@ -511,64 +823,31 @@ class StudentGradesApp:
 
         subchapter = dialog.result.strip()
 
-        # Find matching assignments for the chosen prefix
-        matching = [a for a in self.assignments if a.strip().startswith(subchapter)]
+        # Exact sub-chapter, whole unit ("3") or range ("1.2-1.5")
+        matching_columns = self.subchapter_index.lookup(subchapter)
+        matching = [self.assignments[c] for c in matching_columns]
 
         if not matching:
             messagebox.showinfo("No assignments", f"No assignments found for sub-chapter {subchapter}")
             return
 
-        # Build per-section data with split: {'F2': {'submitted': [...], 'not_submitted': [...]}, ...}
-        sections = {k: {'submitted': [], 'not_submitted': []} for k in ['F2', 'F5', 'F6', 'Other']}
-
-        for student in self.grades_data:
-            section = self.get_student_section(student['name']) or 'Other'
-
-            # Parse names
-            if ',' in student['name']:
-                parts = student['name'].split(', ')
-                last = parts[0].strip() if parts else ''
-                first = parts[1].strip() if len(parts) > 1 else ''
-            else:
-                parts = student['name'].split()
-                first = parts[0].strip() if parts else ''
-                last = parts[-1].strip() if len(parts) > 1 else ''
-
-            # Build base row [Last, First]
-            base = [last, first]
-
-            # Build row of grades for matching assignments
-            grade_row = []
-            any_submitted = False
-            for a in matching:
-                g = student['grades'].get(a)
-                if g is not None:
-                    any_submitted = True
-                    grade_row.append(g)
-                else:
-                    grade_row.append("")
-
-            full_row = base + grade_row
-
-            key = section if section in ['F2', 'F5', 'F6'] else 'Other'
-            if any_submitted:
-                sections[key]['submitted'].append(full_row)
-            else:
-                sections[key]['not_submitted'].append(full_row)
+        # Per-section data with split: {'F2': {'submitted': [...], 'not_submitted': [...]}, ...}
+        _, sections = self.gradebook.subchapter_sections(subchapter)
 
         # Call exporter
         try:
-            self.status_var.set("Exporting subchapter to Google Sheets...")
+            exporter, target = self.get_exporter()
+            self.status_var.set(f"Exporting subchapter to {target}...")
             self.root.update()
 
-            sheet_url = self.sheets_exporter.export_subchapter_to_sheets(subchapter, matching, sections)
+            sheet_url = exporter.export_subchapter_to_sheets(subchapter, matching, sections)
 
             if sheet_url:
-                result = f"Successfully exported sub-chapter {subchapter} to Google Sheets:\n{sheet_url}\n"
+                result = f"Successfully exported sub-chapter {subchapter} to {target}:\n{sheet_url}\n"
                 result += "\nLegend: blank cell = no submission"
-                self.status_var.set("Export completed successfully")
+                self.status_var.set(self.export_status(exporter))
             else:
-                result = "Failed to export sub-chapter to Google Sheets."
+                result = f"Failed to export sub-chapter to {target}."
                 self.status_var.set("Export failed")
 
             self.display_result(result)
@@ -579,84 +858,27 @@ class StudentGradesApp:
     
     def get_student_section(self, student_name):
         """Determine which class section (F2, F5, F6) a student belongs to"""
-        # Convert "Last, First" format to "First Last" for comparison
-        if ',' in student_name:
-            parts = student_name.split(', ')
-            if len(parts) == 2:
-                display_name = f"{parts[1]} {parts[0]}"
-            else:
-                display_name = student_name
-        else:
-            display_name = student_name
-        
-        # Check each section with flexible matching
-        for section, names in self.student_names.items():
-            for name in names:
-                # Try exact match first
-                if self.normalize_name(display_name) == self.normalize_name(name):
-                    return section
-                
-                # Try flexible matching for names like "Riley Sky Mantaring" vs "Mantaring, Riley"
-                display_parts = self.normalize_name(display_name).split()
-                name_parts = self.normalize_name(name).split()
-                
-                if len(display_parts) >= 2 and len(name_parts) >= 2:
-                    # Check if first and last names match, ignoring middle names
-                    display_first_last = {display_parts[0], display_parts[-1]}
-                    name_first_last = {name_parts[0], name_parts[-1]}
-                    
-                    if display_first_last == name_first_last:
-                        return section
-        
-        return None  # Not found in any section
+        return self.gradebook.student_section(student_name)
     
     def format_display_name(self, student_name):
         """Convert 'Last, First' format to 'First Last' for display"""
-        if ',' in student_name:
-            parts = student_name.split(', ')
-            if len(parts) == 2:
-                return f"{parts[1]} {parts[0]}"
-        return student_name
+        return display_name(student_name)
     
     def get_last_name(self, student_name):
         """Extract last name for sorting purposes"""
-        if ',' in student_name:
-            # Format: "Last, First" - last name is the first part
-            parts = student_name.split(', ')
-            if len(parts) >= 1:
-                return parts[0].strip().lower()
-        else:
-            # Format: "First Last" - last name is the last part
-            parts = student_name.split()
-            if len(parts) >= 2:
-                return parts[-1].strip().lower()
-        return student_name.strip().lower()
+        return last_name_key(student_name)
     
     def format_csv_name(self, student_name, grade):
         """Format student name and grade as CSV: Last name, First name, Grade"""
-        if ',' in student_name:
-            # Format: "Last, First" - already in correct order
-            parts = student_name.split(', ')
-            if len(parts) >= 2:
-                last_name = parts[0].strip()
-                first_name = parts[1].strip()
-                return f"{last_name},{first_name},{grade}"
-            else:
-                return f"{student_name},{grade}"
-        else:
-            # Format: "First Last" - need to split and reorder
-            parts = student_name.split()
-            if len(parts) >= 2:
-                first_name = parts[0].strip()
-                last_name = parts[-1].strip()
-                return f"{last_name},{first_name},{grade}"
-            else:
-                return f"{student_name},{grade}"
+        return csv_name(student_name, grade)
     
     def display_result(self, result):
         """Display result in the results text area and make URLs clickable."""
         import webbrowser
 
+        # Export results and other one-off messages are not rebuilt after a reload
+        self.current_view = None
+
         # Clear existing content
         self.results_text.config(state=tk.NORMAL)
         self.results_text.delete(1.0, tk.END)
@@ -811,11 +1033,12 @@ class SubChapterDialog:
         self.result = None
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Select Sub-chapter")
-        self.dialog.geometry("360x160")
+        self.dialog.geometry("360x190")
         self.dialog.transient(parent)
         self.dialog.grab_set()
 
         tk.Label(self.dialog, text="Select sub-chapter:", font=("Arial", 12)).pack(pady=8)
+        tk.Label(self.dialog, text="or type a unit (3) or a range (1.2-1.5)").pack()
         self.subchapter_var = tk.StringVar()
         combo = ttk.Combobox(self.dialog, textvariable=self.subchapter_var, values=subchapter_choices, width=20)
         combo.pack(pady=4)
@@ -839,7 +1062,213 @@ class SubChapterDialog:
         self.dialog.destroy()
 
 
+class AtRiskDialog:
+    def __init__(self, parent, settings):
+        self.result = None
+        recent_steps, missing_threshold, previous_path = settings
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("At-Risk Students")
+        self.dialog.geometry("520x260")
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
+        
+        form = tk.Frame(self.dialog)
+        form.pack(pady=15, padx=15, fill=tk.X)
+        
+        tk.Label(form, text="Recent sub-chapters:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.recent_var = tk.IntVar(value=recent_steps)
+        tk.Spinbox(form, from_=1, to=20, textvariable=self.recent_var, width=5).grid(row=0, column=1, sticky=tk.W)
+        
+        tk.Label(form, text="Flag at missing items:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.missing_var = tk.IntVar(value=missing_threshold)
+        tk.Spinbox(form, from_=1, to=50, textvariable=self.missing_var, width=5).grid(row=1, column=1, sticky=tk.W)
+        
+        tk.Label(form, text="Earlier grades download (optional):").grid(row=2, column=0, columnspan=3,
+                                                                        sticky=tk.W, pady=(10, 0))
+        self.previous_var = tk.StringVar(value=previous_path)
+        tk.Entry(form, textvariable=self.previous_var, width=45).grid(row=3, column=0, columnspan=2, sticky=tk.W)
+        tk.Button(form, text="Browse...", command=self.browse_clicked).grid(row=3, column=2, padx=5)
+        
+        button_frame = tk.Frame(self.dialog)
+        button_frame.pack(pady=15)
+        tk.Button(button_frame, text="Show", command=lambda: self.ok_clicked('show'),
+                  width=12).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Export", command=lambda: self.ok_clicked('export'),
+                  width=12).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.cancel_clicked, width=12).pack(side=tk.LEFT, padx=5)
+    
+    def browse_clicked(self):
+        path = filedialog.askopenfilename(parent=self.dialog, title="Earlier grades download",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if path:
+            self.previous_var.set(path)
+    
+    def ok_clicked(self, action):
+        try:
+            settings = (int(self.recent_var.get()), int(self.missing_var.get()), self.previous_var.get().strip())
+        except (tk.TclError, ValueError):
+            messagebox.showwarning("Warning", "Please enter whole numbers")
+            return
+        self.result = (action, settings)
+        self.dialog.destroy()
+    
+    def cancel_clicked(self):
+        self.dialog.destroy()
+
+
+class MissingWorkDialog:
+    def __init__(self, parent):
+        self.result = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Missing Work Report")
+        self.dialog.geometry("420x200")
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
+        
+        tk.Label(self.dialog, text="Count as missing:", font=("Arial", 12, "bold")).pack(pady=10)
+        self.scope_var = tk.StringVar(value=SCOPE_DUE)
+        tk.Radiobutton(self.dialog, text="Assignments most of the class has already done",
+                       variable=self.scope_var, value=SCOPE_DUE).pack(anchor=tk.W, padx=30)
+        tk.Radiobutton(self.dialog, text="Every assignment in the course",
+                       variable=self.scope_var, value=SCOPE_ALL).pack(anchor=tk.W, padx=30)
+        
+        button_frame = tk.Frame(self.dialog)
+        button_frame.pack(pady=15)
+        tk.Button(button_frame, text="Show", command=lambda: self.ok_clicked('show'),
+                  width=12).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Export", command=lambda: self.ok_clicked('export'),
+                  width=12).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.cancel_clicked, width=12).pack(side=tk.LEFT, padx=5)
+    
+    def ok_clicked(self, action):
+        self.result = (action, self.scope_var.get())
+        self.dialog.destroy()
+    
+    def cancel_clicked(self):
+        self.dialog.destroy()
+
+
+class StudentReportsDialog:
+    def __init__(self, parent):
+        self.result = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Student Report Files")
+        self.dialog.geometry("420x300")
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
+        
+        tk.Label(self.dialog, text="Students:", font=("Arial", 12, "bold")).pack(pady=(10, 5))
+        self.section_var = tk.StringVar(value='')
+        tk.Radiobutton(self.dialog, text="Everyone", variable=self.section_var, value='').pack(anchor=tk.W, padx=30)
+        for section in ALL_SECTIONS:
+            text = "Students in no section" if section == 'Other' else f"Section {section}"
+            tk.Radiobutton(self.dialog, text=text, variable=self.section_var, value=section).pack(anchor=tk.W, padx=30)
+        
+        tk.Label(self.dialog, text="File type:", font=("Arial", 12, "bold")).pack(pady=(10, 5))
+        format_frame = tk.Frame(self.dialog)
+        format_frame.pack()
+        self.format_var = tk.StringVar(value='txt')
+        for fmt, text in (('txt', "Text (.txt)"), ('html', "Web page (.html)")):
+            tk.Radiobutton(format_frame, text=text, variable=self.format_var, value=fmt).pack(side=tk.LEFT, padx=10)
+        
+        button_frame = tk.Frame(self.dialog)
+        button_frame.pack(pady=15)
+        tk.Button(button_frame, text="Write Files", command=self.ok_clicked, width=12).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.cancel_clicked, width=12).pack(side=tk.LEFT, padx=5)
+    
+    def ok_clicked(self):
+        self.result = (self.section_var.get() or None, self.format_var.get())
+        self.dialog.destroy()
+    
+    def cancel_clicked(self):
+        self.dialog.destroy()
+
+
+class AliasConfirmDialog:
+    """Roster names without an alias, each with the student the name rules or the
+    similarity search propose; pick another student for a row before confirming it."""
+    
+    def __init__(self, parent, proposals, records):
+        self.result = None
+        self.records = records
+        self.choices = [f"{r.name} ({r.id})" for r in records]
+        by_id = {r.id: r for r in records}
+        # Row id -> (section, roster name, proposed record or None)
+        self.rows = {}
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Confirm Name Matches")
+        self.dialog.geometry("760x460")
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
+        
+        tk.Label(self.dialog, text="Roster names not linked to a student ID yet",
+                 font=("Arial", 12, "bold")).pack(pady=10)
+        
+        columns = ('section', 'roster', 'student', 'how')
+        self.tree = ttk.Treeview(self.dialog, columns=columns, show='headings', height=12)
+        for column, heading, width in zip(columns, ("Section", "Roster name", "Proposed student", "Match"),
+                                          (70, 200, 280, 120)):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=15)
+        self.tree.bind('<<TreeviewSelect>>', self.row_selected)
+        
+        for m in proposals:
+            record = by_id.get(m.student_id)
+            how = {'matched': 'name rules', 'suggested': f"{m.score:.0%} similar"}.get(m.status, '')
+            row = self.tree.insert('', tk.END, values=(m.section, m.roster_name, record.name if record else '', how))
+            self.rows[row] = (m.section, m.roster_name, record)
+        
+        pick_frame = tk.Frame(self.dialog)
+        pick_frame.pack(pady=5)
+        tk.Label(pick_frame, text="Student for selected row:").pack(side=tk.LEFT, padx=5)
+        self.student_var = tk.StringVar()
+        student_combo = ttk.Combobox(pick_frame, textvariable=self.student_var, values=self.choices,
+                                     state='readonly', width=45)
+        student_combo.pack(side=tk.LEFT)
+        student_combo.bind('<<ComboboxSelected>>', self.student_picked)
+        
+        button_frame = tk.Frame(self.dialog)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Confirm Selected", command=lambda: self.ok_clicked(self.tree.selection()),
+                  width=16).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Confirm All Proposed", command=lambda: self.ok_clicked(list(self.rows)),
+                  width=16).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.cancel_clicked, width=12).pack(side=tk.LEFT, padx=5)
+    
+    def row_selected(self, event=None):
+        selection = self.tree.selection()
+        record = self.rows[selection[0]][2] if selection else None
+        self.student_var.set(f"{record.name} ({record.id})" if record else '')
+    
+    def student_picked(self, event=None):
+        choice = self.student_var.get()
+        if choice not in self.choices:
+            return
+        record = self.records[self.choices.index(choice)]
+        for row in self.tree.selection():
+            section, name, _ = self.rows[row]
+            self.rows[row] = (section, name, record)
+            self.tree.item(row, values=(section, name, record.name, 'picked'))
+    
+    def ok_clicked(self, rows):
+        confirmed = [self.rows[row] for row in rows if self.rows[row][2] is not None]
+        if not confirmed:
+            messagebox.showwarning("Warning", "Select rows that have a proposed student")
+            return
+        self.result = confirmed
+        self.dialog.destroy()
+    
+    def cancel_clicked(self):
+        self.dialog.destroy()
+
+
 def main():
+    use_locale_collation()
     root = tk.Tk()
     app = StudentGradesApp(root)
     root.mainloop()
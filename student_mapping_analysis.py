@@ -1,213 +1,283 @@
 #!/usr/bin/env python3
 """
-Script to analyze and map student names between the F2, F5, F6 files 
+Script to analyze and map student names between the F2, F5, F6 files
 and the Project Stem grades file.
+
+Grade names are indexed once by the first word of their last name, so each roster
+name is only compared with the students it can possibly match (same rules as
+before: all name words equal, or first and last name equal ignoring middle names).
+Roster names that still have no match get a suggestion from the unmatched students
+whose last name starts with the same letter; with many unmatched names these letter
+buckets are scored in parallel.
+
+Writes student_mapping_report.json / .csv and the alias table (student_aliases.json)
+that the app uses to map roster names to student IDs.
+Usage: python student_mapping_analysis.py [--dir DIR] [--grades FILE] [--workers N]
 """
 
+import argparse
 import csv
-import re
-from collections import defaultdict
-
-def normalize_name(name):
-    """Normalize names for comparison by removing extra spaces and converting to lowercase"""
-    return re.sub(r'\s+', ' ', name.strip().lower())
-
-def extract_names_from_csv(filename):
-    """Extract names from CSV files"""
-    names = []
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if row and row[0].strip():  # Skip empty rows
-                    names.append(row[0].strip())
-    except Exception as e:
-        print(f"Error reading {filename}: {e}")
-    return names
-
-def extract_grades_names(filename):
-    """Extract student names from the grades CSV file"""
-    names = []
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header
-            next(reader)  # Skip points possible row
-            for row in reader:
-                if row and row[0].strip():  # Skip empty rows
-                    # Extract name from quoted format "Last, First"
-                    name_match = re.match(r'"([^"]+)"', row[0])
-                    if name_match:
-                        names.append(name_match.group(1))
-                    else:
-                        # Try without quotes
-                        if ',' in row[0]:
-                            names.append(row[0])
-    except Exception as e:
-        print(f"Error reading {filename}: {e}")
-    return names
-
-def find_matches(name_lists, grades_names):
-    """Find matches between name lists and grades names"""
-    matches = defaultdict(list)
-    unmatched_grades = []
-    unmatched_names = defaultdict(list)
-    
-    # Create normalized lookup for grades names
-    grades_normalized = {}
-    for grade_name in grades_names:
-        normalized = normalize_name(grade_name)
-        grades_normalized[normalized] = grade_name
-    
-    # Check each name list
-    for list_name, names in name_lists.items():
-        for name in names:
-            # Skip header rows
-            if name.lower() == "name":
-                continue
-                
-            normalized_name = normalize_name(name)
-            found_match = False
-            
-            # Try to find match in grades
-            for grade_normalized, grade_original in grades_normalized.items():
-                # Skip test user Harry Champagnat
-                if "champagnat" in grade_normalized and "harry" in grade_normalized:
-                    continue
-                    
-                # Check if first and last names match (in any order)
-                name_parts = normalized_name.split()
-                grade_parts = grade_normalized.split(', ')
-                
-                if len(name_parts) >= 2 and len(grade_parts) >= 2:
-                    # Check if all parts match
-                    name_set = set(name_parts)
-                    grade_set = set(grade_parts[0].split() + grade_parts[1].split())
-                    
-                    # More flexible matching for names like "Riley Sky Mantaring" vs "Mantaring, Riley"
-                    if name_set == grade_set:
-                        matches[list_name].append((name, grade_original))
-                        found_match = True
-                        break
-                    # Additional check for partial matches (e.g., "Riley Sky Mantaring" vs "Mantaring, Riley")
-                    elif len(name_set) >= 2 and len(grade_set) >= 2:
-                        # Check if first and last names match, ignoring middle names
-                        name_first_last = {name_parts[0], name_parts[-1]}
-                        grade_first_last = {grade_parts[1].split()[0], grade_parts[0].split()[0]}
-                        
-                        if name_first_last == grade_first_last:
-                            matches[list_name].append((name, grade_original))
-                            found_match = True
-                            break
-            
-            if not found_match:
-                unmatched_names[list_name].append(name)
-    
-    # Find unmatched grades
-    matched_grades = set()
-    for list_matches in matches.values():
-        for _, grade_name in list_matches:
-            matched_grades.add(grade_name)
-    
-    for grade_name in grades_names:
-        # Skip test user Harry Champagnat
-        if "champagnat" in grade_name.lower() and "harry" in grade_name.lower():
+import difflib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from gradebook import (GRADES_CSV, ALIASES_FILE, SECTIONS, normalize_name, load_grades, load_rosters,
+                       load_aliases, save_aliases)
+
+REPORT_JSON = 'student_mapping_report.json'
+REPORT_CSV = 'student_mapping_report.csv'
+RESULTS_TXT = 'student_mapping_results.txt'
+
+# Score suggestion buckets in worker processes from this many name/student pairs on
+PARALLEL_MIN_PAIRS = 50000
+# Smallest similarity for a suggested (unconfirmed) match
+SUGGEST_RATIO = 0.75
+
+# status: 'matched' (method 'exact' or 'first_last'), 'confirmed' (kept from the alias
+# table), 'suggested' (method 'similar', score = similarity) or 'unmatched'
+Match = namedtuple('Match', ['section', 'roster_name', 'status', 'grades_name', 'student_id', 'method', 'score'])
+
+# A grades-file student: order in the file, words of the name, first words of first/last name
+Candidate = namedtuple('Candidate', ['order', 'name', 'id', 'words', 'first', 'last'])
+
+Reconciliation = namedtuple('Reconciliation', ['matches', 'unmatched_grades'])
+
+
+def is_test_user(name):
+    """Harry Champagnat is the Project Stem test user"""
+    lowered = name.lower()
+    return "champagnat" in lowered and "harry" in lowered
+
+
+def candidate(order, record):
+    """Candidate for a 'Last, First' record, or None for names without a comma or test users"""
+    if ',' not in record.name or is_test_user(record.name):
+        return None
+    parts = normalize_name(record.name).split(', ')
+    if len(parts) < 2:
+        return None
+    last, first = parts[0].split(), parts[1].split()
+    words = frozenset(last + first)
+    if not words:
+        return None
+    return Candidate(order, record.name, record.id, words,
+                     first[0] if first else None, last[0] if last else None)
+
+
+def build_index(records):
+    """(candidates, {block word: [candidate, ...]}): every candidate is filed under the
+    first word of its last name, which any match has to contain"""
+    candidates = [c for c in (candidate(i, r) for i, r in enumerate(records)) if c is not None]
+    blocks = {}
+    for c in candidates:
+        blocks.setdefault(c.last or min(c.words), []).append(c)
+    return candidates, blocks
+
+
+def match_name(name, blocks):
+    """(candidate, method) for one roster name, or (None, None). The first student in
+    the grades file that matches wins, as in the original nested loop."""
+    parts = normalize_name(name).split()
+    if len(parts) < 2:
+        return None, None
+    name_words = set(parts)
+    first_last = {parts[0], parts[-1]}
+    pool = [c for word in name_words for c in blocks.get(word, ())]
+    for c in sorted(pool, key=lambda c: c.order):
+        if name_words == c.words:
+            return c, 'exact'
+        if len(name_words) >= 2 and len(c.words) >= 2 and c.first and first_last == {c.first, c.last}:
+            return c, 'first_last'
+    return None, None
+
+
+def similar(name, candidates):
+    """(most similar candidate, similarity) for one roster name; ties go to the earlier student"""
+    matcher = difflib.SequenceMatcher(None, b=' '.join(sorted(normalize_name(name).split())))
+    best, best_ratio = None, 0.0
+    for c in candidates:
+        matcher.set_seq1(' '.join(sorted(c.words)))
+        ratio = matcher.ratio()
+        if ratio > best_ratio:
+            best, best_ratio = c, ratio
+    return best, best_ratio
+
+
+def _score_bucket(args):
+    """Worker: score the roster names of one letter bucket against its students"""
+    names, candidates = args
+    return [similar(name, candidates) for name in names]
+
+
+def suggest_all(names, candidates, workers=None):
+    """[(candidate, similarity)] for every roster name. Students are bucketed by the first
+    letter of their last name and a name is only scored against the buckets of its first
+    and last word's initials; buckets are scored in worker processes when there are many pairs."""
+    buckets = {}
+    for c in candidates:
+        buckets.setdefault((c.last or '')[:1], []).append(c)
+    tasks = {}
+    for i, name in enumerate(names):
+        parts = normalize_name(name).split()
+        for letter in {parts[0][:1], parts[-1][:1]} if parts else ():
+            if letter in buckets:
+                tasks.setdefault(letter, []).append(i)
+
+    jobs = [([names[i] for i in indexes], buckets[letter]) for letter, indexes in tasks.items()]
+    pairs = sum(len(n) * len(c) for n, c in jobs)
+    if workers == 1 or pairs < PARALLEL_MIN_PAIRS:
+        scored = map(_score_bucket, jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scored = list(pool.map(_score_bucket, jobs))
+
+    best = [(None, 0.0)] * len(names)
+    for indexes, results in zip(tasks.values(), scored):
+        for i, (c, ratio) in zip(indexes, results):
+            current, current_ratio = best[i]
+            if c is not None and (ratio > current_ratio or
+                                  (ratio == current_ratio and current is not None and c.order < current.order)):
+                best[i] = (c, ratio)
+    return best
+
+
+def reconcile(rosters, records, aliases=None, workers=None):
+    """Match every roster name to a grades record. Entries of the alias table confirmed
+    by hand are kept for names the rules cannot match."""
+    candidates, blocks = build_index(records)
+    names = [(section, name) for section in SECTIONS for name in rosters.get(section, [])
+             if name.lower() != "name"]
+    found = [match_name(name, blocks) for _, name in names]
+
+    matched_ids = {c.id for c, _ in found if c is not None}
+    by_id = {c.id: c for c in candidates}
+    aliases = aliases or {}
+    matches = []
+    pending = []
+    for (section, name), (c, method) in zip(names, found):
+        if c is not None:
+            matches.append(Match(section, name, 'matched', c.name, c.id, method, 1.0))
+            continue
+        confirmed = aliases.get(section, {}).get(name)
+        if confirmed and confirmed.get('method') == 'confirmed' and confirmed.get('id') in by_id:
+            kept = by_id[confirmed['id']]
+            matched_ids.add(kept.id)
+            matches.append(Match(section, name, 'confirmed', kept.name, kept.id, 'confirmed', 1.0))
             continue
-        if grade_name not in matched_grades:
-            unmatched_grades.append(grade_name)
-    
-    return matches, unmatched_names, unmatched_grades
+        pending.append(len(matches))
+        matches.append(Match(section, name, 'unmatched', '', '', '', 0.0))
 
-def main():
-    # Extract names from each file
-    f2_names = extract_names_from_csv('F2 - names.csv')
-    f5_names = extract_names_from_csv('F5 - names.csv')
-    f6_names = extract_names_from_csv('F6 - names.csv')
-    grades_names = extract_grades_names('2025-09-13T1722_Grades-(7fac90)_CS_Python_Fundamentals.csv')
-    
-    print("=== STUDENT NAME ANALYSIS ===")
-    print(f"F2 names: {len(f2_names)}")
-    print(f"F5 names: {len(f5_names)}")
-    print(f"F6 names: {len(f6_names)}")
-    print(f"Grades names: {len(grades_names)}")
-    print(f"Total name list students: {len(f2_names) + len(f5_names) + len(f6_names)}")
-    print()
-    
-    # Find matches
-    name_lists = {
-        'F2': f2_names,
-        'F5': f5_names,
-        'F6': f6_names
+    # Suggestions only from students nobody matched
+    leftover = [c for c in candidates if c.id not in matched_ids]
+    suggestions = suggest_all([matches[i].roster_name for i in pending], leftover, workers)
+    for i, (c, ratio) in zip(pending, suggestions):
+        m = matches[i]
+        if c is not None and ratio >= SUGGEST_RATIO:
+            matches[i] = m._replace(status='suggested', grades_name=c.name, student_id=c.id,
+                                    method='similar', score=round(ratio, 3))
+
+    unmatched_grades = [(c.name, c.id) for c in leftover]
+    return Reconciliation(matches, unmatched_grades)
+
+
+def alias_table(result):
+    """{section: {roster name: {'id', 'name', 'method'}}} of the matched and confirmed names"""
+    aliases = {section: {} for section in SECTIONS}
+    for m in result.matches:
+        if m.status in ('matched', 'confirmed'):
+            aliases[m.section][m.roster_name] = {'id': m.student_id, 'name': m.grades_name, 'method': m.method}
+    return aliases
+
+
+def write_reports(result, grades_file, workdir='.'):
+    """Write the JSON and CSV reconciliation reports; returns their paths"""
+    json_path = os.path.join(workdir, REPORT_JSON)
+    csv_path = os.path.join(workdir, REPORT_CSV)
+    report = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'grades_file': grades_file,
+        'counts': counts(result),
+        'matches': [m._asdict() for m in result.matches],
+        'unmatched_grades': [{'grades_name': name, 'student_id': sid} for name, sid in result.unmatched_grades],
     }
-    
-    matches, unmatched_names, unmatched_grades = find_matches(name_lists, grades_names)
-    
-    # Print results
-    print("=== MATCHES FOUND ===")
-    for list_name, list_matches in matches.items():
-        print(f"\n{list_name} ({len(list_matches)} matches):")
-        for name_list, name_grades in list_matches:
-            print(f"  {name_list} -> {name_grades}")
-    
-    print("\n=== UNMATCHED NAMES IN LISTS ===")
-    for list_name, unmatched in unmatched_names.items():
-        if unmatched:
-            print(f"\n{list_name} ({len(unmatched)} unmatched):")
-            for name in unmatched:
-                print(f"  {name}")
-    
-    print(f"\n=== UNMATCHED GRADES ({len(unmatched_grades)} total) ===")
-    for name in unmatched_grades:
-        print(f"  {name}")
-    
-    # Summary
-    total_matches = sum(len(m) for m in matches.values())
-    total_unmatched_lists = sum(len(u) for u in unmatched_names.values())
-    print(f"\n=== SUMMARY ===")
-    print(f"Total matches found: {total_matches}")
-    print(f"Total unmatched from lists: {total_unmatched_lists}")
-    print(f"Total unmatched from grades: {len(unmatched_grades)}")
-    print(f"Note: Harry Champagnat (test user) excluded from analysis")
-    
-    # Save detailed results to file
-    with open('student_mapping_results.txt', 'w', encoding='utf-8') as f:
-        f.write("STUDENT NAME MAPPING ANALYSIS\n")
-        f.write("=" * 50 + "\n\n")
-        
-        f.write(f"F2 names: {len(f2_names)}\n")
-        f.write(f"F5 names: {len(f5_names)}\n")
-        f.write(f"F6 names: {len(f6_names)}\n")
-        f.write(f"Grades names: {len(grades_names)}\n")
-        f.write(f"Total name list students: {len(f2_names) + len(f5_names) + len(f6_names)}\n\n")
-        
-        f.write("MATCHES FOUND:\n")
-        f.write("-" * 20 + "\n")
-        for list_name, list_matches in matches.items():
-            f.write(f"\n{list_name} ({len(list_matches)} matches):\n")
-            for name_list, name_grades in list_matches:
-                f.write(f"  {name_list} -> {name_grades}\n")
-        
-        f.write("\nUNMATCHED NAMES IN LISTS:\n")
-        f.write("-" * 30 + "\n")
-        for list_name, unmatched in unmatched_names.items():
-            if unmatched:
-                f.write(f"\n{list_name} ({len(unmatched)} unmatched):\n")
-                for name in unmatched:
-                    f.write(f"  {name}\n")
-        
-        f.write(f"\nUNMATCHED GRADES ({len(unmatched_grades)} total):\n")
-        f.write("-" * 30 + "\n")
-        for name in unmatched_grades:
-            f.write(f"  {name}\n")
-        
-        f.write(f"\nSUMMARY:\n")
-        f.write("-" * 10 + "\n")
-        f.write(f"Total matches found: {total_matches}\n")
-        f.write(f"Total unmatched from lists: {total_unmatched_lists}\n")
-        f.write(f"Total unmatched from grades: {len(unmatched_grades)}\n")
-        f.write(f"Note: Harry Champagnat (test user) excluded from analysis\n")
-    
-    print(f"\nDetailed results saved to 'student_mapping_results.txt'")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(Match._fields)
+        writer.writerows(result.matches)
+        writer.writerows(('', '', 'unmatched_grade', name, sid, '', '') for name, sid in result.unmatched_grades)
+    return json_path, csv_path
+
+
+def counts(result):
+    totals = {'roster_names': len(result.matches), 'unmatched_grades': len(result.unmatched_grades)}
+    for m in result.matches:
+        totals[m.status] = totals.get(m.status, 0) + 1
+    return totals
+
+
+def format_results(rosters, records, result):
+    """Text version of the analysis (printed and saved to student_mapping_results.txt)"""
+    lines = ["STUDENT NAME MAPPING ANALYSIS", "=" * 50, ""]
+    for section in SECTIONS:
+        lines.append(f"{section} names: {len(rosters.get(section, []))}")
+    lines.append(f"Grades names: {sum(1 for r in records if ',' in r.name)}")
+    lines.append(f"Total name list students: {sum(len(rosters.get(s, [])) for s in SECTIONS)}")
+
+    lines += ["", "MATCHES FOUND:", "-" * 20]
+    for section in SECTIONS:
+        found = [m for m in result.matches if m.section == section and m.status in ('matched', 'confirmed')]
+        lines += ["", f"{section} ({len(found)} matches):"]
+        lines += [f"  {m.roster_name} -> {m.grades_name}" for m in found]
+
+    lines += ["", "UNMATCHED NAMES IN LISTS:", "-" * 30]
+    for section in SECTIONS:
+        missing = [m for m in result.matches if m.section == section and m.status in ('unmatched', 'suggested')]
+        if missing:
+            lines += ["", f"{section} ({len(missing)} unmatched):"]
+            for m in missing:
+                hint = f"  (maybe {m.grades_name}, {m.score:.0%} similar)" if m.status == 'suggested' else ""
+                lines.append(f"  {m.roster_name}{hint}")
+
+    lines += ["", f"UNMATCHED GRADES ({len(result.unmatched_grades)} total):", "-" * 30]
+    lines += [f"  {name}" for name, _ in result.unmatched_grades]
+
+    totals = counts(result)
+    lines += ["", "SUMMARY:", "-" * 10,
+              f"Total matches found: {totals.get('matched', 0) + totals.get('confirmed', 0)}",
+              f"Total unmatched from lists: {totals.get('unmatched', 0) + totals.get('suggested', 0)}",
+              f"Total unmatched from grades: {len(result.unmatched_grades)}",
+              "Note: Harry Champagnat (test user) excluded from analysis"]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Match the F2/F5/F6 rosters to the grades file')
+    parser.add_argument('--dir', default='.', help='folder with the grades and roster files')
+    parser.add_argument('--grades', default=GRADES_CSV, help='grades CSV file name')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'worker processes for suggestions (default: all CPUs from {PARALLEL_MIN_PAIRS} pairs on)')
+    args = parser.parse_args()
+
+    _, records = load_grades(os.path.join(args.dir, args.grades))
+    rosters = load_rosters(args.dir)
+    result = reconcile(rosters, records, load_aliases(args.dir), args.workers)
+
+    text = format_results(rosters, records, result)
+    print(text)
+    with open(os.path.join(args.dir, RESULTS_TXT), 'w', encoding='utf-8') as f:
+        f.write(text)
+    json_path, csv_path = write_reports(result, args.grades, args.dir)
+    save_aliases(alias_table(result), args.dir)
+
+    print(f"Detailed results saved to '{RESULTS_TXT}', '{os.path.basename(json_path)}' "
+          f"and '{os.path.basename(csv_path)}'")
+    print(f"Alias table saved to '{ALIASES_FILE}'")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Student Record Module
+Compact per-student grade storage: one array('d') per student aligned to a shared
+assignment layout, instead of a dict keyed by the full assignment header strings.
+Grades files of every supported type are read into a GradeTable.
+"""
+
+import math
+import sys
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping
+
+from grade_adapters import open_export
+from subchapter_index import assignment_number
+
+MISSING = float('nan')
+
+# Below this share of filled cells, read_grades_csv keeps rows sparse
+SPARSE_FILL_RATIO = 0.4
+
+# Students per chunk when a grades export is read with progress reporting
+CHUNK_ROWS = 500
+
+# Name and student ID of one student, as read by read_student_names
+StudentName = namedtuple('StudentName', ['name', 'id'])
+
+
+class GradeLayout:
+    """Assignment headers shared by every record of one gradebook, with the
+    points possible of each assignment (NaN where the export does not say).
+
+    Columns can also be addressed by the numeric assignment ID at the end of the
+    header, which stays the same when an assignment is renamed: `ids` holds the ID
+    of every column (0 for headers without one), `columns_by_id` the reverse."""
+    __slots__ = ('assignments', 'positions', 'points', 'ids', 'columns_by_id')
+
+    def __init__(self, assignments, points=None):
+        self.assignments = tuple(sys.intern(a) for a in assignments)
+        self.positions = {a: i for i, a in enumerate(self.assignments)}
+        self.ids = array('q', (assignment_number(a) or 0 for a in self.assignments))
+        self.columns_by_id = {}
+        for column, number in enumerate(self.ids):
+            if number:
+                self.columns_by_id.setdefault(number, column)
+        self.points = array('d', [MISSING]) * len(self.assignments)
+        for column, cell in enumerate((points or [])[:len(self.assignments)]):
+            try:
+                self.points[column] = float(cell)
+            except ValueError:
+                continue
+
+    def __len__(self):
+        return len(self.assignments)
+
+    def column(self, key):
+        """Column of an assignment ID (int or digit string) or header text, None if unknown"""
+        if isinstance(key, int):
+            return self.columns_by_id.get(key)
+        column = self.positions.get(key)
+        if column is None and key.strip().isdigit():
+            column = self.columns_by_id.get(int(key))
+        return column
+
+    def key(self, column):
+        """Stable key of a column: its assignment ID, or the header when it has none"""
+        return self.ids[column] or self.assignments[column]
+
+
+class StudentRecord:
+    """One student's grades.
+
+    Dense rows keep one float per assignment (NaN = no submission) in `values`.
+    Sparse rows keep only submitted cells: `columns` holds their column indices and
+    `values` the matching grades. Non-numeric cells (e.g. letter grades) live in the
+    small `text` dict keyed by column.
+
+    Records still answer record['name'], record['id'] and record['grades'].get(assignment)
+    so code written against the old dict rows keeps working."""
+    __slots__ = ('name', 'id', 'layout', 'values', 'columns', 'text')
+
+    def __init__(self, name, student_id, layout, values, columns=None, text=None):
+        self.name = sys.intern(name)
+        self.id = sys.intern(student_id)
+        self.layout = layout
+        self.values = values
+        self.columns = columns
+        self.text = text
+
+    @classmethod
+    def from_cells(cls, name, student_id, layout, cells, sparse=False):
+        """Build a record from the raw CSV cells of the assignment columns"""
+        columns = []
+        numbers = []
+        text = None
+        for column, cell in enumerate(cells[:len(layout)]):
+            cell = cell.strip()
+            if not cell:
+                continue
+            try:
+                value = float(cell)
+            except ValueError:
+                if text is None:
+                    text = {}
+                text[column] = sys.intern(cell)
+                continue
+            columns.append(column)
+            numbers.append(value)
+
+        if sparse:
+            return cls(name, student_id, layout, array('d', numbers),
+                       array('H' if len(layout) < 65536 else 'I', columns), text)
+
+        values = array('d', [MISSING]) * len(layout)
+        for column, value in zip(columns, numbers):
+            values[column] = value
+        return cls(name, student_id, layout, values, None, text)
+
+    @property
+    def is_sparse(self):
+        return self.columns is not None
+
+    def grade(self, column):
+        """Grade for a column index: float, string for non-numeric cells, or None"""
+        if self.text and column in self.text:
+            return self.text[column]
+        if self.columns is None:
+            value = self.values[column]
+            return None if math.isnan(value) else value
+        # Sparse rows: columns are sorted, so bisect
+        lo, hi = 0, len(self.columns)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.columns[mid] < column:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.columns) and self.columns[lo] == column:
+            return self.values[lo]
+        return None
+
+    def get(self, assignment, default=None):
+        """Grade by assignment header or ID"""
+        column = self.layout.column(assignment)
+        if column is None:
+            return default
+        grade = self.grade(column)
+        return default if grade is None else grade
+
+    def iter_submitted(self):
+        """Yield (column, grade) for every non-blank cell in column order"""
+        if self.columns is None:
+            numeric = ((c, v) for c, v in enumerate(self.values) if not math.isnan(v))
+        else:
+            numeric = zip(self.columns, self.values)
+        if not self.text:
+            yield from numeric
+            return
+        yield from sorted(list(numeric) + list(self.text.items()))
+
+    def submitted_columns(self):
+        """Column indices of every non-blank cell, in column order"""
+        if self.columns is None:
+            numeric = [c for c, v in enumerate(self.values) if not math.isnan(v)]
+        else:
+            numeric = list(self.columns)
+        if self.text:
+            return sorted(numeric + list(self.text))
+        return numeric
+
+    def submitted_count(self):
+        if self.columns is None:
+            count = sum(1 for v in self.values if not math.isnan(v))
+        else:
+            count = len(self.columns)
+        return count + (len(self.text) if self.text else 0)
+
+    def to_sparse(self):
+        """Return a sparse copy (or self if already sparse)"""
+        if self.columns is not None:
+            return self
+        columns = [c for c, v in enumerate(self.values) if not math.isnan(v)]
+        return StudentRecord(self.name, self.id, self.layout,
+                             array('d', (self.values[c] for c in columns)),
+                             array('H' if len(self.layout) < 65536 else 'I', columns), self.text)
+
+    def to_dense(self):
+        """Return a dense copy (or self if already dense)"""
+        if self.columns is None:
+            return self
+        values = array('d', [MISSING]) * len(self.layout)
+        for column, value in zip(self.columns, self.values):
+            values[column] = value
+        return StudentRecord(self.name, self.id, self.layout, values, None, self.text)
+
+    # Compatibility with the old {'name', 'id', 'grades'} dict rows
+    def __getitem__(self, key):
+        if key == 'name':
+            return self.name
+        if key == 'id':
+            return self.id
+        if key == 'grades':
+            return GradesView(self)
+        raise KeyError(key)
+
+    def __repr__(self):
+        kind = 'sparse' if self.is_sparse else 'dense'
+        return f"StudentRecord({self.name!r}, {self.id!r}, {self.submitted_count()} submitted, {kind})"
+
+
+class GradesView(Mapping):
+    """Read-only assignment -> grade mapping over a StudentRecord (None = no submission)"""
+    __slots__ = ('record',)
+
+    def __init__(self, record):
+        self.record = record
+
+    def __getitem__(self, assignment):
+        column = self.record.layout.column(assignment)
+        if column is None:
+            raise KeyError(assignment)
+        return self.record.grade(column)
+
+    def get(self, assignment, default=None):
+        return self.record.get(assignment, default)
+
+    def __iter__(self):
+        return iter(self.record.layout.assignments)
+
+    def __len__(self):
+        return len(self.record.layout)
+
+    def items(self):
+        grade = self.record.grade
+        return [(a, grade(c)) for c, a in enumerate(self.record.layout.assignments)]
+
+    def values(self):
+        grade = self.record.grade
+        return [grade(c) for c in range(len(self.record.layout))]
+
+
+def fill_ratio(layout, records):
+    """Share of assignment cells that hold a grade"""
+    cells = len(layout) * len(records)
+    if not cells:
+        return 0.0
+    return sum(r.submitted_count() for r in records) / cells
+
+
+# Letter grades from best to worst; SummaryTable codes index into this order
+LETTER_GRADES = ('A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D+', 'D', 'D-', 'F')
+
+
+class SummaryTable:
+    """The course score summary columns of a gradebook ("Current Score", "Final Grade",
+    ...), one entry per student in record order. Numeric columns are array('d') in
+    `scores` (NaN = blank); letter grade columns are array('h') codes in `grades`,
+    indexing `categories` (LETTER_GRADES first, best to worst; -1 = blank)."""
+    __slots__ = ('headers', 'scores', 'grades', 'categories', 'length')
+
+    def __init__(self, headers, scores, grades, categories, length):
+        self.headers = tuple(headers)
+        self.scores = scores
+        self.grades = grades
+        self.categories = categories
+        self.length = length
+
+    @classmethod
+    def from_cells(cls, headers, columns, length):
+        """Type raw cell columns: a column is numeric when every non-blank cell is a number"""
+        categories = list(LETTER_GRADES)
+        codes = {grade: code for code, grade in enumerate(categories)}
+        scores = {}
+        grades = {}
+        for header, cells in zip(headers, columns):
+            try:
+                scores[header] = array('d', (float(c) if c else MISSING for c in cells))
+                continue
+            except ValueError:
+                pass
+            column = array('h', [-1]) * length
+            for row, cell in enumerate(cells):
+                if cell:
+                    if cell not in codes:
+                        codes[cell] = len(categories)
+                        categories.append(cell)
+                    column[row] = codes[cell]
+            grades[header] = column
+        return cls(headers, scores, grades, tuple(categories), length)
+
+    @classmethod
+    def empty(cls, length=0):
+        return cls((), {}, {}, LETTER_GRADES, length)
+
+    def __len__(self):
+        return self.length
+
+    def value(self, header, row):
+        """Score (float) or letter grade of one student, None for blank cells"""
+        if header in self.scores:
+            value = self.scores[header][row]
+            return None if math.isnan(value) else value
+        code = self.grades[header][row]
+        return None if code < 0 else self.categories[code]
+
+    def student(self, row):
+        """[(header, score or letter grade), ...] of one student's non-blank cells"""
+        values = ((header, self.value(header, row)) for header in self.headers)
+        return [(header, value) for header, value in values if value is not None]
+
+    def rank(self, header, rows=None):
+        """Rows with a value in this column, best first: highest score or best letter grade
+        (ties keep record order)"""
+        rows = range(self.length) if rows is None else rows
+        if header in self.scores:
+            column = self.scores[header]
+            return sorted((r for r in rows if not math.isnan(column[r])), key=lambda r: -column[r])
+        column = self.grades[header]
+        return sorted((r for r in rows if column[r] >= 0), key=column.__getitem__)
+
+    def select(self, header, low=None, high=None, letters=None):
+        """Rows whose score is within [low, high], or whose letter grade is one of letters"""
+        if header in self.scores:
+            low = -math.inf if low is None else low
+            high = math.inf if high is None else high
+            return [r for r, v in enumerate(self.scores[header]) if low <= v <= high]
+        wanted = {self.categories.index(g) for g in letters or () if g in self.categories}
+        return [r for r, code in enumerate(self.grades[header]) if code in wanted]
+
+
+class GradeTable:
+    """What every grades file is read into (see grade_adapters): the student information
+    column by column (meta: {field: [cell per student]}), the assignment layout with one
+    StudentRecord per student, and the course score summary as a SummaryTable"""
+    __slots__ = ('flavor', 'meta', 'layout', 'records', 'summary')
+
+    def __init__(self, flavor, meta_fields, layout):
+        self.flavor = flavor
+        self.meta = {field: [] for field in meta_fields}
+        self.layout = layout
+        self.records = []
+        self.summary = SummaryTable.empty()
+
+    def __len__(self):
+        return len(self.records)
+
+
+def cell_picker(columns):
+    """Function returning the given cells of a row: a plain slice when the columns are
+    contiguous (the Canvas layout)"""
+    first = columns[0] if columns else 0
+    if columns == list(range(first, first + len(columns))):
+        part = slice(first, first + len(columns))
+        return lambda row: row[part]
+    return lambda row: [row[c] if c < len(row) else '' for c in columns]
+
+
+def iter_grade_table(filename, sparse=True, chunk_rows=CHUNK_ROWS):
+    """Read a grades export of any supported type in chunks: yields (GradeTable,
+    [StudentRecord, ...], bytes read, file size) every chunk_rows students, and at least
+    once. The table's records and columns grow as the chunks are read."""
+    adapter, plan, rows = open_export(filename)
+    columns = [c for c, _ in plan.assignments]
+    layout = GradeLayout([h for _, h in plan.assignments], [plan.points.get(c, '') for c in columns])
+    table = GradeTable(plan.flavor, plan.meta, layout)
+    pick = cell_picker(columns)
+    meta = [(table.meta[field], column) for field, column in plan.meta.items()]
+    # Summary cells are kept as text until every student is read, then typed at once
+    summary = [([], column) for column, _ in plan.summary]
+    name_column = plan.meta['name']
+    id_column = plan.meta.get('id')
+
+    chunk = []
+    for row in rows:
+        if len(row) <= name_column or not row[name_column].strip():
+            continue
+        student_name = row[name_column].strip()
+        student_id = row[id_column] if id_column is not None and id_column < len(row) else ""
+        for values, column in meta + summary:
+            values.append(row[column].strip() if column < len(row) else '')
+        chunk.append(StudentRecord.from_cells(student_name, student_id, layout, pick(row), sparse=sparse))
+        if len(chunk) >= chunk_rows:
+            table.records.extend(chunk)
+            yield table, chunk, adapter.read, adapter.size
+            chunk = []
+    table.records.extend(chunk)
+    table.summary = SummaryTable.from_cells([h for _, h in plan.summary], [cells for cells, _ in summary],
+                                            len(table.records))
+    yield table, chunk, adapter.read, adapter.size
+
+
+def iter_grades_csv(filename, sparse=True, chunk_rows=CHUNK_ROWS):
+    """iter_grade_table() yielding the layout instead of the table"""
+    for table, chunk, read, size in iter_grade_table(filename, sparse, chunk_rows):
+        yield table.layout, chunk, read, size
+
+
+def read_grade_table(filename, sparse=None, progress=None):
+    """Read a grades export (CSV, TSV, Excel or JSON) into a GradeTable.
+    sparse=None picks the storage from the fill ratio: early in the term most cells
+    are blank and sparse rows make reports cost O(submissions) instead of O(assignments).
+    progress(students read, bytes read, file size) is called after every chunk."""
+    # Parse sparse first; it is the cheaper form to build and to densify later
+    for table, _, read, size in iter_grade_table(filename, sparse=sparse is not False):
+        if progress is not None:
+            progress(len(table.records), read, size)
+
+    if sparse is None and fill_ratio(table.layout, table.records) >= SPARSE_FILL_RATIO:
+        table.records = [r.to_dense() for r in table.records]
+    return table
+
+
+def read_grades_csv(filename, sparse=None, progress=None):
+    """Read a grades export into (layout, [StudentRecord, ...]); see read_grade_table"""
+    table = read_grade_table(filename, sparse, progress)
+    return table.layout, table.records
+
+
+def read_student_names(filename):
+    """(assignment headers, [StudentName, ...]) of a grades export, keeping only the name
+    and ID cells of each row: the student list is in before the grades are parsed"""
+    _, plan, rows = open_export(filename)
+    name_column = plan.meta['name']
+    id_column = plan.meta.get('id')
+    names = []
+    for row in rows:
+        if len(row) <= name_column or not row[name_column].strip():
+            continue
+        student_id = row[id_column] if id_column is not None and id_column < len(row) else ""
+        names.append(StudentName(row[name_column].strip(), student_id))
+    return [h for _, h in plan.assignments], names
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Student Reports Module
+The per-student grade report of menu option 2 (grades grouped by assignment type,
+course scores, completed count) as text or printable HTML, and a batch mode that
+writes one report file per student for the whole class or one section, e.g. for
+parent conferences. Categories come from the sub-chapter index, computed once per
+gradebook; with many students the files are rendered and written by worker processes.
+Usage: python student_reports.py [--dir DIR] [--section F2] [--format txt|html] [--workers N]
+"""
+
+import argparse
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from html import escape
+
+from gradebook import Gradebook, GRADES_CSV, ALL_SECTIONS, student_labels, use_locale_collation
+from local_exporters import EXPORT_DIR, safe_filename
+from subchapter_index import ASSIGNMENT_TYPES
+
+# Report heading of every assignment type, in report order
+CATEGORY_TITLES = {
+    'Lesson Practice': "LESSON PRACTICE",
+    'Code Practice': "CODE PRACTICE",
+    'Assignment': "ASSIGNMENTS",
+    'Quiz': "QUIZZES",
+    'Test': "TESTS",
+    'Other': "OTHER",
+}
+
+FORMATS = {'txt': '.txt', 'html': '.html'}
+
+# Render in worker processes from this many students on
+PARALLEL_MIN_STUDENTS = 500
+# Students per worker task
+CHUNK_STUDENTS = 100
+
+# submitted: ((column, grade), ...) in column order; course: ((column header, value), ...)
+StudentReport = namedtuple('StudentReport', ['label', 'id', 'section', 'submitted', 'completed', 'course'])
+
+# What every report of one gradebook shares: assignment headers and the type of every column
+ReportContext = namedtuple('ReportContext', ['assignments', 'kinds'])
+
+
+def report_context(gradebook):
+    return ReportContext(tuple(gradebook.assignments), tuple(e.kind for e in gradebook.index.entries))
+
+
+def student_report(gradebook, row, label):
+    """StudentReport of one gradebook row, shown under the given label"""
+    record = gradebook.records[row]
+    return StudentReport(label, record.id, gradebook.sections[row], tuple(record.iter_submitted()),
+                         record.submitted_count(), tuple(gradebook.summary.student(row)))
+
+
+def categorized(report, context):
+    """[(category title, [(assignment, grade), ...]), ...] for the non-empty categories"""
+    groups = {kind: [] for kind in ASSIGNMENT_TYPES}
+    for column, grade in report.submitted:
+        groups[context.kinds[column]].append((context.assignments[column], grade))
+    return [(CATEGORY_TITLES[kind], groups[kind]) for kind in ASSIGNMENT_TYPES if groups[kind]]
+
+
+def report_text(report, context):
+    """The report as shown by menu option 2"""
+    lines = [f"All Grades for: {report.label}", f"Student ID: {report.id}", "=" * 50, ""]
+    sections = categorized(report, context)
+    if report.course:
+        sections.append(("COURSE SCORES", list(report.course)))
+    for title, grades in sections:
+        lines.append(f"{title}:")
+        lines.extend(f"  {assignment}: {grade}" for assignment, grade in grades)
+        lines.append("")
+    lines.append(f"Total completed assignments: {report.completed}")
+    return "\n".join(lines) + "\n"
+
+
+HTML_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5em; min-width: 60%; }}
+th, td {{ border: 1px solid #bbb; padding: 3px 8px; text-align: left; }}
+td.grade {{ text-align: right; width: 6em; }}
+h2 {{ font-size: 1.1em; margin-bottom: 0.3em; }}
+@media print {{ h2 {{ break-after: avoid; }} table {{ break-inside: auto; }} }}
+</style></head>
+<body>
+{body}
+</body></html>
+"""
+
+
+def report_html(report, context):
+    """The same report as a printable HTML page"""
+    parts = [f"<h1>{escape(report.label)}</h1>",
+             f"<p>Student ID: {escape(report.id)}"
+             + (f" &middot; Section: {escape(report.section)}" if report.section != 'Other' else "") + "</p>"]
+    sections = categorized(report, context)
+    if report.course:
+        sections.append(("COURSE SCORES", list(report.course)))
+    for title, grades in sections:
+        parts.append(f"<h2>{escape(title.title())}</h2>")
+        parts.append("<table>")
+        parts.extend(f"<tr><td>{escape(str(assignment))}</td><td class=\"grade\">{escape(str(grade))}</td></tr>"
+                     for assignment, grade in grades)
+        parts.append("</table>")
+    parts.append(f"<p>Total completed assignments: {report.completed}</p>")
+    return HTML_PAGE.format(title=escape(report.label), body="\n".join(parts))
+
+
+RENDERERS = {'txt': report_text, 'html': report_html}
+
+
+def write_reports(context, fmt, jobs):
+    """Render and write [(path, StudentReport), ...]; returns the number of files"""
+    render = RENDERERS[fmt]
+    for path, report in jobs:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render(report, context))
+    return len(jobs)
+
+
+_worker_context = None
+
+
+def _init_worker(context, fmt):
+    global _worker_context
+    _worker_context = (context, fmt)
+
+
+def _write_chunk(jobs):
+    """Worker: write one chunk of reports with the context sent once per process"""
+    context, fmt = _worker_context
+    return write_reports(context, fmt, jobs)
+
+
+def report_path(output_dir, report, extension, taken):
+    """File of one report; the student ID is added when two labels make the same file name"""
+    prefix = "" if report.section == 'Other' else f"{report.section} - "
+    path = os.path.join(output_dir, safe_filename(f"{prefix}{report.label}") + extension)
+    if path in taken:
+        path = os.path.join(output_dir, safe_filename(f"{prefix}{report.label} {report.id}") + extension)
+    taken.add(path)
+    return path
+
+
+def write_student_reports(gradebook, output_dir=None, section=None, fmt='txt', workers=None):
+    """Write one report file per student (of one section, or everyone) into output_dir,
+    by default a new folder in exports/. Returns (folder, [file path, ...]) in roster order."""
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unknown report format {fmt}")
+    if output_dir is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output_dir = os.path.join(EXPORT_DIR, f"Student Reports{' ' + section if section else ''} {stamp}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    labels = student_labels(gradebook.records)
+    sections = [section] if section else ALL_SECTIONS
+    rows = [row for s in sections for row in gradebook.section_rows.get(s, ())]
+    extension = FORMATS[fmt]
+    jobs = []
+    taken = set()
+    for row in rows:
+        report = student_report(gradebook, row, labels[row])
+        jobs.append((report_path(output_dir, report, extension, taken), report))
+
+    context = report_context(gradebook)
+    if workers == 1 or len(jobs) < PARALLEL_MIN_STUDENTS:
+        write_reports(context, fmt, jobs)
+    else:
+        chunks = [jobs[i:i + CHUNK_STUDENTS] for i in range(0, len(jobs), CHUNK_STUDENTS)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(context, fmt)) as pool:
+            list(pool.map(_write_chunk, chunks))
+    return output_dir, [path for path, _ in jobs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a grade report file for every student')
+    parser.add_argument('--dir', default='.', help='folder with the grades and roster files')
+    parser.add_argument('--grades', default=GRADES_CSV, help='grades file name')
+    parser.add_argument('--section', choices=ALL_SECTIONS, help='only this section (default: everyone)')
+    parser.add_argument('--format', choices=list(FORMATS), default='txt')
+    parser.add_argument('--out', help='output folder (default: a new folder in exports/)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'worker processes (default: all CPUs from {PARALLEL_MIN_STUDENTS} students on)')
+    args = parser.parse_args()
+
+    use_locale_collation()
+    gradebook = Gradebook.load(args.dir, args.grades)
+    folder, paths = write_student_reports(gradebook, args.out, args.section, args.format, args.workers)
+    print(f"Wrote {len(paths)} student reports to '{folder}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Sub-chapter Index Module
+Parses the assignment header once into unit -> sub-chapter -> ordered columns,
+so exports and reports can look up "1.4", "unit 3" or "1.2-1.5" without rescanning.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# "1.3 Code Practice: Question 1 (23120662)" -> unit 1, sub-chapter 1.3
+SUBCHAPTER_RE = re.compile(r'^(\d+)\.(\d+)(?=\s|$)')
+# "Quiz 6 (...)", "Test 12 (...)", "Assignment 6: Animation (...)" belong to a whole unit
+UNIT_ITEM_RE = re.compile(r'^(?:Quiz|Test|Assignment)\s+(\d+)\b')
+# "Submitting Unit 11 Assignment – Step 1 (...)"
+UNIT_MENTION_RE = re.compile(r'\bUnit\s+(\d+)\b')
+# Range queries: "1.2-1.5", "1.2–1.5", "1.2 to 1.5"
+RANGE_RE = re.compile(r'^(\d+\.\d+)\s*(?:-|–|—|to)\s*(\d+\.\d+)$')
+UNIT_QUERY_RE = re.compile(r'^(?:unit\s*)?(\d+)$', re.IGNORECASE)
+# Project Stem assignment ID at the end of the header: "... (23120662)"
+ASSIGNMENT_ID_RE = re.compile(r'\((\d+)\)\s*$')
+
+# Assignment types, in the order reports list them
+ASSIGNMENT_TYPES = ['Lesson Practice', 'Code Practice', 'Assignment', 'Quiz', 'Test', 'Other']
+
+AssignmentEntry = namedtuple('AssignmentEntry', ['column', 'name', 'unit', 'subchapter', 'kind'])
+
+
+def assignment_type(name):
+    """Classify an assignment header the same way the per-student report does"""
+    if "Lesson Practice" in name:
+        return 'Lesson Practice'
+    elif "Code Practice" in name:
+        return 'Code Practice'
+    elif "Assignment" in name:
+        return 'Assignment'
+    elif "Quiz" in name:
+        return 'Quiz'
+    elif "Test" in name:
+        return 'Test'
+    return 'Other'
+
+
+def assignment_number(name):
+    """'1.3 Code Practice: Question 1 (23120662)' -> 23120662 (None if the header has no ID)"""
+    match = ASSIGNMENT_ID_RE.search(name)
+    return int(match.group(1)) if match else None
+
+
+def subchapter_key(subchapter):
+    """'1.10' -> (1, 10), so 1.10 sorts after 1.9"""
+    unit, part = subchapter.split('.', 1)
+    return int(unit), int(part)
+
+
+class SubchapterIndex:
+    def __init__(self, assignments):
+        """assignments is the list of assignment headers; columns are indices into it"""
+        self.assignments = list(assignments)
+        self.entries = []
+        self.subchapters = {}       # '1.3' -> (column, column, ...)
+        self.units = {}             # 1 -> ['1.1', '1.2', ...]
+        self.unit_items = {}        # 1 -> (column, ...) for unit-level quizzes/tests/assignments
+        self.kinds = {kind: [] for kind in ASSIGNMENT_TYPES}
+
+        subchapter_columns = {}
+        unit_item_columns = {}
+        for column, name in enumerate(self.assignments):
+            text = name.strip()
+            unit = None
+            subchapter = None
+
+            match = SUBCHAPTER_RE.match(text)
+            if match:
+                unit = int(match.group(1))
+                subchapter = f"{match.group(1)}.{match.group(2)}"
+                subchapter_columns.setdefault(subchapter, []).append(column)
+            else:
+                match = UNIT_ITEM_RE.match(text) or UNIT_MENTION_RE.search(text)
+                if match:
+                    unit = int(match.group(1))
+                    unit_item_columns.setdefault(unit, []).append(column)
+
+            kind = assignment_type(text)
+            self.kinds[kind].append(column)
+            self.entries.append(AssignmentEntry(column, name, unit, subchapter, kind))
+
+        # Sub-chapters in numeric order (1.9 before 1.10), columns in header order
+        self._ordered = sorted(subchapter_columns, key=subchapter_key)
+        self._ordered_keys = [subchapter_key(s) for s in self._ordered]
+        for subchapter in self._ordered:
+            self.subchapters[subchapter] = tuple(subchapter_columns[subchapter])
+            self.units.setdefault(subchapter_key(subchapter)[0], []).append(subchapter)
+        for unit, columns in unit_item_columns.items():
+            self.unit_items[unit] = tuple(columns)
+            self.units.setdefault(unit, [])
+        self.units = dict(sorted(self.units.items()))
+        self.kinds = {kind: tuple(columns) for kind, columns in self.kinds.items()}
+
+    def prefixes(self):
+        """All sub-chapters in numeric order, e.g. ['1.1', '1.2', ..., '12.3']"""
+        return list(self._ordered)
+
+    def timeline(self):
+        """Course order as [(label, columns), ...]: each unit's sub-chapters, then its
+        unit-level quizzes/tests/assignments labelled 'Unit N'"""
+        steps = []
+        for unit, subchapters in self.units.items():
+            steps.extend((s, self.subchapters[s]) for s in subchapters)
+            if unit in self.unit_items:
+                steps.append((f"Unit {unit}", self.unit_items[unit]))
+        return steps
+
+    def columns(self, subchapter):
+        """Columns of exactly this sub-chapter ('1.1' does not include '1.10')"""
+        return self.subchapters.get(subchapter.strip(), ())
+
+    def unit_columns(self, unit, include_unit_items=True):
+        """Columns of every sub-chapter of a unit, followed by its quizzes/tests/assignments"""
+        columns = []
+        for subchapter in self.units.get(int(unit), []):
+            columns.extend(self.subchapters[subchapter])
+        if include_unit_items:
+            columns.extend(self.unit_items.get(int(unit), ()))
+        return tuple(columns)
+
+    def range_columns(self, start, end):
+        """Columns of every sub-chapter from start to end inclusive, e.g. ('1.2', '1.5')"""
+        lo = bisect_left(self._ordered_keys, subchapter_key(start))
+        hi = bisect_right(self._ordered_keys, subchapter_key(end))
+        columns = []
+        for subchapter in self._ordered[lo:hi]:
+            columns.extend(self.subchapters[subchapter])
+        return tuple(columns)
+
+    def lookup(self, query):
+        """Resolve a query string to columns: '1.4', '3', 'unit 3', '1.2-1.5' or '1.2–1.5'"""
+        query = query.strip()
+        match = RANGE_RE.match(query)
+        if match:
+            return self.range_columns(match.group(1), match.group(2))
+        match = UNIT_QUERY_RE.match(query)
+        if match:
+            return self.unit_columns(match.group(1))
+        return self.columns(query)
+
+    def assignment_names(self, query):
+        """Same as lookup() but returns the assignment header strings"""
+        return [self.assignments[c] for c in self.lookup(query)]
+
+    def columns_of_kind(self, kind):
+        """All columns of one assignment type (see ASSIGNMENT_TYPES)"""
+        return self.kinds.get(kind, ())
@@ -0,0 +1,45 @@
+import tempfile
+
+import pytest
+
+from at_risk import assess, due_steps, iter_at_risk_rows
+
+
+def test_due_steps_skip_items_nobody_has_done(load_at_risk):
+    with tempfile.TemporaryDirectory() as folder:
+        steps = due_steps(load_at_risk(folder))
+    assert [label for label, _ in steps] == ['1.1', '1.2', '1.3', '1.4', '1.5']
+
+
+def test_ranking_and_reasons(load_at_risk):
+    with tempfile.TemporaryDirectory() as folder:
+        report = assess(load_at_risk(folder), recent_steps=2, missing_threshold=2, use_numpy=False)
+    assert report.recent == ['1.4', '1.5']
+    ranked = [(e.name, e.flagged) for e in report.entries]
+    # John missed both recent items, Ann submitted them with low scores
+    assert ranked[0] == ("Smith, John", True)
+    assert ranked[1] == ("Lee, Ann", True)
+    assert ranked[2:] == [("Park, Min", False), ("Doe, Jane", False)]
+    ann = report.entries[1]
+    assert ann.missing_recent == 0 and ann.trend == -0.75
+    assert ann.reasons == ("score down 75% from earlier sub-chapters",)
+
+    rows = list(iter_at_risk_rows(report, 'F2'))
+    assert [r[1] for r in rows[3:]] == ['Smith', 'Lee']
+
+
+def test_no_new_work_since_earlier_download(load_at_risk, at_risk_rows):
+    with tempfile.TemporaryDirectory() as folder:
+        before = load_at_risk(folder, [(n, i, g[:3] + ['', '', '']) for n, i, g in at_risk_rows])
+        report = assess(load_at_risk(folder), recent_steps=2, missing_threshold=5, trend_drop=1.0,
+                        previous=before.records, use_numpy=False)
+    stalled = [e.name for e in report.entries if e.flagged]
+    assert stalled == ["Smith, John"]
+    assert report.entries[0].new_submissions == 0
+
+
+def test_numpy_and_python_agree(load_at_risk):
+    pytest.importorskip('numpy')
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load_at_risk(folder)
+    assert assess(gradebook, 2, use_numpy=True) == assess(gradebook, 2, use_numpy=False)
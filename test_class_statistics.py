@@ -0,0 +1,88 @@
+import csv
+import io
+import math
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+from class_statistics import (class_statistics, percentile, iter_summary_rows, iter_overview_rows,
+                              section_overview)
+from gradebook import Gradebook
+from local_exporters import CsvBundleExporter
+
+ROWS = [("Doe, Jane", '1', ['5.00', '1.00', '']),
+        ("Smith, John", '2', ['3.00', 'EX', '']),
+        ("Lee, Ann", '3', ['1.00', '', '']),
+        ("Park, Min", '4', ['', '0.00', ''])]
+
+
+@pytest.fixture
+def load(write_gradebook):
+    def load(folder):
+        write_gradebook(folder, ROWS)
+        with open(os.path.join(folder, 'F5 - names.csv'), 'w', encoding='utf-8') as f:
+            f.write("name\nJohn Smith\nAnn Lee\n")
+        return Gradebook.load(folder)
+    return load
+
+
+def test_percentile_matches_linear_interpolation():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 100) == 4.0
+    assert percentile(values, 25) == 1.75
+    assert percentile([7.0], 90) == 7.0
+
+
+def test_statistics_per_section(load):
+    with tempfile.TemporaryDirectory() as folder:
+        stats = class_statistics(load(folder), use_numpy=False)
+
+    everyone = stats[0, 'All']
+    assert (everyone.students, everyone.submitted, everyone.graded) == (4, 3, 3)
+    assert everyone.mean == 3.0 and everyone.median == 3.0
+    assert math.isclose(everyone.stdev, math.sqrt(8 / 3))
+    # Points possible is 1.00, so 3 and 5 land in the top bin with 1
+    assert everyone.histogram == (0, 0, 0, 0, 3)
+
+    f5 = stats[0, 'F5']
+    assert (f5.students, f5.lowest, f5.highest) == (2, 1.0, 3.0)
+
+    # 'EX' counts as submitted but not graded
+    assert stats[1, 'F5'].submitted == 1 and stats[1, 'F5'].graded == 0 and stats[1, 'F5'].mean is None
+    assert stats[2, 'All'].submission_rate == 0.0
+
+
+def test_numpy_and_python_agree(load):
+    pytest.importorskip('numpy')
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load(folder)
+    fast = class_statistics(gradebook, use_numpy=True)
+    slow = class_statistics(gradebook, use_numpy=False)
+    assert fast.keys() == slow.keys()
+    for key in slow:
+        for a, b in zip(fast[key], slow[key]):
+            assert a == b or math.isclose(a, b), (key, fast[key], slow[key])
+
+
+def test_summary_sheet_export(load, assignments):
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load(folder)
+        stats = class_statistics(gradebook, use_numpy=False)
+        columns = range(len(assignments))
+        exporter = CsvBundleExporter(os.path.join(folder, 'out'), os.path.join(folder, 'snapshots'))
+        path = exporter.export_report_to_sheets("Class Analytics", [
+            ("Summary", iter_summary_rows(stats, gradebook.assignments, columns)),
+            ("Sections", iter_overview_rows(stats, columns, gradebook.layout)),
+        ])
+        with zipfile.ZipFile(path) as bundle:
+            summary = list(csv.reader(io.TextIOWrapper(bundle.open('Summary.csv'), encoding='utf-8')))
+            sections = list(csv.reader(io.TextIOWrapper(bundle.open('Sections.csv'), encoding='utf-8')))
+
+    # Title, blank, header, then assignments x (F2, F5, F6, Other, All)
+    assert len(summary) == 3 + len(assignments) * 5
+    assert summary[3][:4] == [assignments[0], 'F2', '1', '1']
+    assert [row[0] for row in sections[3:]] == ['F2', 'F5', 'F6', 'Other', 'All']
+    assert section_overview(stats, columns, gradebook.layout)['F6'] == (0.0, None)
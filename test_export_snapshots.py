@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from export_snapshots import SnapshotStore, TabDigests, diff_rows, format_diff
+
+TABS = [("F2 Section", [["Last Name", "First Name", "1.1"], ["Doe", "Jane", 4.0], ["Lee", "Ann", ""]]),
+        ("F5 Section", [["Last Name", "First Name", "1.1"], ["Park", "Min", 2.0]])]
+
+
+def test_identical_payload_is_found_and_stored_once():
+    with tempfile.TemporaryDirectory() as folder:
+        store = SnapshotStore(folder)
+        assert store.find_unchanged("Grades", "Google Sheets", TABS) is None
+        first = store.record("Grades", "Google Sheets", TABS, "https://example/1")
+
+        again = [(name, [list(row) for row in rows]) for name, rows in TABS]
+        assert store.find_unchanged("Grades", "Google Sheets", again) == first
+        # Other titles and targets are separate
+        assert store.find_unchanged("Grades", "Excel", TABS) is None
+        assert store.find_unchanged("Other", "Google Sheets", TABS) is None
+
+        store.record("Grades", "Google Sheets", again, "https://example/2")
+        objects = [f for _, _, files in os.walk(os.path.join(folder, 'objects')) for f in files]
+        assert len(objects) == 2
+        assert store.get_object(first.tabs[0][1]) == TABS[0][1]
+        assert [s.location for s in store.history("Grades")] == ["https://example/1", "https://example/2"]
+
+
+def test_streamed_tabs_match_stored_tabs():
+    with tempfile.TemporaryDirectory() as folder:
+        store = SnapshotStore(folder)
+        digests = TabDigests(store)
+        for name, rows in TABS:
+            assert list(digests.stream(name, iter(rows))) == rows
+        assert tuple(digests.entries) == store.hash_tabs(TABS)
+        assert store.get_object(digests.entries[1][1]) == TABS[1][1]
+
+        # A tab that fails half way leaves nothing behind
+        def broken():
+            yield TABS[0][1][0]
+            raise ValueError("disk full")
+        with pytest.raises(ValueError):
+            list(digests.stream("Broken", broken()))
+        assert len(digests.entries) == 2
+        objects = [f for _, _, files in os.walk(os.path.join(folder, 'objects')) for f in files]
+        assert len(objects) == 2 and not any(f.endswith('.tmp') for f in objects)
+
+        first = store.record_entries("Grades", "Excel", digests.entries, "grades.xlsx")
+        assert store.find_unchanged("Grades", "Excel", TABS) == first
+
+
+def test_changed_payload_is_diffed_per_tab():
+    with tempfile.TemporaryDirectory() as folder:
+        store = SnapshotStore(folder)
+        old = store.record("Grades", "Google Sheets", TABS, "https://example/1")
+        changed = [("F2 Section", [["Last Name", "First Name", "1.1"], ["Doe", "Jane", 4.0], ["Lee", "Ann", 3.0]]),
+                   TABS[1], ("Other Students", [["Roe", "Rick", ""]])]
+        assert store.find_unchanged("Grades", "Google Sheets", changed) is None
+        new = store.record("Grades", "Google Sheets", changed, "https://example/2")
+
+        diffs = {d.name: d for d in store.diff(old, new)}
+        assert diffs["F5 Section"].status == 'same'
+        assert diffs["Other Students"].status == 'added'
+        assert diffs["F2 Section"].changed == [(["Lee", "Ann", ""], ["Lee", "Ann", 3.0])]
+        assert store.previous_of(new) == old
+        assert store.find(new.payload[:8]) == new
+        assert "F2 Section: changed (1 changed" in format_diff(old, new, store.diff(old, new))
+
+
+def test_key_links_exports_across_title_changes():
+    with tempfile.TemporaryDirectory() as folder:
+        store = SnapshotStore(folder)
+        old = store.record("Grades - Quiz 1 (12)", "Google Sheets", TABS, "https://example/1", key='assignment:12')
+        # The assignment was renamed: the title changed, the key did not
+        assert store.find_unchanged("Grades - Quiz One (12)", "Google Sheets", TABS, 'assignment:12') == old
+        new = store.record("Grades - Quiz One (12)", "Google Sheets", TABS[:1], "https://example/2",
+                           key='assignment:12')
+        assert store.previous_of(new) == old
+        assert store.history("Grades - Quiz One (12)") == [new]
+        # Log lines written before keys existed still load
+        with open(store.log_path, 'a', encoding='utf-8') as f:
+            f.write('{"title": "Old", "target": "Excel", "created": "2025-09-13T17:22:00", '
+                    '"payload": "ab", "tabs": [], "location": ""}\n')
+        assert store.history("Old")[0].key is None
+
+
+def test_diff_rows_keeps_repeated_names_apart():
+    old = [["Doe", "Jane", 1.0], ["Doe", "Jane", 2.0]]
+    new = [["Doe", "Jane", 1.0], ["Doe", "Jane", 5.0], ["Kim", "Lee", 0.0]]
+    added, removed, changed = diff_rows(old, new)
+    assert added == [["Kim", "Lee", 0.0]] and removed == []
+    assert changed == [(["Doe", "Jane", 2.0], ["Doe", "Jane", 5.0])]
+
+
+def test_upload_reuses_a_sheet_only_while_it_exists():
+    pytest.importorskip('googleapiclient')
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpMockSequence
+    from google_sheets_integration import GoogleSheetsExporter
+    from sheets_scheduler import RequestScheduler
+
+    ok = ({'status': '200'}, '{}')
+    created = ({'status': '200'}, json.dumps({'spreadsheetId': 'new-sheet'}))
+    gone = ({'status': '404'}, json.dumps({'error': {'code': 404, 'message': 'not found'}}))
+    with tempfile.TemporaryDirectory() as folder:
+        exporter = GoogleSheetsExporter()
+        exporter.snapshots = SnapshotStore(folder)
+        exporter.authenticated = True
+        exporter.snapshots.record("Grades", "Google Sheets", TABS, "https://docs.google.com/spreadsheets/d/old-sheet")
+
+        def upload(responses):
+            http = HttpMockSequence(responses)
+            exporter.service = build('sheets', 'v4', http=http, static_discovery=True)
+            exporter.scheduler = RequestScheduler(exporter.service, sleep=lambda seconds: None)
+            url = exporter.upload_tabs("Grades", TABS, None, lambda spreadsheet_id: None, "Failed")
+            return url, [method + ' ' + uri.split('?')[0].rsplit('/', 1)[-1] for uri, method, _, _ in http.request_sequence]
+
+        # Still there: one lookup, nothing uploaded
+        assert upload([ok]) == ("https://docs.google.com/spreadsheets/d/old-sheet", ['GET old-sheet'])
+        # Deleted: uploaded again
+        url, requests = upload([gone, created, ok])
+        assert url.endswith('/new-sheet') and requests == ['GET old-sheet', 'POST spreadsheets',
+                                                           'POST values:batchUpdate']
+        # New copy on request: no lookup
+        exporter.reuse_unchanged = False
+        assert upload([created, ok])[1] == ['POST spreadsheets', 'POST values:batchUpdate']
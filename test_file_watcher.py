@@ -0,0 +1,64 @@
+import os
+import tempfile
+import threading
+
+from file_watcher import FileWatcher
+from gradebook import Gradebook
+
+
+def touch(path, text='', mtime_ns=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_check_reports_matching_files_only():
+    with tempfile.TemporaryDirectory() as folder:
+        touch(os.path.join(folder, 'grades.csv'), 'a', mtime_ns=1)
+        watcher = FileWatcher(lambda changed: None, folder)
+        assert watcher.check() == []
+
+        touch(os.path.join(folder, 'grades.csv'), 'ab', mtime_ns=2)
+        touch(os.path.join(folder, 'F7 - names.csv'), 'name\n')
+        touch(os.path.join(folder, 'notes.txt'), 'ignored')
+        assert watcher.check() == ['F7 - names.csv', 'grades.csv']
+
+        os.remove(os.path.join(folder, 'F7 - names.csv'))
+        assert watcher.check() == ['F7 - names.csv']
+
+
+def test_thread_calls_back_once_files_settle():
+    with tempfile.TemporaryDirectory() as folder:
+        touch(os.path.join(folder, 'grades.csv'), 'a', mtime_ns=1)
+        seen = []
+        called = threading.Event()
+
+        def on_change(changed):
+            seen.append(changed)
+            called.set()
+
+        watcher = FileWatcher(on_change, folder, interval=0.05, settle=0.05).start()
+        try:
+            touch(os.path.join(folder, 'grades.csv'), 'abc', mtime_ns=5)
+            assert called.wait(5)
+        finally:
+            watcher.stop()
+        assert seen[0] == ['grades.csv']
+
+
+def test_reload_rereads_only_changed_files(write_gradebook, rows):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, rows)
+        gradebook = Gradebook.load(folder)
+        assert gradebook.sections == ['F2', 'Other']
+
+        with open(os.path.join(folder, 'F5 - names.csv'), 'w', encoding='utf-8') as f:
+            f.write("name\nJohn Smith\n")
+        reloaded = gradebook.reload(folder, grades=False, rosters=True)
+        # Grades and index are shared, only the sections are recomputed
+        assert reloaded.records is gradebook.records and reloaded.index is gradebook.index
+        assert reloaded.sections == ['F2', 'F5']
+
+        reloaded = gradebook.reload(folder, grades=True, rosters=False)
+        assert reloaded.records is not gradebook.records and reloaded.rosters is gradebook.rosters
@@ -0,0 +1,65 @@
+import csv
+import json
+import os
+import tempfile
+
+from grade_adapters import open_export, plan_columns
+from student_record import read_grade_table
+
+HEADER = ['Student', 'ID', 'SIS User ID', 'SIS Login ID', 'Section',
+          '1.1 Lesson Practice (11)', 'Quiz 1 (12)', 'Current Score', 'Final Grade']
+POINTS = ['    Points Possible', '', '', '', '', '5.00', '10.00', '(read only)', '(read only)']
+ROWS = [['Doe, Jane', '1', 'S1', 'jdoe', 'F2', '5.00', '', '100.00', 'A'],
+        ['Smith, John', '2', 'S2', 'jsmith', 'F5', '3.00', '7.50', '70.00', 'C-']]
+
+
+def write_rows(path, rows, delimiter=','):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, delimiter=delimiter).writerows(rows)
+
+
+def test_canvas_columns_are_sorted_by_role():
+    plan = plan_columns(HEADER, POINTS)
+    assert plan.flavor == 'canvas'
+    assert plan.meta == {'name': 0, 'id': 1, 'sis_user_id': 2, 'sis_login_id': 3, 'section': 4}
+    assert plan.assignments == [(5, '1.1 Lesson Practice (11)'), (6, 'Quiz 1 (12)')]
+    assert plan.summary == [(7, 'Current Score'), (8, 'Final Grade')]
+    # Summary headers are recognised without the points row too
+    assert plan_columns(HEADER).summary == plan.summary
+
+
+def test_csv_tsv_and_json_read_the_same():
+    with tempfile.TemporaryDirectory() as folder:
+        paths = [os.path.join(folder, name) for name in ('grades.csv', 'grades.tsv', 'records.json', 'split.json')]
+        write_rows(paths[0], [HEADER, POINTS] + ROWS)
+        write_rows(paths[1], [HEADER, POINTS] + ROWS, delimiter='\t')
+        with open(paths[2], 'w', encoding='utf-8') as f:
+            json.dump([dict(zip(HEADER, row)) for row in ROWS], f)
+        with open(paths[3], 'w', encoding='utf-8') as f:
+            json.dump({'columns': HEADER, 'data': [POINTS] + [r[:5] + [5, None, 100, 'A'] for r in ROWS[:1]]}, f)
+        tables = [read_grade_table(path, sparse=True) for path in paths]
+
+    for table in tables[:3]:
+        assert table.flavor == 'canvas'
+        assert [(r.name, r.id) for r in table.records] == [('Doe, Jane', '1'), ('Smith, John', '2')]
+        assert table.meta['section'] == ['F2', 'F5'] and table.meta['sis_login_id'] == ['jdoe', 'jsmith']
+        assert table.layout.assignments == ('1.1 Lesson Practice (11)', 'Quiz 1 (12)')
+        assert table.summary.headers == ('Current Score', 'Final Grade')
+        assert table.summary.student(1) == [('Current Score', 70.0), ('Final Grade', 'C-')]
+        assert table.records[1].get('Quiz 1 (12)') == 7.5
+    assert list(tables[0].layout.points[:2]) == [5.0, 10.0]
+    assert tables[3].records[0].get('1.1 Lesson Practice (11)') == 5.0
+    assert tables[3].records[0].get('Quiz 1 (12)') is None
+
+
+def test_generic_table_without_points_row():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'grades.csv')
+        write_rows(path, [['Quiz 1', 'Name', 'Student ID', 'Quiz 2'],
+                          ['4', 'Lee, Ann', '9', ''], ['', '', '', '']])
+        adapter, plan, rows = open_export(path)
+        assert (plan.flavor, plan.meta) == ('generic', {'name': 1, 'id': 2})
+        assert next(rows) == ['4', 'Lee, Ann', '9', '']
+        table = read_grade_table(path)
+    assert len(table) == 1 and table.layout.assignments == ('Quiz 1', 'Quiz 2')
+    assert table.records[0].get('Quiz 1') == 4.0 and table.records[0].id == '9'
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+import grade_history
+from grade_history import GradeHistory, archive_download, download_time, HISTORY_DIR
+
+DOWNLOADS = [[("Doe, Jane", '1', ['5.00', '', '']), ("Smith, John", '2', ['', '', ''])],
+             [("Doe, Jane", '1', ['5.00', '1.00', '']), ("Smith, John", '2', ['3.00', '', ''])],
+             [("Doe, Jane", '1', ['4.00', '1.00', '']), ("Smith, John", '2', ['', '', '1.00'])]]
+
+
+@pytest.fixture
+def archive_all(write_gradebook):
+    def archive_all(folder, downloads):
+        infos = []
+        for i, rows in enumerate(downloads):
+            write_gradebook(folder, rows)
+            path = os.path.join(folder, f"2025-09-1{i}T0800_Grades.csv")
+            os.replace(os.path.join(folder, 'grades.csv'), path)
+            infos.append(archive_download(path, folder))
+        return infos
+    return archive_all
+
+
+def test_download_time_from_file_name():
+    assert download_time("exports/2025-09-13T1722_Grades-Python.csv") == "2025-09-13T17:22:00"
+
+
+def test_curves_from_deltas(archive_all, assignments):
+    with tempfile.TemporaryDirectory() as folder:
+        infos = archive_all(folder, DOWNLOADS)
+        history = GradeHistory(os.path.join(folder, HISTORY_DIR))
+        assert [i.kind for i in infos] == ['full', 'delta', 'delta']
+        # Only the changed cells are stored: 1 -> 2 -> 3 (Jane's new grade, John's cleared and new cell)
+        assert [i.cells for i in infos] == [1, 2, 3]
+
+        assert history.student_curve("Jane Doe") == [("2025-09-10T08:00:00", 1, 5.0),
+                                                     ("2025-09-11T08:00:00", 2, 6.0),
+                                                     ("2025-09-12T08:00:00", 2, 5.0)]
+        assert [p.submitted for p in history.student_curve('2')] == [0, 1, 1]
+        assert history.assignment_curve(23118480) == [("2025-09-10T08:00:00", 1, 5.0),
+                                                       ("2025-09-11T08:00:00", 2, 4.0),
+                                                       ("2025-09-12T08:00:00", 1, 4.0)]
+        assert [p.submitted for p in history.assignment_curve(assignments[2])] == [0, 0, 1]
+        assert history.cell_history("Smith, John", '23118480') == [("2025-09-11T08:00:00", 3.0),
+                                                                   ("2025-09-12T08:00:00", None)]
+        assert history.student_curve("Nobody") == [] and history.assignment_curve("Quiz 9") == []
+
+        # The same download twice is archived once
+        assert archive_all(folder, DOWNLOADS[2:]) == [None]
+        assert len(history.snapshots()) == 3
+
+
+def test_keyframes_give_the_same_state(archive_all):
+    every = grade_history.KEYFRAME_EVERY
+    grade_history.KEYFRAME_EVERY = 2
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            infos = archive_all(folder, DOWNLOADS)
+            history = GradeHistory(os.path.join(folder, HISTORY_DIR))
+            assert [i.kind for i in infos] == ['full', 'delta', 'full']
+            assert [p.points for p in history.student_curve("Jane Doe")] == [5.0, 6.0, 5.0]
+            assert len(history.state()) == 3
+    finally:
+        grade_history.KEYFRAME_EVERY = every
+
+
+def test_concurrent_archiving(write_gradebook):
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i, rows in enumerate(DOWNLOADS[:2]):
+            write_gradebook(folder, rows)
+            paths.append(os.path.join(folder, f"2025-09-1{i}T0800_Grades.csv"))
+            os.replace(os.path.join(folder, 'grades.csv'), paths[-1])
+        # A third student only in the second download, so both writers extend the keys
+        with open(paths[1], 'a', encoding='utf-8', newline='') as f:
+            f.write('"Lee, Ann",3,,,CS Python Fundamentals,2.00,,\n')
+
+        barrier = threading.Barrier(len(paths))
+        infos = {}
+        pack = grade_history.pack
+
+        def slow_pack(*columns):
+            # Widen the window between reading the archive and writing the snapshot
+            time.sleep(0.05)
+            return pack(*columns)
+
+        def archive(path):
+            barrier.wait()
+            infos[path] = archive_download(path, folder)
+
+        grade_history.pack = slow_pack
+        try:
+            threads = [threading.Thread(target=archive, args=(path,)) for path in paths]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            grade_history.pack = pack
+
+        assert sorted(info.seq for info in infos.values()) == [1, 2]
+        history = GradeHistory(os.path.join(folder, HISTORY_DIR))
+        assert len(history.students) == 3 and not os.path.exists(history.lock_path)
+        # Replaying both snapshots gives the download archived last, whichever writer went first
+        second_last = infos[paths[1]].seq == 2
+        assert [p.points for p in history.student_curve("Jane Doe")] == ([5.0, 6.0] if second_last else [6.0, 5.0])
+        assert history.student_curve("Ann Lee")[-1].points == (2.0 if second_last else 0.0)
+        assert len(history.state()) == (4 if second_last else 1)
@@ -0,0 +1,36 @@
+import tempfile
+
+import pytest
+
+from gradebook import Gradebook
+from grade_reports import (specific_grade, student_grades, assignment_grades, render, GradeLookup,
+                           StudentNotFound)
+
+
+@pytest.fixture
+def gradebook(write_gradebook, rows):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, rows)
+        return Gradebook.load(folder)
+
+
+def test_specific_grade_by_id_or_header(gradebook, assignments):
+    assert specific_grade(gradebook, "Jane Doe", 23118480) == GradeLookup("Jane Doe", assignments[0], 5.0, '1')
+    assert render(specific_grade(gradebook, "Jane Doe", assignments[2])) == (
+        f"Student: Jane Doe\nAssignment: {assignments[2]}\nGrade: Not submitted/No grade\n")
+    missing = specific_grade(gradebook, "Nobody Here", assignments[0])
+    assert isinstance(missing, StudentNotFound)
+    assert render(missing).endswith("Available students:\n  - Jane Doe\n  - John Smith\n")
+    assert "<td>Student ID</td><td>1</td>" in render(specific_grade(gradebook, "Jane Doe", 23118480), 'html')
+
+
+def test_student_and_assignment_reports(gradebook, assignments):
+    assert render(student_grades(gradebook, "John Smith")).startswith("All Grades for: John Smith\nStudent ID: 2\n")
+    assert render(student_grades(gradebook, "Nobody Here")) == "Student 'Nobody Here' not found in grades data.\n"
+
+    text = render(assignment_grades(gradebook, 23118480))
+    assert "F2 SECTION:\n" + "-" * 20 + "\nDoe,Jane,5.0\n\nF2 Total: 1 students\n" in text
+    assert "OTHER STUDENTS:\n" + "-" * 20 + "\nSmith,John,3.0\n" in text
+    assert text.endswith("Average: 4.00\nHighest: 5.0\nLowest: 3.0\n")
+    assert render(assignment_grades(gradebook, assignments[2])).endswith("Total: 1 students\n\n")
+    assert "<td>Doe</td><td>Jane</td><td>5.0</td>" in render(assignment_grades(gradebook, 23118480), 'html')
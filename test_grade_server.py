@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from grade_client import COMMANDS, command_params
+from grade_server import GradeServer
+
+
+async def http_get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, body = raw.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_queries(write_gradebook, rows, assignments):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, rows)
+        server = GradeServer(folder)
+        server.install(*server.load())
+
+        status, body = server.query('/student', {'name': 'Jane Doe'})
+        student = json.loads(body)
+        assert status == 200 and student['section'] == 'F2' and student['completed'] == 2
+
+        status, body = server.query('/stats', {'assignment': assignments[0]})
+        assert status == 200 and json.loads(body)['average'] == 4.0
+
+        status, body = server.query('/subchapter', {'q': '1.1'})
+        sections = json.loads(body)['sections']
+        assert sections['F2']['submitted'] == [['Doe', 'Jane', 5.0]]
+        assert sections['Other']['submitted'] == [['Smith', 'John', 3.0]]
+
+        status, body = server.query('/course', {})
+        assert status == 200 and json.loads(body) == {'columns': []}
+        assert server.query('/course', {'column': 'Final Grade'})[0] == 404
+
+        assert server.query('/student', {'name': 'Nobody Here'})[0] == 404
+        assert server.query('/student', {'nme': 'Jane Doe'})[0] == 400
+        assert server.query('/nothing', {})[0] == 404
+
+
+def test_http_and_hot_reload(write_gradebook, rows):
+    async def scenario(folder):
+        server = GradeServer(folder, poll_seconds=60)
+        listener = await server.start('127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            status, students = await http_get(port, '/students')
+            assert status == 200 and students == ['Jane Doe', 'John Smith']
+
+            # Nothing changed: no reload
+            assert not await server.reload_if_changed()
+
+            write_gradebook(folder, rows + [("Lee, Ann", '3', ['', '', '1.00'])])
+            os.utime(os.path.join(folder, 'grades.csv'), ns=(1, 1))
+            assert await server.reload_if_changed()
+
+            status, students = await http_get(port, '/students')
+            assert students == ['Ann Lee', 'Jane Doe', 'John Smith']
+            status, health = await http_get(port, '/health')
+            assert health['reloads'] == 1
+        finally:
+            await server.stop(listener)
+
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, rows)
+        asyncio.run(scenario(folder))
+
+
+def test_client_commands_match_server_routes():
+    server = GradeServer('.')
+    for command, params in COMMANDS.items():
+        assert server.routes['/' + command][1] == params
+    assert command_params('history', ['', '23120662']) == {'assignment': '23120662'}
+    assert command_params('course', ['Current Score']) == {'column': 'Current Score'}
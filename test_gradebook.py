@@ -0,0 +1,110 @@
+import csv
+import os
+import tempfile
+
+import pytest
+
+from gradebook import Gradebook, load_student_list, student_labels, sort_key
+
+ROWS = [("Doe, Jane", '11', ['5.00', '', '']),
+        ("Doe, Jane", '12', ['', '1.00', '']),
+        ("Doe, Jane Ann", '13', ['', '', '1.00']),
+        ("Smith, John", '14', ['3.00', '', ''])]
+
+
+@pytest.fixture
+def load(write_gradebook):
+    def load(folder):
+        write_gradebook(folder, ROWS)
+        return Gradebook.load(folder)
+    return load
+
+
+def test_duplicate_names_get_distinct_labels(load):
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load(folder)
+    assert student_labels(gradebook.records) == ["Jane Doe (11)", "Jane Doe (12)", "Jane Ann Doe", "John Smith"]
+    assert gradebook.students == ["Jane Ann Doe", "Jane Doe (11)", "Jane Doe (12)", "John Smith"]
+    assert gradebook.find_student("Jane Doe (12)").id == '12'
+    assert gradebook.find_student("Jane Ann Doe").id == '13'
+
+
+def test_lookup_by_id_and_typed_name(load):
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load(folder)
+    assert gradebook.row_by_id == {'11': 0, '12': 1, '13': 2, '14': 3}
+    assert gradebook.find_student('14').name == "Smith, John"
+    # Names typed by hand still go through flexible matching
+    assert gradebook.find_student("john  SMITH").id == '14'
+    assert gradebook.find_student("Nobody") is None
+    summary = gradebook.student_summary("Jane Doe (12)")
+    assert (summary['id'], summary['completed']) == ('12', 1)
+
+
+def test_lookup_by_login_and_first_matching_row(load):
+    with tempfile.TemporaryDirectory() as folder:
+        loaded = load(folder)
+    gradebook = Gradebook(loaded.layout, loaded.records, loaded.rosters,
+                          logins=['jdoe1', 'jdoe2', '', 'jsmith'])
+    assert gradebook.row_by_login == {'jdoe1': 0, 'jdoe2': 1, 'jsmith': 3}
+    assert gradebook.student_row('jdoe2') == 1
+    assert gradebook.find_student('jsmith').id == '14'
+    # Typed names match the first row with that name, exact or first and last
+    assert gradebook.student_row("jane doe") == 0
+    assert gradebook.student_row("Jane  Q. Doe") == 0
+    assert gradebook.student_row("doe, jane ann") is None
+    assert gradebook.student_row("John Q Smith") == 3
+
+
+def test_student_list_is_read_before_the_grades(load):
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load(folder)
+        assignments, students = load_student_list(os.path.join(folder, 'grades.csv'))
+    assert assignments == gradebook.assignments
+    assert students == gradebook.students
+
+
+def test_sections_are_sorted_once_by_last_then_first_name(write_gradebook):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, [("smith, Zoe", '1', ['1.00', '', '']), ("Adams, Bo", '2', []),
+                                 ("Smith, Amy", '3', []), ("Doe, Jane", '4', [])])
+        gradebook = Gradebook.load(folder)
+    assert list(gradebook.section_rows['Other']) == [1, 2, 0]
+    assert list(gradebook.section_rows['F2']) == [3]
+    assert list(gradebook.rank) == [3, 0, 2, 1]
+    grades = gradebook.assignment_section_grades(gradebook.assignments[0])
+    assert grades['Other'] == [("Adams, Bo", ""), ("Smith, Amy", ""), ("smith, Zoe", 1.0)]
+    _, sections = gradebook.subchapter_sections('1.1')
+    assert sections['Other']['not_submitted'] == [["Adams", "Bo", ""], ["Smith", "Amy", ""]]
+    assert sort_key("Smith, Amy") < sort_key("smith, Zoe")
+
+
+def test_assignments_are_found_by_id(load):
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load(folder)
+    header = gradebook.assignments[0]
+    number = gradebook.assignment_key(header)
+    assert isinstance(number, int) and gradebook.assignment_name(number) == header
+    assert gradebook.assignment_section_grades(number) == gradebook.assignment_section_grades(header)
+    assert gradebook.assignment_statistics(str(number))['assignment'] == header
+    assert gradebook.assignment_key("Not an assignment") == "Not an assignment"
+
+
+def test_course_scores_are_not_assignments(write_gradebook):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, ROWS)
+        path = os.path.join(folder, 'grades.csv')
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        rows[0] += ['Current Score', 'Final Grade']
+        rows[1] += ['(read only)', '(read only)']
+        for row, cells in zip(rows[2:], [['95.00', 'A'], ['40.00', 'F'], ['', ''], ['71.00', 'C-']]):
+            row += cells
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows(rows)
+        gradebook = Gradebook.load(folder)
+    assert 'Current Score' not in gradebook.assignments and len(gradebook.assignments) == 3
+    assert [(r.id, g) for r, g in gradebook.course_ranking('Final Grade')] == [('11', 'A'), ('14', 'C-'), ('12', 'F')]
+    assert [r.id for r, _ in gradebook.course_ranking('Current Score', 'Other')] == ['14']
+    summary = gradebook.student_summary("John Smith")
+    assert summary['course'] == {'Current Score': 71.0, 'Final Grade': 'C-'} and summary['completed'] == 1
@@ -0,0 +1,112 @@
+import csv
+import io
+import os
+import tempfile
+import zipfile
+import xml.dom.minidom
+
+import pytest
+
+from local_exporters import XlsxExporter, CsvBundleExporter, ParquetExporter
+from sheet_layout import SECTION_TABS, iter_section_split_rows
+
+ASSIGNMENTS = ['1.4 Lesson Practice (23118565)', '1.4 Code Practice: Question 1 (23120705)']
+SECTIONS = {
+    'F2': {'submitted': [['Doe', 'Jane', 4.0, '']], 'not_submitted': [['Roe', 'Rick', '', '']]},
+    'F6': {'submitted': [['Smith & Co', 'Ann <A>', 1.0, 1.0]], 'not_submitted': []},
+}
+
+
+def test_xlsx_export_is_a_valid_workbook():
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = XlsxExporter(tmp, os.path.join(tmp, 'snapshots'))
+        path = exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, SECTIONS)
+        assert path.endswith('.xlsx')
+        # The snapshot holds exactly the rows that were streamed into the workbook
+        snapshot, reused = exporter.last_snapshot
+        assert not reused and [name for name, _, _ in snapshot.tabs] == [tab for _, tab in SECTION_TABS]
+        empty = {'submitted': [], 'not_submitted': []}
+        for (key, tab), (_, digest, count) in zip(SECTION_TABS, snapshot.tabs):
+            rows = [list(row) for row in iter_section_split_rows(tab, ASSIGNMENTS, SECTIONS.get(key, empty))]
+            assert exporter.snapshots.get_object(digest) == rows and count == len(rows)
+        with zipfile.ZipFile(path) as z:
+            for name in z.namelist():
+                xml.dom.minidom.parseString(z.read(name))
+            workbook = z.read('xl/workbook.xml').decode('utf-8')
+            assert all(f'name="{tab}"' in workbook
+                       for tab in ['F2 Section', 'F5 Section', 'F6 Section', 'Other Students'])
+            sheet = z.read('xl/worksheets/sheet1.xml').decode('utf-8')
+            assert '<v>4.0</v>' in sheet
+            assert 'Not submitted' in sheet
+            assert 'Smith &amp; Co' in z.read('xl/worksheets/sheet3.xml').decode('utf-8')
+
+
+def test_xlsx_sheet_names_are_unique():
+    long_name = '1.4 Code Practice: Question 1 (23120705)'
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = XlsxExporter(tmp, os.path.join(tmp, 'snapshots'))
+        path = exporter.export_report_to_sheets('Names', [
+            (long_name, []), (long_name, []), (long_name, []), ('Summary', []), ('SUMMARY', [])])
+        with zipfile.ZipFile(path) as z:
+            sheets = xml.dom.minidom.parseString(z.read('xl/workbook.xml')).getElementsByTagName('sheet')
+            names = [sheet.getAttribute('name') for sheet in sheets]
+    assert names == ['1.4 Code Practice_ Question 1 (',
+                     '1.4 Code Practice_ Question (2)',
+                     '1.4 Code Practice_ Question (3)',
+                     'Summary', 'SUMMARY (2)']
+    assert all(len(name) <= 31 for name in names)
+
+
+def test_parquet_snapshot_has_a_row_per_cell():
+    pytest.importorskip('pyarrow')
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = ParquetExporter(tmp, os.path.join(tmp, 'snapshots'))
+        exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, SECTIONS)
+        snapshot, _ = exporter.last_snapshot
+        assert [(name, count) for name, _, count in snapshot.tabs] == [('F2 Section', 4), ('F6 Section', 2)]
+        assert exporter.snapshots.get_object(snapshot.tabs[1][1]) == [
+            ['Submitted', 'Smith & Co', 'Ann <A>', ASSIGNMENTS[0], 1.0],
+            ['Submitted', 'Smith & Co', 'Ann <A>', ASSIGNMENTS[1], 1.0]]
+        assert exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, SECTIONS) == snapshot.location
+
+
+def test_csv_bundle_matches_sheet_layout():
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = CsvBundleExporter(tmp, os.path.join(tmp, 'snapshots'))
+        path = exporter.export_to_sheets(ASSIGNMENTS[0], [('Doe, Jane', 4.0)], [], [], [('Roe, Rick', '')])
+        with zipfile.ZipFile(path) as z:
+            # Empty sections are skipped, like the Google Sheets export
+            assert sorted(z.namelist()) == ['F2 Section.csv', 'Other Students.csv']
+            rows = list(csv.reader(io.TextIOWrapper(z.open('F2 Section.csv'), encoding='utf-8')))
+        assert rows == [
+            [f"Assignment: {ASSIGNMENTS[0]}"],
+            ['Section: F2 Section'],
+            [],
+            ['Last Name', 'First Name', 'Grade'],
+            ['Doe', 'Jane', '4.0'],
+        ]
+        assert os.path.dirname(path) == tmp
+
+
+def test_unchanged_export_returns_the_earlier_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'out')
+        os.makedirs(out)
+        exporter = XlsxExporter(out, os.path.join(tmp, 'snapshots'))
+        exporter.output_path = lambda title: os.path.join(out, f"{len(os.listdir(out))}.xlsx")
+
+        first = exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, SECTIONS)
+        assert exporter.last_snapshot == (exporter.snapshots.latest("Subchapter 1.4 Grades", 'Excel workbook'), False)
+        assert exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, SECTIONS) == first
+        assert exporter.last_snapshot[1] and os.listdir(out) == ['0.xlsx']
+
+        # A new copy on request, after a change, and when the earlier file was deleted
+        exporter.reuse_unchanged = False
+        assert exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, SECTIONS) != first
+        exporter.reuse_unchanged = True
+        changed = dict(SECTIONS, F5={'submitted': [], 'not_submitted': [['Park', 'Min', '', '']]})
+        assert exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, changed).endswith('2.xlsx')
+        for name in os.listdir(out):
+            os.remove(os.path.join(out, name))
+        assert os.path.exists(exporter.export_subchapter_to_sheets('1.4', ASSIGNMENTS, changed))
+        assert not exporter.last_snapshot[1]
@@ -0,0 +1,36 @@
+import tempfile
+
+import pytest
+
+from missing_work import missing_work, iter_missing_work_rows, SCOPE_ALL, SCOPE_DUE
+
+
+def test_missing_grouped_by_subchapter(load_at_risk):
+    with tempfile.TemporaryDirectory() as folder:
+        report = missing_work(load_at_risk(folder), SCOPE_DUE, use_numpy=False)
+    assert report.steps == ['1.1', '1.2', '1.3', '1.4', '1.5']
+    # Only John has missed anything that most of the class has done
+    [john] = report.sections['F2']
+    assert john.name == "Smith, John" and john.count == 2
+    assert john.missing == (('1.4', (4,)), ('1.5', (5,)))
+
+    rows = list(iter_missing_work_rows(report, 'F2'))
+    assert rows[2] == ["Last Name", "First Name", "Missing", '1.1', '1.2', '1.3', '1.4', '1.5']
+    assert rows[3] == ['Smith', 'John', 2, '', '', '', '4', '5']
+
+
+def test_scope_all_includes_unit_items(load_at_risk):
+    with tempfile.TemporaryDirectory() as folder:
+        report = missing_work(load_at_risk(folder), SCOPE_ALL, use_numpy=False)
+    assert report.steps[-1] == 'Unit 1'
+    # Nobody has taken Quiz 1 yet
+    assert all(entry.missing[-1] == ('Unit 1', (6,)) for entry in report.sections['F2'])
+    assert len(report.sections['F2']) == 4
+
+
+def test_numpy_and_python_agree(load_at_risk):
+    pytest.importorskip('numpy')
+    with tempfile.TemporaryDirectory() as folder:
+        gradebook = load_at_risk(folder)
+    for scope in (SCOPE_DUE, SCOPE_ALL):
+        assert missing_work(gradebook, scope, use_numpy=True) == missing_work(gradebook, scope, use_numpy=False)
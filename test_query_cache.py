@@ -0,0 +1,52 @@
+import json
+import tempfile
+
+from grade_server import GradeServer
+from query_cache import QueryCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(maxsize=2)
+    cache.get_or_compute('report', ('a',), lambda: 'A')
+    cache.get_or_compute('report', ('b',), lambda: 'B')
+    # Using 'a' again makes 'b' the least recently used
+    assert cache.get_or_compute('report', ('a',), lambda: 'new A') == 'A'
+    cache.get_or_compute('report', ('c',), lambda: 'C')
+    assert len(cache) == 2
+    assert cache.get_or_compute('report', ('a',), lambda: 'new A') == 'A'
+    assert cache.get_or_compute('report', ('b',), lambda: 'new B') == 'new B'
+
+
+def test_hit_and_miss_counters():
+    cache = QueryCache(maxsize=4)
+    calls = []
+    for params in [('a',), ('a',), ('b',), ('a',)]:
+        cache.get_or_compute('lookup', params, lambda: calls.append(params) or len(calls))
+    # The kind is part of the key
+    cache.get_or_compute('report', ('a',), lambda: 0)
+    assert calls == [('a',), ('b',)]
+    assert cache.stats() == {'hits': 2, 'misses': 3, 'size': 3, 'maxsize': 4, 'version': 0, 'hit_rate': 0.4}
+
+
+def test_invalidate_starts_a_new_version():
+    cache = QueryCache()
+    assert cache.get_or_compute('stats', (), lambda: 'before reload') == 'before reload'
+    cache.invalidate()
+    assert len(cache) == 0 and cache.stats()['version'] == 1
+    assert cache.get_or_compute('stats', (), lambda: 'after reload') == 'after reload'
+    assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 0
+
+
+def test_reload_drops_cached_answers(write_gradebook, rows):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, rows)
+        server = GradeServer(folder)
+        server.install(*server.load())
+        assert json.loads(server.query('/students', {})[1]) == ["Jane Doe", "John Smith"]
+        assert json.loads(server.query('/students', {})[1]) == ["Jane Doe", "John Smith"]
+        assert server.cache.stats()['hits'] == 1
+
+        write_gradebook(folder, rows[:1])
+        server.install(*server.load())
+    assert json.loads(server.query('/students', {})[1]) == ["Jane Doe"]
+    assert server.cache.stats()['version'] == 2
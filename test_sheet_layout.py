@@ -0,0 +1,44 @@
+import pytest
+
+from sheet_layout import GradeBlock, iter_section_data_rows, iter_section_split_rows
+
+
+def test_totals_skip_blanks_and_text():
+    block = GradeBlock.from_rows([['Doe', 'Jane', 1.0, '', 2.5],
+                                  ['Roe', 'Rick', 'EX', '3', 4]], 3)
+    assert list(block.totals) == [3.5, 7.0]
+    assert list(block.values) == [1.0, 0.0, 2.5, 0.0, 3.0, 4.0]
+    assert list(block.iter_values()) == [['Doe', 'Jane', 1.0, '', 2.5, 3.5],
+                                         ['Roe', 'Rick', 'EX', '3', 4, 7.0]]
+
+
+def test_numpy_and_python_totals_agree():
+    pytest.importorskip('numpy')
+    rows = [['Doe', 'Jane', 1.0, '', 2.5], ('Roe', 'Rick', 'EX', None, 4), ['Lee', 'Ann']]
+    fast = GradeBlock.from_rows(rows, 3, use_numpy=True)
+    slow = GradeBlock.from_rows(rows, 3, use_numpy=False)
+    assert list(fast.totals) == list(slow.totals) == [3.5, 4.0, 0.0]
+    assert list(GradeBlock.from_rows([], 3).totals) == []
+
+
+def test_short_rows_are_padded_before_the_total():
+    rows = list(GradeBlock.from_rows([['Doe', 'Jane', 1.0]], 3).iter_values())
+    assert rows == [['Doe', 'Jane', 1.0, '', '', 1.0]]
+
+
+def test_malformed_names_are_reported():
+    rejects = []
+    rows = list(iter_section_data_rows('F2 Section', [('Doe, Jane', 4.0), ('Rick Roe', 1.0), ('Solo,', '')],
+                                       '1.1 Lesson Practice', rejects))
+    assert rows[4:] == [['Doe', 'Jane', 4.0]]
+    assert rejects == ['Rick Roe', 'Solo,']
+
+
+def test_split_layout():
+    rows = list(iter_section_split_rows('F5 Section', ['1.4 Lesson Practice', '1.4 Code Practice'],
+                                        {'submitted': [['Doe', 'Jane', 4.0, 1.0]],
+                                         'not_submitted': [['Roe', 'Rick', '', '']]}))
+    assert rows[0] == ['Sub-chapter: 1.4']
+    assert rows[6] == ['Doe', 'Jane', 4.0, 1.0, 5.0]
+    assert rows[8] == ['Not submitted']
+    assert rows[10] == ['Roe', 'Rick', '', '', 0.0]
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+pytest.importorskip('googleapiclient')
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+import sheets_scheduler
+from sheets_scheduler import RequestScheduler, TokenBucket
+
+CREATED = ({'status': '200'}, json.dumps({'spreadsheetId': 'sheet-1'}))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Transport(HttpMockSequence):
+    """HttpMockSequence that raises ConnectionError for a None response"""
+    def request(self, uri, method='GET', body=None, headers=None, redirections=1, connection_type=None):
+        if self._iterable and self._iterable[0] is None:
+            self._iterable.pop(0)
+            self.request_sequence.append((uri, method, body, headers))
+            raise ConnectionError("connection reset")
+        return super().request(uri, method, body, headers, redirections, connection_type)
+
+
+def status(code, **headers):
+    return ({'status': str(code), **headers}, json.dumps({'error': {'code': code, 'message': 'scripted'}}))
+
+
+def make_scheduler(responses, clock, **kwargs):
+    http = Transport(list(responses))
+    service = build('sheets', 'v4', http=http, static_discovery=True)
+    return RequestScheduler(service, clock=clock, sleep=clock.sleep, rng=lambda: 1.0, **kwargs), http
+
+
+def create(scheduler, idempotent=False):
+    return scheduler.execute(scheduler.service.spreadsheets().create(body={}, fields='spreadsheetId'),
+                             'spreadsheets.create', idempotent=idempotent)
+
+
+def update(scheduler):
+    return scheduler.execute(scheduler.service.spreadsheets().values().batchUpdate(
+        spreadsheetId='sheet-1', body={'valueInputOption': 'RAW', 'data': []}), 'values.batchUpdate')
+
+
+def test_retries_429_and_5xx_with_backoff():
+    clock = FakeClock()
+    scheduler, http = make_scheduler([status(429), status(500), ({'status': '200'}, '{}')], clock,
+                                     base_delay=1.0, requests_per_minute=6000)
+    assert update(scheduler) == {}
+    assert len(http.request_sequence) == 3
+    # rng() == 1.0, so the waits are the full 1s and 2s backoff steps
+    assert clock.now >= 3.0
+    assert scheduler.metrics[-1].attempts == 3
+
+
+def test_retry_after_header_is_honoured():
+    clock = FakeClock()
+    scheduler, _ = make_scheduler([status(503, **{'retry-after': '7'}), ({'status': '200'}, '{}')], clock,
+                                  requests_per_minute=6000)
+    update(scheduler)
+    assert 7.0 <= clock.now < 7.1
+
+
+def test_client_errors_are_not_retried():
+    clock = FakeClock()
+    scheduler, http = make_scheduler([status(400)], clock)
+    with pytest.raises(HttpError):
+        update(scheduler)
+    assert len(http.request_sequence) == 1
+
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    scheduler, http = make_scheduler([status(500)] * 3, clock, max_retries=2, requests_per_minute=6000)
+    with pytest.raises(HttpError):
+        update(scheduler)
+    assert len(http.request_sequence) == 3
+
+
+def test_create_is_only_retried_when_rejected():
+    clock = FakeClock()
+    scheduler, http = make_scheduler([status(429), CREATED], clock, requests_per_minute=6000)
+    assert create(scheduler) == {'spreadsheetId': 'sheet-1'}
+    assert len(http.request_sequence) == 2
+
+    # The sheet may exist already after a 5xx or a lost response: no second create
+    for failure, error in ((status(502), HttpError), (None, ConnectionError)):
+        scheduler, http = make_scheduler([failure, CREATED], clock, requests_per_minute=6000)
+        with pytest.raises(error):
+            create(scheduler)
+        assert len(http.request_sequence) == 1
+    # Idempotent requests are sent again after a lost connection
+    scheduler, http = make_scheduler([None, ({'status': '200'}, '{}')], clock, requests_per_minute=6000)
+    update(scheduler)
+    assert len(http.request_sequence) == 2
+
+
+def test_queued_writes_are_coalesced_per_spreadsheet():
+    clock = FakeClock()
+    scheduler, http = make_scheduler([({'status': '200'}, '{}')] * 2, clock)
+    for tab in ['F2 Section', 'F5 Section', 'F6 Section', 'Other Students']:
+        scheduler.queue_values_update('sheet-1', f"'{tab}'!A1", [[tab]])
+    scheduler.queue_values_update('sheet-2', "'F2 Section'!A1", [['x']])
+    scheduler.flush('sheet-1')
+    assert len(http.request_sequence) == 1
+    uri, method, body, _ = http.request_sequence[0]
+    assert method == 'POST' and '/spreadsheets/sheet-1/values:batchUpdate' in uri
+    assert [d['range'] for d in json.loads(body)['data']] == [
+        "'F2 Section'!A1", "'F5 Section'!A1", "'F6 Section'!A1", "'Other Students'!A1"]
+    scheduler.flush()
+    assert len(http.request_sequence) == 2
+    assert not scheduler.pending
+
+
+def test_metrics_are_bounded_and_reset(monkeypatch):
+    monkeypatch.setattr(sheets_scheduler, 'MAX_METRICS', 3)
+    clock = FakeClock()
+    scheduler, _ = make_scheduler([({'status': '200'}, '{}')] * 5, clock, requests_per_minute=6000)
+    for _ in range(5):
+        update(scheduler)
+    assert len(scheduler.metrics) == 3
+    scheduler.reset_metrics()
+    assert scheduler.summary() == "0 API requests"
+
+
+def test_token_bucket_limits_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=1.0, capacity=2, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        bucket.acquire()
+    # 2 tokens of burst, then one per second
+    assert 2.9 < clock.now < 3.1
@@ -0,0 +1,78 @@
+import csv
+import json
+import os
+import tempfile
+
+from gradebook import Gradebook, load_aliases, save_aliases
+from student_mapping_analysis import reconcile, alias_table, write_reports, similar, build_index
+from student_record import GradeLayout, StudentRecord
+
+LAYOUT = GradeLayout([])
+RECORDS = [StudentRecord(name, sid, LAYOUT, []) for name, sid in [
+    ("Mantaring, Riley", '1'), ("Doe, Jane", '2'), ("Doe, Jane Ann", '3'),
+    ("Champagnat, Harry", '4'), ("Nguyen, Thomas", '5'), ("Okafor, Chidi", '6')]]
+ROSTERS = {'F2': ["name", "Riley Sky Mantaring", "Jane Doe"],
+           'F5': ["Tomas Nguyen"],
+           'F6': ["Chidi Okafor", "Nobody Here"]}
+
+
+def test_rules_and_first_match_win():
+    result = reconcile(ROSTERS, RECORDS, workers=1)
+    by_name = {m.roster_name: m for m in result.matches}
+    assert "name" not in by_name
+    assert (by_name["Riley Sky Mantaring"].student_id, by_name["Riley Sky Mantaring"].method) == ('1', 'first_last')
+    # Both Doe records match; the first in the grades file wins
+    assert (by_name["Jane Doe"].student_id, by_name["Jane Doe"].method) == ('2', 'exact')
+    assert by_name["Chidi Okafor"].status == 'matched'
+    # A misspelling is only suggested, and the test user is never a candidate
+    assert (by_name["Tomas Nguyen"].status, by_name["Tomas Nguyen"].student_id) == ('suggested', '5')
+    assert by_name["Nobody Here"].status == 'unmatched'
+    assert result.unmatched_grades == [("Doe, Jane Ann", '3'), ("Nguyen, Thomas", '5')]
+
+
+def test_similar_ignores_word_order():
+    candidates, _ = build_index(RECORDS)
+    best, ratio = similar("Okafor Chidi", candidates)
+    assert best.id == '6' and ratio == 1.0
+
+
+def test_alias_table_keeps_confirmed_names():
+    with tempfile.TemporaryDirectory() as folder:
+        aliases = alias_table(reconcile(ROSTERS, RECORDS, workers=1))
+        aliases['F6']["Nobody Here"] = {'id': '3', 'name': "Doe, Jane Ann", 'method': 'confirmed'}
+        save_aliases(aliases, folder)
+        loaded = load_aliases(folder)
+        assert loaded['F2']["Jane Doe"]['id'] == '2'
+
+        result = reconcile(ROSTERS, RECORDS, loaded, workers=1)
+        kept = [m for m in result.matches if m.roster_name == "Nobody Here"][0]
+        assert (kept.status, kept.student_id) == ('confirmed', '3')
+        assert ("Doe, Jane Ann", '3') not in result.unmatched_grades
+
+        json_path, csv_path = write_reports(result, 'grades.csv', folder)
+        with open(json_path, encoding='utf-8') as f:
+            report = json.load(f)
+        with open(csv_path, encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        assert report['counts']['confirmed'] == 1 and report['counts']['roster_names'] == 5
+        assert rows[0][:3] == ['section', 'roster_name', 'status'] and len(rows) == 1 + 5 + 1
+        assert load_aliases(os.path.join(folder, 'missing')) == {}
+
+
+def test_gradebook_sections_come_from_aliases(write_gradebook):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, [("Doe, Jane", '1', []), ("Smith, John", '2', []), ("Lee, Ann", '3', [])])
+        with open(os.path.join(folder, 'F5 - names.csv'), 'w', encoding='utf-8') as f:
+            f.write("name\nJohnny Smith\nAnn Lee\n")
+        # Without an alias table names are matched as before; "Johnny Smith" matches nobody
+        gradebook = Gradebook.load(folder)
+        assert gradebook.sections == ['F2', 'Other', 'F5']
+        assert gradebook.unmapped_count() == 3
+
+        save_aliases({'F5': {"Johnny Smith": {'id': '2', 'name': "Smith, John", 'method': 'confirmed'},
+                             "Gone Student": {'id': '9', 'name': "Student, Gone", 'method': 'exact'}}}, folder)
+        gradebook = gradebook.reload(folder, grades=False, rosters=True)
+        assert gradebook.sections == ['F2', 'F5', 'F5']
+        assert gradebook.unmapped == {'F2': ["Jane Doe"], 'F5': ["Ann Lee"], 'F6': []}
+        assert gradebook.aliased_ids == {'2'}
+        assert gradebook.student_section("Smith, John") == 'F5'
@@ -0,0 +1,110 @@
+import csv
+import os
+import tempfile
+
+from bench_student_record import write_grades_csv, load_as_dicts, traced_size
+from student_record import StudentRecord, GradeLayout, SummaryTable, read_grades_csv, iter_grades_csv, fill_ratio
+
+# The bench script measures 10k students; 2k keeps the suite fast and shows the same ratios
+N_STUDENTS = 2000
+N_ASSIGNMENTS = 226
+
+
+def test_records_use_less_memory_than_dicts():
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'grades.csv')
+        write_grades_csv(filename, N_STUDENTS, N_ASSIGNMENTS, fill_ratio=0.3)
+
+        dicts, dict_size = traced_size(lambda: load_as_dicts(filename))
+        (_, dense), dense_size = traced_size(lambda: read_grades_csv(filename, sparse=False))
+        (_, sparse), sparse_size = traced_size(lambda: read_grades_csv(filename, sparse=True))
+
+    assert len(dicts) == len(dense) == len(sparse) == N_STUDENTS
+    # About 3x and 9x smaller; the margin covers growth of the interned-string table,
+    # which depends on what the process has interned before
+    assert dense_size * 2 < dict_size
+    assert sparse_size * 2 < dense_size
+
+
+def test_dense_and_sparse_records_give_the_same_grades():
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'grades.csv')
+        assignments = write_grades_csv(filename, 200, 50, fill_ratio=0.3)
+        with open(filename, encoding='utf-8') as f:
+            rows = list(csv.reader(f))[2:]
+        layout, dense = read_grades_csv(filename, sparse=False)
+        _, sparse = read_grades_csv(filename, sparse=True)
+
+    assert list(layout.assignments) == assignments
+    assert len(dense) == len(sparse) == len(rows)
+    # Same answers through the compatibility interface
+    for row, new_dense, new_sparse in zip(rows, dense, sparse):
+        assert row[0] == new_dense['name'] == new_sparse['name']
+        for assignment, cell in zip(assignments, row[5:]):
+            expected = float(cell) if cell else None
+            assert new_dense['grades'].get(assignment) == new_sparse['grades'].get(assignment) == expected
+
+
+def test_sparse_and_dense_round_trip():
+    layout = GradeLayout(['1.1 Lesson Practice (1)', '1.2 Code Practice (2)', 'Final Grade', 'Quiz 1 (3)'])
+    record = StudentRecord.from_cells('Doe, Jane', '42', layout, ['5.00', '', 'A', '0'])
+    sparse = record.to_sparse()
+    assert sparse.is_sparse and not record.is_sparse
+    assert list(record.iter_submitted()) == list(sparse.iter_submitted()) == [(0, 5.0), (2, 'A'), (3, 0.0)]
+    assert record.submitted_count() == sparse.submitted_count() == 3
+    assert sparse.to_dense().grade(1) is None
+    assert dict(record['grades'].items()) == dict(sparse['grades'].items())
+    assert record.name is sparse.name
+
+
+def test_storage_is_chosen_from_fill_ratio():
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'grades.csv')
+
+        write_grades_csv(filename, 50, 40, fill_ratio=0.1)
+        layout, records = read_grades_csv(filename)
+        assert fill_ratio(layout, records) < 0.4
+        assert all(r.is_sparse for r in records)
+
+        write_grades_csv(filename, 50, 40, fill_ratio=0.9)
+        layout, records = read_grades_csv(filename)
+        assert not any(r.is_sparse for r in records)
+
+
+def test_chunked_read_reports_progress():
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'grades.csv')
+        write_grades_csv(filename, 1234, 20, fill_ratio=0.5)
+
+        chunks = list(iter_grades_csv(filename, chunk_rows=500))
+        assert [len(chunk) for _, chunk, _, _ in chunks] == [500, 500, 234]
+        assert chunks[-1][2] == chunks[-1][3] == os.path.getsize(filename)
+
+        calls = []
+        layout, records = read_grades_csv(filename, progress=lambda *args: calls.append(args))
+        assert [students for students, _, _ in calls] == [500, 1000, 1234]
+        assert calls[0][1] < calls[1][1] < calls[2][1]
+        assert [r.id for r in records] == [r.id for _, chunk, _, _ in chunks for r in chunk]
+
+
+def test_columns_are_addressed_by_assignment_id():
+    layout = GradeLayout(['1.1 Lesson Practice (23118480)', 'Extra Credit', 'Quiz 1 (23120193)'])
+    assert list(layout.ids) == [23118480, 0, 23120193]
+    assert layout.column(23120193) == layout.column('23120193') == layout.column('Quiz 1 (23120193)') == 2
+    assert layout.column('Extra Credit') == 1 and layout.column(5) is None
+    assert [layout.key(c) for c in range(3)] == [23118480, 'Extra Credit', 23120193]
+    record = StudentRecord.from_cells("Doe, Jane", '1', layout, ['5', '', '7'], sparse=True)
+    assert record.get(23120193) == 7.0 and record['grades'][23118480] == 5.0
+
+
+def test_summary_table_types_scores_and_letter_grades():
+    summary = SummaryTable.from_cells(['Current Score', 'Current Grade'],
+                                      [['88.50', '', '91.00', '60.00'], ['B+', '', 'A-', 'Incomplete']], 4)
+    assert summary.scores['Current Score'].typecode == 'd' and 'Current Grade' in summary.grades
+    assert summary.value('Current Score', 1) is None and summary.value('Current Grade', 2) == 'A-'
+    assert summary.rank('Current Score') == [2, 0, 3]
+    # Letter grades rank best first; grades outside the A+..F scale come last
+    assert summary.rank('Current Grade') == [2, 0, 3]
+    assert summary.select('Current Score', low=80) == [0, 2]
+    assert summary.select('Current Grade', letters=['A-', 'B+', 'Z']) == [0, 2]
+    assert summary.student(3) == [('Current Score', 60.0), ('Current Grade', 'Incomplete')]
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+import student_reports
+from gradebook import Gradebook
+from student_reports import write_student_reports, student_report, report_context, report_text
+
+ROWS = [("Doe, Jane", '1', ['5.00', '1.00', '']),
+        ("Smith, John", '2', ['3.00', '', '']),
+        ("O'Neil, <Pat>", '3', ['', '', ''])]
+
+
+def test_report_text_groups_by_category(write_gradebook, assignments):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, ROWS)
+        gradebook = Gradebook.load(folder)
+    text = report_text(student_report(gradebook, 0, "Jane Doe"), report_context(gradebook))
+    assert text.startswith("All Grades for: Jane Doe\nStudent ID: 1\n" + "=" * 50 + "\n\n")
+    assert f"LESSON PRACTICE:\n  {assignments[0]}: 5.0\n" in text
+    assert text.endswith("Total completed assignments: 2\n")
+
+
+def test_one_file_per_student_serial_and_parallel(write_gradebook):
+    with tempfile.TemporaryDirectory() as folder:
+        write_gradebook(folder, ROWS)
+        gradebook = Gradebook.load(folder)
+        _, serial = write_student_reports(gradebook, os.path.join(folder, 'serial'), workers=1)
+        assert [os.path.basename(p) for p in serial] == ["F2 - Jane Doe.txt", "_Pat_ O_Neil.txt", "John Smith.txt"]
+
+        minimum = student_reports.PARALLEL_MIN_STUDENTS
+        student_reports.PARALLEL_MIN_STUDENTS = 0
+        try:
+            _, parallel = write_student_reports(gradebook, os.path.join(folder, 'parallel'), fmt='html', workers=2)
+        finally:
+            student_reports.PARALLEL_MIN_STUDENTS = minimum
+        with open(parallel[1], encoding='utf-8') as f:
+            page = f.read()
+        assert "<h1>&lt;Pat&gt; O&#x27;Neil</h1>" in page and "Total completed assignments: 0" in page
+
+        _, section = write_student_reports(gradebook, os.path.join(folder, 'f2'), section='F2')
+        with open(section[0], encoding='utf-8') as f:
+            assert f.read() == report_text(student_report(gradebook, 0, "Jane Doe"), report_context(gradebook))
+        assert len(section) == 1
@@ -0,0 +1,69 @@
+from subchapter_index import SubchapterIndex
+
+HEADER = [
+    'Create Your EarSketch Account (23119797)',
+    '1.1 Lesson Practice (23118480)',
+    '1.2 Code Practice (23120649)',
+    '1.10 Lesson Practice (23100001)',
+    '1.5 Code Practice: Question 1 (23120733)',
+    '1.5 Code Practice: Question 2 (23120749)',
+    '1.9 Lesson Practice (23100002)',
+    '3.1 Lesson Practice (23118780)',
+    '3.2 Code Practice: Question 1 (23120981)',
+    'Quiz 3 (23119850)',
+    'Assignment 3: Chatbot (23121615)',
+    'Submitting Unit 11 Assignment – Step 1 (23121691)',
+    'Test 3 (23119990)',
+]
+
+
+def names(index, columns):
+    return [index.assignments[c] for c in columns]
+
+
+def test_exact_subchapter_does_not_match_longer_prefix():
+    index = SubchapterIndex(HEADER)
+    assert names(index, index.columns('1.1')) == ['1.1 Lesson Practice (23118480)']
+    assert names(index, index.columns('1.10')) == ['1.10 Lesson Practice (23100001)']
+
+
+def test_prefixes_are_numerically_ordered():
+    index = SubchapterIndex(HEADER)
+    assert index.prefixes() == ['1.1', '1.2', '1.5', '1.9', '1.10', '3.1', '3.2']
+
+
+def test_unit_query_includes_unit_level_items():
+    index = SubchapterIndex(HEADER)
+    assert index.assignment_names('unit 3') == [
+        '3.1 Lesson Practice (23118780)',
+        '3.2 Code Practice: Question 1 (23120981)',
+        'Quiz 3 (23119850)',
+        'Assignment 3: Chatbot (23121615)',
+        'Test 3 (23119990)',
+    ]
+    assert index.lookup('3') == index.lookup('unit 3')
+    assert index.unit_items[11] == (11,)
+
+
+def test_range_query():
+    index = SubchapterIndex(HEADER)
+    assert index.assignment_names('1.2–1.9') == [
+        '1.2 Code Practice (23120649)',
+        '1.5 Code Practice: Question 1 (23120733)',
+        '1.5 Code Practice: Question 2 (23120749)',
+        '1.9 Lesson Practice (23100002)',
+    ]
+    assert index.lookup('1.2-1.9') == index.lookup('1.2 to 1.9')
+
+
+def test_assignment_types():
+    index = SubchapterIndex(HEADER)
+    assert index.entries[4].kind == 'Code Practice'
+    assert index.columns_of_kind('Quiz') == (9,)
+    assert index.entries[0].unit is None
+
+
+def test_unknown_query_is_empty():
+    index = SubchapterIndex(HEADER)
+    assert index.lookup('7.7') == ()
+    assert index.lookup('Quiz') == ()